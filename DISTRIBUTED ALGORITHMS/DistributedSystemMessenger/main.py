@@ -4,10 +4,16 @@ import time
 from queue import Queue  
 from datetime import datetime  
 import random  
+import os
+import sys
 
 from supervisor import SupervisorThread  
 from controller_application import ThreadApplicationController  
 
+#the binary topology format is shared by the scripts of every algorithm folder
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "Topology"))
+from topology_file import load_topology
+
 
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 
@@ -35,6 +41,23 @@ def simulate_sender(sender_id, receivers, supervisor_queue):
         #just a random delay before sending the next message
         time.sleep(random.uniform(0.1, 1.0))
 
+# a function to read a topology file into the dictionary form used below
+def read_topology_file(path):
+    """
+    Reads a binary topology file (see Topology/topology_file.py) into a dictionary of neighbors.
+
+    Every node becomes a controller thread listening on its own port, so the file should
+    describe a small graph.
+
+    Args:
+        path (str): The topology file.
+
+    Returns:
+        dict: A dictionary mapping each node to the list of its neighbors.
+    """
+    topology = load_topology(path)
+    return {node: topology.neighbors_of(node).tolist() for node in range(topology.num_nodes)}
+
 # a function to calculate the depth of each node in the topology
 def calculate_node_depth(topology):
     """
@@ -98,21 +121,25 @@ if __name__ == "__main__":
         3: [0, 1, 2]
     }
 
-    print("Select the topology to use:")
-    print("1. Tree Topology")
-    print("2. Ring Topology")
-    print("3. Fully Connected Topology")
-    choice = input("Enter your choice (1/2/3): ") 
-
-    if choice == "1":
-        topology = tree_structure
-    elif choice == "2":
-        topology = ring_structure
-    elif choice == "3":
-        topology = fully_connected_structure
+    if len(sys.argv) > 1:
+        # python main.py <topology file>
+        topology = read_topology_file(sys.argv[1])
     else:
-        print("Invalid choice. Exiting...")  
-        exit()
+        print("Select the topology to use:")
+        print("1. Tree Topology")
+        print("2. Ring Topology")
+        print("3. Fully Connected Topology")
+        choice = input("Enter your choice (1/2/3): ") 
+
+        if choice == "1":
+            topology = tree_structure
+        elif choice == "2":
+            topology = ring_structure
+        elif choice == "3":
+            topology = fully_connected_structure
+        else:
+            print("Invalid choice. Exiting...")  
+            exit()
 
     node_depth = calculate_node_depth(topology) 
 
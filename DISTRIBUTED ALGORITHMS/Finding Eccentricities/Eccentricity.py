@@ -1,11 +1,40 @@
+import argparse
+import os
+import sys
+from bisect import bisect_right
+from collections import deque
+from itertools import chain
+
+import numpy as np
 from mpi4py import MPI
 
+# The binary topology format is shared by the scripts of every algorithm folder
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "Topology"))
+from topology_file import forest_offsets, load_topology
+
 # Constants
 ROOT = 0
-NR_NODES = 6
 TRUE = 1
 FALSE = 0
 
+# Layout of a buffer message: message type, sending node, value
+MESSAGE_FIELDS = 3
+PROTOCOL_TAG = 0
+# Receives posted in advance by the buffer transport
+RECEIVE_DEPTH = 64
+# Sends of a rank allowed in flight before it waits for some of them to complete
+MAX_PENDING_SENDS = 256
+
+# Tree used when no topology file is given: 0-1, 1-2, 1-3, 1-4, 3-5
+EXAMPLE_TREE = {
+    0: [1],
+    1: [0, 2, 3, 4],
+    2: [1],
+    3: [1, 5],
+    4: [1],
+    5: [3]
+}
+
 # The status of the node
 class STATUS_ENUM:
     AVAILABLE = 0
@@ -19,83 +48,248 @@ class MESSAGE_TYPE:
     SATURATION = 1
     RESOLUTION = 2
 
-def Initialize(dist, np):
+# Names of the values of STATUS_ENUM and MESSAGE_TYPE, used by ProtocolProfile
+STATE_NAMES = ["AVAILABLE", "ACTIVE", "PROCESSING", "DONE"]
+MESSAGE_NAMES = ["ACTIVATE", "SATURATION", "RESOLUTION"]
+
+def Load_Neighbors(path, first, last):
+    """
+    Loads the neighbors of a block of nodes of the tree.
+
+    Only the neighbor blocks of those nodes are read from the memory-mapped topology
+    file, so every rank holds O(degree) data per local node whatever the size of the tree.
+
+    Args:
+        path (str): The topology file (see Topology/topology_file.py), or None for EXAMPLE_TREE.
+        first (int): First node of the block.
+        last (int): Last node of the block (excluded).
+
+    Returns:
+        tuple: (number of nodes, list of the neighbor lists of the nodes first..last-1).
+    """
+    if path is None:
+        return len(EXAMPLE_TREE), [list(EXAMPLE_TREE[node]) for node in range(first, min(last, len(EXAMPLE_TREE)))]
+
+    topology = load_topology(path)
+    last = min(last, topology.num_nodes)
+    offsets = topology.offsets[first:last + 1].tolist()
+    neighbors = topology.neighbors[offsets[0]:offsets[-1]].tolist() if last > first else []
+    start = offsets[0]
+    return topology.num_nodes, [neighbors[offsets[i] - start:offsets[i + 1] - start] for i in range(last - first)]
+
+def Block_Boundaries(nr_processes, nr_nodes):
+    """
+    Splits the nodes into one contiguous block of equal size per rank.
+
+    Args:
+        nr_processes (int): The number of processes.
+        nr_nodes (int): The number of nodes of the tree.
+
+    Returns:
+        list: First node of the block of every rank, followed by the number of nodes.
+    """
+    return (np.arange(nr_processes + 1, dtype=np.int64) * nr_nodes // nr_processes).tolist()
+
+def Block_Owner(node, boundaries):
+    """
+    Finds the rank whose block contains a node.
+
+    Args:
+        node (int): The node.
+        boundaries (list): First node of the block of every rank, followed by the number of nodes.
+
+    Returns:
+        int: The rank.
+    """
+    return bisect_right(boundaries, node) - 1
+
+def Forest_Boundaries(tree_offsets, nr_processes):
+    """
+    Packs the trees of a forest onto the ranks in ID order.
+
+    Every block ends at the tree start closest to an equal share of the nodes, so small
+    trees never straddle two ranks; a tree larger than half a share is cut at the share
+    boundary instead, and runs over several ranks.
+
+    Args:
+        tree_offsets (numpy.ndarray): The first node of every tree followed by the number of nodes.
+        nr_processes (int): The number of processes.
+
+    Returns:
+        list: First node of the block of every rank, followed by the number of nodes.
+    """
+    nr_nodes = int(tree_offsets[-1])
+    shares = np.arange(nr_processes + 1, dtype=np.int64) * nr_nodes // nr_processes
+    after = np.minimum(np.searchsorted(tree_offsets, shares), tree_offsets.size - 1)
+    before = np.maximum(after - 1, 0)
+    closest = np.where(tree_offsets[after] - shares <= shares - tree_offsets[before],
+                       tree_offsets[after], tree_offsets[before])
+    boundaries = np.where(np.abs(closest - shares) * 2 * nr_processes <= nr_nodes, closest, shares)
+    return np.maximum.accumulate(boundaries).tolist()
+
+def Initialize(dist):
     """
     Initializes the distances vector with zeros.
 
     Args:
-        dist (list): The distances vector to initialize.
-        np (int): The number of processes.
+        dist (list): The distances vector to initialize, one entry per neighbor.
     """
-    for i in range(np):
+    for i in range(len(dist)):
         dist[i] = 0
 
-def Prepare_Message(dist, np):
+def Prepare_Message(dist):
     """
     Prepares a message value by computing the maximum distance from neighbors.
 
     Args:
         dist (list): The distances vector.
-        np (int): The number of processes.
 
     Returns:
         int: The prepared message value.
     """
-    maxdist = max(dist)
+    maxdist = max(dist, default=0)
     return maxdist + 1
 
-def Process_Message(dist, received_distance, sender):
+def Process_Message(dist, index, received_distance, sender):
     """
     Updates the distances vector with the received distance from a sender.
 
     Args:
         dist (list): The distances vector.
+        index (dict): Position of every neighbor in the distances vector.
         received_distance (int): The distance received from the sender.
         sender (int): The ID of the sender.
     """
-    dist[sender] = received_distance
+    dist[index[sender]] = received_distance
 
-def Calculate_Eccentricities(dist, np):
+def Calculate_Eccentricities(dist):
     """
     Calculates the eccentricity of a node.
 
     Args:
         dist (list): The distances vector.
-        np (int): The number of processes.
 
     Returns:
         int: The calculated eccentricity.
     """
-    return max(dist)
+    return max(dist, default=0)
 
-def Resolve(dist, nodes, received_distance, my_rank, parent, sender, np, request):
+def Resolve(send, dist, index, neighbors, received_distance, parent, sender):
     """
     Enters the resolution stage for saturated nodes.
 
+    Every child gets 1 + the largest distance through the other neighbors; keeping the
+    two largest entries of the distances vector gives it in O(1) per child.
+
     Args:
+        send (callable): send(dest, tag, value) delivers a message to a neighbor.
         dist (list): The distances vector.
-        nodes (list): The adjacency matrix representing the graph.
+        index (dict): Position of every neighbor in the distances vector.
+        neighbors (list): The neighbors of the node.
         received_distance (int): The distance received from the sender.
-        my_rank (int): The ID of the current process.
         parent (int): The parent ID.
         sender (int): The ID of the sender.
-        np (int): The number of processes.
-        request (MPI.Request): The MPI request parameter.
 
     Returns:
         int: The eccentricity of the node.
     """
-    Process_Message(dist, received_distance, sender)
-    eccentricity = Calculate_Eccentricities(dist, np)
+    Process_Message(dist, index, received_distance, sender)
+    eccentricity = Calculate_Eccentricities(dist)
 
-    for dest in range(np):
-        if nodes[my_rank][dest] != 0 and dest != parent:
-            maxdist = max(dist[i] for i in range(np) if i != dest)
+    best = second = 0
+    best_position = -1
+    for position, distance in enumerate(dist):
+        if distance > best:
+            best, second, best_position = distance, best, position
+        elif distance > second:
+            second = distance
+
+    for position, dest in enumerate(neighbors):
+        if dest != parent:
+            maxdist = second if position == best_position else best
             message = maxdist + 1
-            request.send(message, dest=dest, tag=MESSAGE_TYPE.RESOLUTION)
+            send(dest, MESSAGE_TYPE.RESOLUTION, message)
 
     return eccentricity
 
+class TreeNode:
+    def __init__(self, node_id, neighbors):
+        """
+        Initializes the state machine of one tree node.
+
+        Args:
+            node_id (int): The ID of the node.
+            neighbors (list): The neighbors of the node.
+        """
+        self.node_id = node_id
+        self.neighbors = neighbors
+        self.index = {neighbor: position for position, neighbor in enumerate(neighbors)}
+        self.distances = [0] * len(neighbors)
+        self.status = STATUS_ENUM.AVAILABLE
+        self.parent = -1
+        self.remaining = len(neighbors)
+        self.neighbors_sum = sum(neighbors)
+        self.eccentricity = -1
+
+    def Activate(self, source, send):
+        """
+        Wakes the node up, either spontaneously (source -1) or on an ACTIVATE message.
+
+        Args:
+            source (int): The neighbor that sent the activation, or -1 for the initiator.
+            send (callable): send(dest, tag, value) delivers a message to a neighbor.
+        """
+        for dest in self.neighbors:
+            if dest != source:
+                send(dest, MESSAGE_TYPE.ACTIVATE, 0)
+
+        Initialize(self.distances)
+        if len(self.neighbors) == 1:
+            self.parent = self.neighbors[0]
+            send(self.parent, MESSAGE_TYPE.SATURATION, Prepare_Message(self.distances))
+            self.status = STATUS_ENUM.PROCESSING
+        elif not self.neighbors:
+            # A single-node tree
+            self.eccentricity = 0
+            self.status = STATUS_ENUM.DONE
+        else:
+            self.status = STATUS_ENUM.ACTIVE
+
+    def Receive(self, source, tag, message, send):
+        """
+        Handles one message and sends the messages it triggers.
+
+        Args:
+            source (int): The neighbor that sent the message.
+            tag (int): The MESSAGE_TYPE of the message.
+            message (int): The value carried by the message.
+            send (callable): send(dest, tag, value) delivers a message to a neighbor.
+        """
+        # ACTIVATION state
+        if self.status == STATUS_ENUM.AVAILABLE:
+            if tag == MESSAGE_TYPE.ACTIVATE:
+                self.Activate(source, send)
+
+        # ACTIVE STAGE
+        elif self.status == STATUS_ENUM.ACTIVE:
+            if tag == MESSAGE_TYPE.SATURATION:
+                self.remaining -= 1
+                self.neighbors_sum -= source
+
+                Process_Message(self.distances, self.index, message, source)
+                if self.remaining == 1:
+                    self.parent = self.neighbors_sum
+                    send(self.parent, MESSAGE_TYPE.SATURATION, Prepare_Message(self.distances))
+                    self.status = STATUS_ENUM.PROCESSING
+
+        # PROCESSING STAGE
+        elif self.status == STATUS_ENUM.PROCESSING:
+            if tag == MESSAGE_TYPE.SATURATION or tag == MESSAGE_TYPE.RESOLUTION:
+                # A SATURATION message from the parent means this node is saturated
+                self.eccentricity = Resolve(send, self.distances, self.index, self.neighbors,
+                                            message, self.parent, source)
+                self.status = STATUS_ENUM.DONE
+
 def Print_vector(v):
     """
     Displays a vector to the console.
@@ -105,114 +299,684 @@ def Print_vector(v):
     """
     print("V =", v)
 
-def main():
+def Wait_All(requests):
     """
-    The main function for all the processes.
+    Waits for a list of requests, of mpi4py or of a stand-in communicator.
+
+    Args:
+        requests (list): The requests.
+    """
+    if requests:
+        type(requests[0]).Waitall(requests)
+
+class SendPool:
+    def __init__(self, limit=MAX_PENDING_SENDS):
+        """
+        Tracks the non-blocking sends of a rank until they complete.
+
+        Every send takes one of limit slots, which also name the send buffer it may use.
+        When no slot is free, the completed sends are collected in one batch with
+        Testsome, and if none completed yet the sender blocks in Waitsome, so at most
+        limit requests and buffers are alive whatever the length of the run.
+
+        Args:
+            limit (int): Maximum number of sends in flight.
+        """
+        self.limit = limit
+        self.requests = []
+        self.slots = []
+        self.free_slots = list(range(limit))
+
+    def Acquire(self):
+        """
+        Takes a free slot, waiting for pending sends to complete if there is none.
+
+        Returns:
+            int: The slot, in range(limit).
+        """
+        if not self.free_slots:
+            self.Complete("Testsome")
+            if not self.free_slots:
+                self.Complete("Waitsome")
+        return self.free_slots.pop()
+
+    def Add(self, request, slot):
+        """
+        Tracks a started send until it completes.
+
+        Args:
+            request (MPI.Request): The request of the send.
+            slot (int): The slot returned by Acquire for this send.
+        """
+        self.requests.append(request)
+        self.slots.append(slot)
+
+    def Complete(self, method):
+        """
+        Releases the slots of the completed sends.
+
+        Args:
+            method (str): "Testsome" or "Waitsome", called on the class of the requests so
+                that the requests of a stand-in communicator work as well.
+        """
+        indices = getattr(type(self.requests[0]), method)(self.requests)
+        if indices:
+            completed = set(indices)
+            self.free_slots.extend(self.slots[i] for i in indices)
+            self.requests = [request for i, request in enumerate(self.requests) if i not in completed]
+            self.slots = [slot for i, slot in enumerate(self.slots) if i not in completed]
+
+    def Drain(self):
+        """
+        Waits for every pending send; called before barrier and Finalize.
+        """
+        Wait_All(self.requests)
+        self.free_slots.extend(self.slots)
+        self.requests = []
+        self.slots = []
+
+class PickleTransport:
+    def __init__(self, comm, limit=MAX_PENDING_SENDS):
+        """
+        Sends every message as a pickled Python int, with the message type as MPI tag.
+
+        Args:
+            comm (MPI.Comm): The communicator.
+            limit (int): Maximum number of sends in flight (see SendPool).
+        """
+        self.comm = comm
+        self.status = MPI.Status()
+        self.sends = SendPool(limit)
+
+    def Send(self, dest, tag, source, value):
+        """
+        Sends one protocol message to a rank.
+
+        Args:
+            dest (int): The destination rank.
+            tag (int): The MESSAGE_TYPE of the message.
+            source (int): The sending node (the rank itself in one-node-per-rank mode).
+            value (int): The value carried by the message.
+        """
+        slot = self.sends.Acquire()
+        self.sends.Add(self.comm.isend(value, dest=dest, tag=tag), slot)
+
+    def Send_Bytes(self, value):
+        """
+        Computes the size of the payload of one message sent with Send.
+
+        Args:
+            value (int): The value carried by the message.
+
+        Returns:
+            int: The number of pickled bytes.
+        """
+        return len(MPI.pickle.dumps(value))
+
+    def Exchange_Bytes(self, message):
+        """
+        Estimates the share of one message in the pickled buffers of Exchange.
+
+        Args:
+            message (tuple): The (dest, source, tag, value) integers of the message.
+
+        Returns:
+            int: The number of pickled bytes of the message on its own.
+        """
+        return len(MPI.pickle.dumps(list(message)))
+
+    def Receive(self):
+        """
+        Waits for the next protocol message.
+
+        Returns:
+            tuple: (sending node, MESSAGE_TYPE, value).
+        """
+        value = self.comm.recv(source=MPI.ANY_SOURCE, tag=MPI.ANY_TAG, status=self.status)
+        return self.status.Get_source(), self.status.Get_tag(), value
+
+    def Exchange(self, outgoing):
+        """
+        Exchanges the aggregated messages of a superstep between all ranks.
+
+        Args:
+            outgoing (list): One flat list of (dest, source, tag, value) integers per rank.
+
+        Returns:
+            list: The flat list of integers received from all ranks.
+        """
+        return [number for received in self.comm.alltoall(outgoing) for number in received]
+
+    def Close(self):
+        """
+        Waits for the pending sends.
+        """
+        self.sends.Drain()
+
+class BufferTransport:
+    def __init__(self, comm, depth=RECEIVE_DEPTH, limit=MAX_PENDING_SENDS):
+        """
+        Sends every message as a fixed-layout int64 buffer (message type, sending node,
+        value) through the buffer API, so nothing is pickled or allocated per message.
+
+        depth receives are posted in advance into a ring of buffers and completed in
+        posting order; MPI matches messages to receives in that order, so the messages
+        of one sender are still handled in the order they were sent. Every send uses
+        the buffer of its SendPool slot, which is reused once the send completed.
+
+        Args:
+            comm (MPI.Comm): The communicator.
+            depth (int): Number of preposted receives.
+            limit (int): Maximum number of sends in flight, and of send buffers.
+        """
+        self.comm = comm
+        self.receive_buffers = np.zeros((depth, MESSAGE_FIELDS), dtype=np.int64)
+        self.receive_requests = [comm.Irecv(self.receive_buffers[slot], source=MPI.ANY_SOURCE, tag=PROTOCOL_TAG)
+                                 for slot in range(depth)]
+        self.next_receive = 0
+        self.send_buffers = np.zeros((limit, MESSAGE_FIELDS), dtype=np.int64)
+        self.sends = SendPool(limit)
+
+    def Send(self, dest, tag, source, value):
+        """
+        Sends one protocol message to a rank.
+
+        Args:
+            dest (int): The destination rank.
+            tag (int): The MESSAGE_TYPE of the message.
+            source (int): The sending node.
+            value (int): The value carried by the message.
+        """
+        slot = self.sends.Acquire()
+        buffer = self.send_buffers[slot]
+        buffer[0] = tag
+        buffer[1] = source
+        buffer[2] = value
+        self.sends.Add(self.comm.Isend(buffer, dest=dest, tag=PROTOCOL_TAG), slot)
+
+    def Send_Bytes(self, value):
+        """
+        Computes the size of the payload of one message sent with Send.
+
+        Args:
+            value (int): The value carried by the message.
+
+        Returns:
+            int: The number of bytes of the buffer.
+        """
+        return self.send_buffers.itemsize * MESSAGE_FIELDS
+
+    def Exchange_Bytes(self, message):
+        """
+        Computes the share of one message in the buffers of Exchange.
+
+        Args:
+            message (tuple): The (dest, source, tag, value) integers of the message.
+
+        Returns:
+            int: The number of bytes of the message.
+        """
+        return self.send_buffers.itemsize * len(message)
+
+    def Receive(self):
+        """
+        Waits for the next protocol message and posts a new receive in its buffer.
+
+        Returns:
+            tuple: (sending node, MESSAGE_TYPE, value).
+        """
+        slot = self.next_receive
+        self.receive_requests[slot].Wait()
+        tag, source, value = self.receive_buffers[slot].tolist()
+        self.receive_requests[slot] = self.comm.Irecv(self.receive_buffers[slot], source=MPI.ANY_SOURCE,
+                                                      tag=PROTOCOL_TAG)
+        self.next_receive = (slot + 1) % len(self.receive_requests)
+        return source, tag, value
+
+    def Exchange(self, outgoing):
+        """
+        Exchanges the aggregated messages of a superstep between all ranks with one
+        Alltoall of the counts and one Alltoallv of the int64 payloads.
+
+        Args:
+            outgoing (list): One flat list of (dest, source, tag, value) integers per rank.
+
+        Returns:
+            list: The flat list of integers received from all ranks.
+        """
+        send_counts = [len(numbers) for numbers in outgoing]
+        receive_counts = np.zeros(len(outgoing), dtype=np.int32)
+        self.comm.Alltoall(np.array(send_counts, dtype=np.int32), receive_counts)
+
+        send_data = np.fromiter(chain.from_iterable(outgoing), dtype=np.int64, count=sum(send_counts))
+        receive_data = np.empty(int(receive_counts.sum()), dtype=np.int64)
+        self.comm.Alltoallv([send_data, send_counts, MPI.INT64_T], [receive_data, receive_counts.tolist(), MPI.INT64_T])
+        return receive_data.tolist()
+
+    def Close(self):
+        """
+        Waits for the pending sends and cancels the preposted receives.
+        """
+        self.sends.Drain()
+        for request in self.receive_requests:
+            request.Cancel()
+        Wait_All(self.receive_requests)
+
+TRANSPORTS = {
+    "buffer": BufferTransport,
+    "pickle": PickleTransport
+}
+
+class ProtocolProfile:
+    def __init__(self):
+        """
+        Records, for one rank, the time spent handling messages in every node state, the
+        time spent blocked waiting for messages, and the count and bytes of the messages
+        sent per MESSAGE_TYPE.
+
+        A message is timed in the state its node was in when it arrived (AVAILABLE for
+        the ACTIVATE that wakes it up). DONE is the time spent gathering the results
+        once the rank has no protocol work left.
+        """
+        self.state_time = np.zeros(len(STATE_NAMES))
+        self.blocked_time = 0.0
+        self.messages = np.zeros(len(MESSAGE_NAMES), dtype=np.int64)
+        self.bytes = np.zeros(len(MESSAGE_NAMES), dtype=np.int64)
+
+    def Counting(self, send, size):
+        """
+        Wraps a send callback so that it counts the messages and their bytes.
+
+        Args:
+            send (callable): send(dest, tag, value) delivers a message to a neighbor.
+            size (callable): size(dest, tag, value) gives the bytes the message puts on the network.
+
+        Returns:
+            callable: The counting send callback.
+        """
+        def counting_send(dest, tag, value):
+            self.messages[tag] += 1
+            self.bytes[tag] += size(dest, tag, value)
+            send(dest, tag, value)
+
+        return counting_send
+
+    def Handle(self, node, handler, *args):
+        """
+        Calls a handler of a node and charges its time to the state the node was in.
+
+        Args:
+            node (TreeNode): The node.
+            handler (callable): node.Activate or node.Receive.
+            *args: The arguments of the handler.
+        """
+        status = node.status
+        start = MPI.Wtime()
+        handler(*args)
+        self.state_time[status] += MPI.Wtime() - start
+
+    def Blocked(self, wait):
+        """
+        Calls a function that waits for messages and charges its time as blocked time.
+
+        Args:
+            wait (callable): transport.Receive, or the exchange of a superstep.
+
+        Returns:
+            object: What wait returned.
+        """
+        start = MPI.Wtime()
+        result = wait()
+        self.blocked_time += MPI.Wtime() - start
+        return result
+
+    def Report(self, comm, tree_sizes):
+        """
+        Gathers the profiles of all ranks on the root and prints a report there.
+
+        The measured message counts are compared with the exact counts of the
+        protocol on a tree: n - 1 ACTIVATE (one per edge), n SATURATION (one per node)
+        and n - 2 RESOLUTION, within the 2(n - 1) bound of every phase; a single-node
+        tree sends nothing.
+
+        Args:
+            comm (MPI.Comm): The communicator.
+            tree_sizes (list): The number of nodes of every tree.
+        """
+        local = np.concatenate([self.state_time, [self.blocked_time], self.messages, self.bytes]).astype(np.float64)
+        table = np.empty((comm.Get_size(), local.size)) if comm.Get_rank() == ROOT else None
+        comm.Gather(local, table, root=ROOT)
+        if comm.Get_rank() != ROOT:
+            return
+
+        nr_states = len(STATE_NAMES)
+        times = table[:, :nr_states + 1]
+        messages = table[:, nr_states + 1:nr_states + 1 + len(MESSAGE_NAMES)].sum(axis=0).astype(np.int64)
+        sizes = table[:, nr_states + 1 + len(MESSAGE_NAMES):].sum(axis=0).astype(np.int64)
+        tree_sizes = np.asarray(tree_sizes, dtype=np.int64)
+        larger = tree_sizes[tree_sizes > 1]
+        expected = [int((tree_sizes - 1).sum()), int(larger.sum()), int((larger - 2).sum())]
+
+        print("Protocol profile: {} nodes in {} trees on {} ranks".format(
+            int(tree_sizes.sum()), tree_sizes.size, comm.Get_size()))
+        print("{:<12}{:>12}{:>12}{:>14}".format("message", "sent", "expected", "bytes"))
+        for name, count, bound, size in zip(MESSAGE_NAMES, messages, expected, sizes):
+            print("{:<12}{:>12}{:>12}{:>14}".format(name, count, bound, size))
+        print("{:<12}{:>12}{:>12}{:>14}".format("total", messages.sum(), sum(expected), sizes.sum()))
+        print("{:<12}{:>12}{:>12}{:>12}{:>14}".format("time (s)", "total", "mean", "max", "slowest rank"))
+        for name, column in zip(STATE_NAMES + ["blocked"], times.T):
+            print("{:<12}{:>12.6f}{:>12.6f}{:>12.6f}{:>14}".format(
+                name, column.sum(), column.mean(), column.max(), int(column.argmax())))
+
+def Run_Single_Node(transport, node, profile=None):
+    """
+    Runs the protocol with one tree node per rank, exchanging one MPI message per protocol message.
+
+    Args:
+        transport (BufferTransport or PickleTransport): The transport of the messages.
+        node (TreeNode): The node of this rank.
+        profile (ProtocolProfile): Records times and messages when given.
+
+    Returns:
+        int: The eccentricity of the node.
+    """
+    def send(dest, tag, value):
+        transport.Send(dest, tag, node.node_id, value)
+
+    if profile is not None:
+        send = profile.Counting(send, lambda dest, tag, value: transport.Send_Bytes(value))
+
+    if node.node_id == ROOT:
+        if profile is None:
+            node.Activate(-1, send)
+        else:
+            profile.Handle(node, node.Activate, -1, send)
+    while node.status != STATUS_ENUM.DONE:
+        if profile is None:
+            source, tag, message = transport.Receive()
+            node.Receive(source, tag, message, send)
+        else:
+            source, tag, message = profile.Blocked(transport.Receive)
+            profile.Handle(node, node.Receive, source, tag, message, send)
+
+    return node.eccentricity
+
+def Run_Node_Block(comm, transport, nodes, boundaries, initiators=(ROOT,), profile=None):
+    """
+    Runs the protocol for a block of tree nodes per rank, in supersteps.
+
+    A superstep delivers the messages between local nodes directly through an
+    in-memory queue until it is empty, then exchanges every message for other ranks in
+    one exchange, with one buffer per destination rank. Messages between two nodes
+    keep their order, as the protocol requires. The run stops when no message is
+    left anywhere.
+
+    Args:
+        comm (MPI.Comm): The communicator.
+        transport (BufferTransport or PickleTransport): The transport of the messages.
+        nodes (list): The TreeNode objects of the block of this rank, in ID order.
+        boundaries (list): First node of the block of every rank, followed by the number of nodes.
+        initiators (list): The node that starts the protocol in every tree.
+        profile (ProtocolProfile): Records times and messages when given.
+
+    Returns:
+        list: The eccentricity of every local node.
     """
-    comm = MPI.COMM_WORLD
     my_rank = comm.Get_rank()
     nr_processes = comm.Get_size()
-    status = MPI.Status()
-    request = MPI.Request()
-
-    # The adjacency matrix representing the graph
-    nodes = [
-        [0, 1, 0, 0, 0, 0],
-        [1, 0, 1, 1, 1, 0],
-        [0, 1, 0, 0, 0, 0],
-        [0, 1, 0, 0, 0, 1],
-        [0, 1, 0, 0, 0, 0],
-        [0, 0, 0, 1, 0, 0]
-    ]
-
-    # Variables initialization
-    distances = [0] * NR_NODES
-    node_status = STATUS_ENUM.AVAILABLE
-    parent = -1
-    nr_neighbors = sum(1 for i in range(nr_processes) if nodes[my_rank][i])
-    temp_nr_neighbors = nr_neighbors
-    finished = FALSE
-    eccentricity = -1
-    neighbors_sum = sum(i for i in range(nr_processes) if nodes[my_rank][i])
-
-    # Main loop
-    while not finished:
-        # ACTIVATION state
-        if node_status == STATUS_ENUM.AVAILABLE:
-            if my_rank == ROOT:
-                for dest in range(nr_processes):
-                    if nodes[my_rank][dest]:
-                        comm.isend(0, dest=dest, tag=MESSAGE_TYPE.ACTIVATE)
-
-                Initialize(distances, nr_processes)
-                if nr_neighbors == 1:
-                    for dest in range(nr_processes):
-                        if nodes[my_rank][dest]:
-                            parent = dest
-
-                    message = Prepare_Message(distances, nr_processes)
-                    comm.isend(message, dest=parent, tag=MESSAGE_TYPE.SATURATION)
-                    node_status = STATUS_ENUM.PROCESSING
-                else:
-                    node_status = STATUS_ENUM.ACTIVE
+    first = boundaries[my_rank]
+    local = deque()
+    outgoing = [[] for _ in range(nr_processes)]
+    sender = -1
+
+    def send(dest, tag, value):
+        owner = Block_Owner(dest, boundaries)
+        if owner == my_rank:
+            local.append((dest, sender, tag, value))
+        else:
+            outgoing[owner].extend((dest, sender, tag, value))
+
+    def exchange():
+        incoming = transport.Exchange(outgoing)
+        return incoming, comm.allreduce(len(incoming))
+
+    if profile is not None:
+        # Messages between two local nodes never reach the network
+        send = profile.Counting(send, lambda dest, tag, value: 0 if Block_Owner(dest, boundaries) == my_rank
+                                else transport.Exchange_Bytes((dest, sender, tag, value)))
+
+    for initiator in initiators:
+        if first <= initiator < first + len(nodes):
+            sender = initiator
+            if profile is None:
+                nodes[initiator - first].Activate(-1, send)
             else:
-                message = comm.recv(source=MPI.ANY_SOURCE, tag=MPI.ANY_TAG, status=status)
-                source = status.Get_source()
-                tag = status.Get_tag()
-
-                if tag == MESSAGE_TYPE.ACTIVATE:
-                    for dest in range(nr_processes):
-                        if nodes[my_rank][dest] and dest != source:
-                            comm.isend(0, dest=dest, tag=MESSAGE_TYPE.ACTIVATE)
-
-                    Initialize(distances, nr_processes)
-                    if nr_neighbors == 1:
-                        parent = source
-                        message = Prepare_Message(distances, nr_processes)
-                        comm.isend(message, dest=parent, tag=MESSAGE_TYPE.SATURATION)
-                        node_status = STATUS_ENUM.PROCESSING
-                    else:
-                        node_status = STATUS_ENUM.ACTIVE
+                profile.Handle(nodes[initiator - first], nodes[initiator - first].Activate, -1, send)
 
-        # ACTIVE STAGE
-        elif node_status == STATUS_ENUM.ACTIVE:
-            message = comm.recv(source=MPI.ANY_SOURCE, tag=MPI.ANY_TAG, status=status)
-            source = status.Get_source()
-            tag = status.Get_tag()
+    while True:
+        while local:
+            dest, source, tag, value = local.popleft()
+            sender = dest
+            if profile is None:
+                nodes[dest - first].Receive(source, tag, value, send)
+            else:
+                profile.Handle(nodes[dest - first], nodes[dest - first].Receive, source, tag, value, send)
 
-            if tag == MESSAGE_TYPE.SATURATION:
-                temp_nr_neighbors -= 1
-                neighbors_sum -= source
+        incoming, pending = exchange() if profile is None else profile.Blocked(exchange)
+        outgoing = [[] for _ in range(nr_processes)]
+        local.extend(zip(*[iter(incoming)] * 4))
+        if pending == 0:
+            break
 
-                Process_Message(distances, message, source)
-                if temp_nr_neighbors == 1:
-                    message = Prepare_Message(distances, nr_processes)
-                    parent = neighbors_sum
-                    comm.isend(message, dest=parent, tag=MESSAGE_TYPE.SATURATION)
-                    node_status = STATUS_ENUM.PROCESSING
+    return [node.eccentricity for node in nodes]
 
-        # PROCESSING STAGE
-        elif node_status == STATUS_ENUM.PROCESSING:
-            message = comm.recv(source=MPI.ANY_SOURCE, tag=MPI.ANY_TAG, status=status)
-            source = status.Get_source()
-            tag = status.Get_tag()
+def Gather_Eccentricities(comm, eccentricities, boundaries):
+    """
+    Gathers the eccentricities of all the blocks into one array on the root with Gatherv.
 
-            if tag == MESSAGE_TYPE.SATURATION:
-                eccentricity = Resolve(distances, nodes, message, my_rank, parent, source, nr_processes, request)
-                message = eccentricity
-                comm.isend(message, dest=parent, tag=MESSAGE_TYPE.RESOLUTION)
-                node_status = STATUS_ENUM.DONE
-            elif tag == MESSAGE_TYPE.RESOLUTION:
-                eccentricity = Resolve(distances, nodes, message, my_rank, parent, source, nr_processes, request)
-                node_status = STATUS_ENUM.DONE
-
-        # DONE State
-        elif node_status == STATUS_ENUM.DONE:
-            print("r({}) = {}".format(my_rank, eccentricity))
-            finished = TRUE
+    The blocks are contiguous and in rank order, so the array is indexed by node ID.
+
+    Args:
+        comm (MPI.Comm): The communicator.
+        eccentricities (numpy.ndarray): The int32 eccentricities of the local nodes.
+        boundaries (list): First node of the block of every rank, followed by the number of nodes.
+
+    Returns:
+        numpy.ndarray: The eccentricity of every node on the root, None on the other ranks.
+    """
+    if comm.Get_rank() != ROOT:
+        comm.Gatherv(eccentricities, None, root=ROOT)
+        return None
+
+    counts = np.diff(boundaries).tolist()
+    result = np.empty(boundaries[-1], dtype=np.int32)
+    comm.Gatherv(eccentricities, [result, counts, MPI.INT32_T], root=ROOT)
+    return result
+
+def Tree_Metrics(comm, first, eccentricities):
+    """
+    Computes the diameter, radius and center of the tree with reductions to the root.
+
+    The diameter is a MAX reduction. The radius and center come from one MINLOC
+    reduction of two (eccentricity, node) pairs: the second pair holds the negated node
+    ID, so it yields the center node of largest ID. A tree has one or two center nodes,
+    so these two are the whole center.
+
+    Args:
+        comm (MPI.Comm): The communicator.
+        first (int): The ID of the first local node.
+        eccentricities (numpy.ndarray): The int32 eccentricities of the local nodes.
+
+    Returns:
+        tuple: (diameter, radius, list of center nodes) on the root, None on the other ranks.
+    """
+    local_max = np.array([eccentricities.max()], dtype=np.int32)
+    diameter = np.zeros(1, dtype=np.int32)
+    comm.Reduce(local_max, diameter, op=MPI.MAX, root=ROOT)
+
+    lowest = int(eccentricities.argmin())
+    highest = len(eccentricities) - 1 - int(eccentricities[::-1].argmin())
+    local_pairs = np.array([[eccentricities[lowest], first + lowest],
+                            [eccentricities[highest], -(first + highest)]], dtype=np.intc)
+    pairs = np.zeros_like(local_pairs)
+    comm.Reduce([local_pairs, MPI.TWOINT], [pairs, MPI.TWOINT], op=MPI.MINLOC, root=ROOT)
+
+    if comm.Get_rank() != ROOT:
+        return None
+    center = sorted({int(pairs[0, 1]), -int(pairs[1, 1])})
+    return int(diameter[0]), int(pairs[0, 0]), center
+
+def Forest_Metrics(eccentricities, tree_offsets):
+    """
+    Computes the diameter, radius and center of every tree of a forest.
+
+    Args:
+        eccentricities (numpy.ndarray): The eccentricity of every node.
+        tree_offsets (numpy.ndarray): The first node of every tree followed by the number of nodes.
+
+    Returns:
+        tuple: (diameters, radii, centers) arrays, one row per tree; centers holds the one or
+        two center nodes of every tree, padded with -1.
+    """
+    starts = tree_offsets[:-1]
+    diameters = np.maximum.reduceat(eccentricities, starts)
+    radii = np.minimum.reduceat(eccentricities, starts)
+    trees = np.repeat(np.arange(starts.size), np.diff(tree_offsets))
+    center_nodes = np.flatnonzero(eccentricities == radii[trees])
+    center_trees = trees[center_nodes]
+
+    # The center nodes come in node order, so a tree's second center follows its first
+    centers = np.full((starts.size, 2), -1, dtype=np.int32)
+    second = np.zeros(center_nodes.size, dtype=bool)
+    second[1:] = center_trees[1:] == center_trees[:-1]
+    centers[center_trees[~second], 0] = center_nodes[~second]
+    centers[center_trees[second], 1] = center_nodes[second]
+    return diameters, radii, centers
+
+def Write_Eccentricities(path, eccentricities, diameter, radius, center, tree_offsets=None):
+    """
+    Writes the results as uncompressed NumPy columns (.npz): the int32 eccentricity of
+    every node, indexed by node ID, and the tree metrics.
+
+    Args:
+        path (str): The output file.
+        eccentricities (numpy.ndarray): The eccentricity of every node.
+        diameter (int or numpy.ndarray): The diameter of the tree, or of every tree of a forest.
+        radius (int or numpy.ndarray): The radius of the tree, or of every tree of a forest.
+        center (list or numpy.ndarray): The center nodes, or the centers of every tree (see Forest_Metrics).
+        tree_offsets (numpy.ndarray): The first node of every tree of a forest followed by the number of nodes.
+    """
+    columns = {"eccentricity": eccentricities, "diameter": diameter, "radius": radius,
+               "center": np.asarray(center, dtype=np.int32)}
+    if tree_offsets is not None:
+        columns["tree_offsets"] = tree_offsets
+    with open(path, "wb") as output:
+        np.savez(output, **columns)
+
+def main(comm=None, argv=None):
+    """
+    The main function for all the processes.
+
+    Any communicator with the mpi4py interface can be given instead of MPI.COMM_WORLD,
+    such as the in-process ranks of local_comm.py; MPI is then left initialized.
+
+    With as many ranks as tree nodes, every rank runs one node; with fewer ranks,
+    every rank runs a contiguous block of nodes (see Run_Node_Block).
+
+    The eccentricities are gathered on the root, which prints them in node order, or
+    writes them to a file with --output, followed by the diameter, radius and center.
+
+    With --forest, the topology file holds a batch of trees, each on a contiguous range
+    of node IDs: the trees are packed onto the ranks, and all their protocols run
+    together in the supersteps of Run_Node_Block, each started by the first node of
+    its tree.
+
+    Usage: mpiexec -n <number of ranks> python Eccentricity.py [tree.topo] [--transport buffer|pickle]
+                                                                [--output results.npz] [--profile] [--forest]
+    """
+    parser = argparse.ArgumentParser(description="Eccentricities of the nodes of a tree by saturation")
+    parser.add_argument("topology", nargs="?", help="Binary topology file (defaults to EXAMPLE_TREE)")
+    parser.add_argument("--transport", choices=sorted(TRANSPORTS), default="buffer",
+                        help="buffer: preposted int64 buffers (default); pickle: one pickled int per message")
+    parser.add_argument("--output", help="Write the eccentricities and metrics to this .npz file instead of printing")
+    parser.add_argument("--profile", action="store_true",
+                        help="Report the time per state and the messages and bytes per message type")
+    parser.add_argument("--forest", action="store_true",
+                        help="The topology file is a batch of trees on contiguous ranges of node IDs")
+    args = parser.parse_args(argv)
+
+    finalize = comm is None
+    comm = MPI.COMM_WORLD if comm is None else comm
+    my_rank = comm.Get_rank()
+    nr_processes = comm.Get_size()
+    path = args.topology
+
+    # Every rank keeps the neighbors of its own nodes only, with one distance per neighbor
+    nr_nodes = len(EXAMPLE_TREE) if path is None else load_topology(path).num_nodes
+    if nr_processes > nr_nodes:
+        if my_rank == ROOT:
+            print(f"The tree has {nr_nodes} nodes: run it with at most mpiexec -n {nr_nodes}")
+        if finalize:
+            MPI.Finalize()
+        return
+
+    tree_offsets = np.array([0, nr_nodes])
+    if args.forest:
+        tree_offsets = None if path is None else forest_offsets(path)
+        if tree_offsets is None:
+            if my_rank == ROOT:
+                print("--forest needs a topology file whose trees occupy contiguous ranges of node IDs")
+            if finalize:
+                MPI.Finalize()
+            return
+        boundaries = Forest_Boundaries(tree_offsets, nr_processes)
+    else:
+        boundaries = Block_Boundaries(nr_processes, nr_nodes)
+
+    first, last = boundaries[my_rank], boundaries[my_rank + 1]
+    nr_nodes, neighbor_lists = Load_Neighbors(path, first, last)
+    nodes = [TreeNode(first + i, neighbors) for i, neighbors in enumerate(neighbor_lists)]
+
+    transport = TRANSPORTS[args.transport](comm)
+    profile = ProtocolProfile() if args.profile else None
+    if nr_processes == nr_nodes and not args.forest:
+        eccentricities = [Run_Single_Node(transport, nodes[0], profile)]
+    else:
+        eccentricities = Run_Node_Block(comm, transport, nodes, boundaries, tree_offsets[:-1].tolist(), profile)
+    transport.Close()  # No send may still be pending at the barrier
+
+    # DONE State
+    done = MPI.Wtime()
+    eccentricities = np.array(eccentricities, dtype=np.int32)
+    all_eccentricities = Gather_Eccentricities(comm, eccentricities, boundaries)
+    metrics = None if args.forest else Tree_Metrics(comm, first, eccentricities)
+    if profile is not None:
+        profile.state_time[STATUS_ENUM.DONE] += MPI.Wtime() - done
+    if my_rank == ROOT and args.forest:
+        diameters, radii, centers = Forest_Metrics(all_eccentricities, tree_offsets)
+        if args.output is not None:
+            Write_Eccentricities(args.output, all_eccentricities, diameters, radii, centers, tree_offsets)
+        for tree, (start, end) in enumerate(zip(tree_offsets[:-1].tolist(), tree_offsets[1:].tolist())):
+            center = [node for node in centers[tree].tolist() if node >= 0]
+            print("tree {}: nodes {}-{}, diameter = {}, radius = {}, center = {}".format(
+                tree, start, end - 1, diameters[tree], radii[tree], center))
+            if args.output is None:
+                for node_id in range(start, end):
+                    print("r({}) = {}".format(node_id, all_eccentricities[node_id]))
+    elif my_rank == ROOT:
+        diameter, radius, center = metrics
+        if args.output is not None:
+            Write_Eccentricities(args.output, all_eccentricities, diameter, radius, center)
+        else:
+            for node_id, eccentricity in enumerate(all_eccentricities.tolist()):
+                print("r({}) = {}".format(node_id, eccentricity))
+        print("diameter = {}, radius = {}, center = {}".format(diameter, radius, center))
+    if profile is not None:
+        profile.Report(comm, np.diff(tree_offsets))
 
     comm.barrier()  # Ensure all processes finish before finalizing MPI
-    MPI.Finalize()
+    if finalize:
+        MPI.Finalize()
 
 if __name__ == "__main__":
     main()
@@ -287,4 +1051,4 @@ Resolution Phase:
     Process 0 enters the processing stage, sends a resolution message to its neighbors, and finishes with an eccentricity of 3.
     Resolution Phase:
     Process 3 enters the processing stage, sends a resolution message to its neighbors, and finishes with an eccentricity of 2.
-'''
\ No newline at end of file
+'''
\ No newline at end of file
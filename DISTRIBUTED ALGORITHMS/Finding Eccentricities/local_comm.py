@@ -0,0 +1,415 @@
+import argparse
+import importlib.util
+import threading
+from collections import deque
+from functools import reduce
+
+import numpy as np
+from mpi4py import MPI
+
+class LocalBarrier:
+    def __init__(self, size):
+        """
+        Barrier that releases the waiting ranks one after the other, each one waking up
+        the next. threading.Barrier wakes them all at once, and thousands of threads
+        then fight for the GIL, which makes every barrier several times slower.
+
+        Args:
+            size (int): The number of ranks.
+        """
+        self.size = size
+        self.lock = threading.Lock()
+        self.gates = []
+        self.following = {}
+        self.aborted = False
+
+    def wait(self):
+        """
+        Waits until every rank called wait.
+        """
+        gate = threading.Lock()
+        gate.acquire()
+        with self.lock:
+            if self.aborted:
+                raise RuntimeError("Another rank failed")
+            self.gates.append(gate)
+            if len(self.gates) < self.size:
+                gates = None
+            else:
+                gates, self.gates = self.gates[:-1], []
+                self.following = dict(zip(gates, gates[1:] + [None]))
+
+        if gates is not None:
+            # Last arrival: start the chain of wake-ups
+            if gates:
+                gates[0].release()
+            return
+
+        gate.acquire()
+        if self.aborted:
+            raise RuntimeError("Another rank failed")
+        following = self.following.pop(gate)
+        if following is not None:
+            following.release()
+
+    def abort(self):
+        """
+        Releases every waiting rank with an error.
+        """
+        with self.lock:
+            self.aborted = True
+            gates, self.gates = self.gates, []
+        for gate in gates:
+            gate.release()
+
+class LocalWorld:
+    def __init__(self, size):
+        """
+        Shared state of a group of in-process ranks: one message queue per rank, guarded
+        by a condition that wakes up the rank when a message arrives, and a barrier and
+        two rows of one slot per rank for the collective operations.
+
+        Args:
+            size (int): The number of ranks.
+        """
+        self.size = size
+        self.inboxes = [deque() for _ in range(size)]
+        self.conditions = [threading.Condition() for _ in range(size)]
+        self.barrier = LocalBarrier(size)
+        self.slots = [[None] * size, [None] * size]
+        self.aborted = False
+
+    def Abort(self):
+        """
+        Wakes up every waiting rank with an error, after a rank failed.
+        """
+        self.aborted = True
+        self.barrier.abort()
+        for condition in self.conditions:
+            with condition:
+                condition.notify_all()
+
+class LocalRequest:
+    def __init__(self, receive=None):
+        """
+        Request of a non-blocking operation of a LocalComm.
+
+        Sends copy their data into the queue of the destination at once, so their
+        requests are complete from the start; a receive request takes its message from
+        the queue when it is waited for or tested. Like in MPI, Testsome and Waitsome
+        report every request once, after which it is inactive.
+
+        Args:
+            receive (callable): receive(block) completes a receive and returns True, or returns
+                False if block is False and no message is there yet; None for a send.
+        """
+        self.receive = receive
+        self.done = receive is None
+        self.active = True
+
+    def Test(self):
+        """
+        Completes the request if possible.
+
+        Returns:
+            bool: True if the request is complete.
+        """
+        if not self.done:
+            self.done = self.receive(False)
+        return self.done
+
+    def Wait(self):
+        """
+        Waits for the request to complete.
+        """
+        if not self.done:
+            self.done = self.receive(True)
+
+    def Cancel(self):
+        """
+        Cancels a pending receive.
+        """
+        self.done = True
+
+    @classmethod
+    def Testsome(cls, requests):
+        """
+        Completes the requests that can be completed now.
+
+        Returns:
+            list: The indices of the requests completed by this call.
+        """
+        completed = []
+        for i, request in enumerate(requests):
+            if request.active and request.Test():
+                request.active = False
+                completed.append(i)
+        return completed
+
+    @classmethod
+    def Waitsome(cls, requests):
+        """
+        Waits until at least one request is complete.
+
+        Returns:
+            list: The indices of the requests completed by this call.
+        """
+        completed = cls.Testsome(requests)
+        pending = [i for i, request in enumerate(requests) if request.active]
+        if not completed and pending:
+            requests[pending[0]].Wait()
+            requests[pending[0]].active = False
+            completed = [pending[0]]
+        return completed
+
+    @classmethod
+    def Waitall(cls, requests):
+        """
+        Waits for all the requests.
+        """
+        for request in requests:
+            request.Wait()
+
+def Buffer(spec):
+    """
+    Extracts the array of an mpi4py buffer specification such as [array, MPI.INT64_T].
+
+    Args:
+        spec (object): An array, or a list or tuple starting with the array.
+
+    Returns:
+        numpy.ndarray: The array.
+    """
+    return np.asarray(spec[0] if isinstance(spec, (list, tuple)) else spec)
+
+def Reduce_Values(values, op):
+    """
+    Combines the contributions of all ranks to a reduction.
+
+    Args:
+        values (list): One value (number, object or array) per rank, in rank order.
+        op (MPI.Op): MPI.SUM, MPI.MAX, MPI.MIN, MPI.MINLOC or MPI.MAXLOC. The LOC
+            operations combine arrays of (value, index) pairs along their last axis.
+
+    Returns:
+        object: The reduced value.
+    """
+    if op == MPI.MINLOC or op == MPI.MAXLOC:
+        pairs = np.stack([np.asarray(value) for value in values])
+        sign = 1 if op == MPI.MINLOC else -1
+        # Best value first, lowest index among equal values
+        order = np.lexsort((pairs[..., 1], sign * pairs[..., 0]), axis=0)
+        return np.take_along_axis(pairs, order[:1, ..., None], axis=0)[0]
+    if isinstance(values[0], np.ndarray):
+        combine = [(MPI.SUM, np.add), (MPI.MAX, np.maximum), (MPI.MIN, np.minimum)]
+    else:
+        combine = [(MPI.SUM, lambda a, b: a + b), (MPI.MAX, max), (MPI.MIN, min)]
+    for known, function in combine:
+        if op == known:
+            return reduce(function, values)
+    raise NotImplementedError("LocalComm does not implement this reduction")
+
+class LocalComm:
+    def __init__(self, world, rank):
+        """
+        Communicator of one in-process rank, implementing the subset of mpi4py used by
+        Eccentricity.py: point-to-point messages (isend, recv with ANY_SOURCE and ANY_TAG,
+        Isend, Irecv), barrier, and the collectives alltoall, allreduce, Alltoall,
+        Alltoallv, Gather, Gatherv and Reduce.
+
+        Messages are delivered in the order they were sent, between any two ranks.
+        Objects sent with isend are passed by reference, so a sender must not modify them
+        afterwards; buffers sent with Isend are copied.
+
+        Args:
+            world (LocalWorld): The state shared by the ranks.
+            rank (int): The rank of this communicator.
+        """
+        self.world = world
+        self.rank = rank
+        self.collectives = 0
+
+    def Get_rank(self):
+        return self.rank
+
+    def Get_size(self):
+        return self.world.size
+
+    def Deliver(self, dest, tag, message):
+        """
+        Appends a message to the queue of a rank and wakes it up.
+
+        Args:
+            dest (int): The destination rank.
+            tag (int): The tag of the message.
+            message (object): The message.
+        """
+        condition = self.world.conditions[dest]
+        with condition:
+            self.world.inboxes[dest].append((self.rank, tag, message))
+            condition.notify()
+
+    def Take(self, source, tag, block):
+        """
+        Removes the first message of this rank matching a source and a tag.
+
+        Args:
+            source (int): The source rank, or MPI.ANY_SOURCE.
+            tag (int): The tag, or MPI.ANY_TAG.
+            block (bool): Whether to wait for a matching message.
+
+        Returns:
+            tuple: (source, tag, message), or None if block is False and nothing matches.
+        """
+        inbox = self.world.inboxes[self.rank]
+        condition = self.world.conditions[self.rank]
+        with condition:
+            while True:
+                for position, (sender, sent_tag, message) in enumerate(inbox):
+                    if source in (MPI.ANY_SOURCE, sender) and tag in (MPI.ANY_TAG, sent_tag):
+                        del inbox[position]
+                        return sender, sent_tag, message
+                if not block:
+                    return None
+                if self.world.aborted:
+                    raise RuntimeError("Another rank failed")
+                condition.wait()
+
+    def isend(self, obj, dest, tag=0):
+        self.Deliver(dest, tag, obj)
+        return LocalRequest()
+
+    def recv(self, buf=None, source=MPI.ANY_SOURCE, tag=MPI.ANY_TAG, status=None):
+        sender, sent_tag, message = self.Take(source, tag, True)
+        if status is not None:
+            status.Set_source(sender)
+            status.Set_tag(sent_tag)
+        return message
+
+    def Isend(self, buf, dest, tag=0):
+        self.Deliver(dest, tag, Buffer(buf).copy())
+        return LocalRequest()
+
+    def Irecv(self, buf, source=MPI.ANY_SOURCE, tag=MPI.ANY_TAG):
+        target = Buffer(buf)
+
+        def receive(block):
+            message = self.Take(source, tag, block)
+            if message is None:
+                return False
+            np.copyto(target, message[2].reshape(target.shape))
+            return True
+
+        return LocalRequest(receive)
+
+    def Exchange(self, value):
+        """
+        Gives every rank the values of all the ranks.
+
+        Consecutive collectives write alternate rows of slots, so one barrier is enough:
+        no rank can write a row again before every rank went through the next barrier,
+        after reading it.
+
+        Args:
+            value (object): The value of this rank.
+
+        Returns:
+            list: The values of all the ranks, in rank order.
+        """
+        slots = self.world.slots[self.collectives % 2]
+        self.collectives += 1
+        slots[self.rank] = value
+        self.world.barrier.wait()
+        return list(slots)
+
+    def barrier(self):
+        self.world.barrier.wait()
+
+    def allreduce(self, sendobj, op=MPI.SUM):
+        return Reduce_Values(self.Exchange(sendobj), op)
+
+    def alltoall(self, sendobj):
+        return [values[self.rank] for values in self.Exchange(sendobj)]
+
+    def Alltoall(self, sendbuf, recvbuf):
+        values = self.Exchange(Buffer(sendbuf).copy())
+        received = Buffer(recvbuf)
+        for rank, value in enumerate(values):
+            received[rank] = value[self.rank]
+
+    def Alltoallv(self, sendbuf, recvbuf):
+        data, counts = Buffer(sendbuf), sendbuf[1]
+        chunks = np.split(data, np.cumsum(counts)[:-1])
+        values = self.Exchange([chunk.copy() for chunk in chunks])
+        received = Buffer(recvbuf)
+        received[:] = np.concatenate([value[self.rank] for value in values])
+
+    def Gather(self, sendbuf, recvbuf, root=0):
+        values = self.Exchange(Buffer(sendbuf).copy())
+        if self.rank == root:
+            received = Buffer(recvbuf)
+            received[...] = np.stack(values).reshape(received.shape)
+
+    def Gatherv(self, sendbuf, recvbuf, root=0):
+        values = self.Exchange(Buffer(sendbuf).copy())
+        if self.rank == root:
+            received = Buffer(recvbuf)
+            received[:] = np.concatenate(values)
+
+    def Reduce(self, sendbuf, recvbuf, op=MPI.SUM, root=0):
+        values = self.Exchange(Buffer(sendbuf).copy())
+        if self.rank == root:
+            Buffer(recvbuf)[...] = Reduce_Values(values, op)
+
+def Run_Ranks(size, target, *args):
+    """
+    Runs a function on in-process ranks, one thread per rank, like mpiexec -n size would.
+
+    Args:
+        size (int): The number of ranks.
+        target (callable): target(comm, *args) runs on every rank with its LocalComm.
+        *args: The other arguments of target.
+
+    Returns:
+        list: The results of target, in rank order.
+    """
+    world = LocalWorld(size)
+    results = [None] * size
+    errors = []
+
+    def run(rank):
+        try:
+            results[rank] = target(LocalComm(world, rank), *args)
+        except BaseException as error:
+            errors.append(error)
+            world.Abort()
+
+    threads = [threading.Thread(target=run, args=(rank,), daemon=True) for rank in range(size)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    if errors:
+        raise errors[0]
+    return results
+
+def main():
+    """
+    Runs the main(comm, argv) function of a script on in-process ranks.
+
+    Usage: python local_comm.py -n <number of ranks> <script.py> [script arguments...]
+    """
+    parser = argparse.ArgumentParser(description="Run an MPI script on in-process ranks")
+    parser.add_argument("-n", type=int, required=True, help="Number of ranks")
+    parser.add_argument("script", help="Script with a main(comm=None, argv=None) function")
+    parser.add_argument("arguments", nargs=argparse.REMAINDER, help="Arguments of the script")
+    args = parser.parse_args()
+
+    spec = importlib.util.spec_from_file_location("local_script", args.script)
+    script = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(script)
+    threading.stack_size(1 << 20)  # Thousands of ranks need small thread stacks
+    Run_Ranks(args.n, script.main, args.arguments)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,113 @@
+import argparse
+
+from mpi4py import MPI
+
+from Eccentricity import (EXAMPLE_TREE, MESSAGE_TYPE, ROOT, TRANSPORTS, Block_Boundaries, Load_Neighbors, Run_Node_Block,
+                          Run_Single_Node, TreeNode, load_topology)
+
+def Counting(transport_class):
+    """
+    Extends a transport class with a count of the messages it sends.
+
+    Args:
+        transport_class (type): BufferTransport or PickleTransport.
+
+    Returns:
+        type: The subclass, whose instances count their messages in self.messages.
+    """
+    class CountingTransport(transport_class):
+        messages = 0
+
+        def Send(self, dest, tag, source, value):
+            self.messages += 1
+            super().Send(dest, tag, source, value)
+
+        def Exchange(self, outgoing):
+            self.messages += sum(len(numbers) for numbers in outgoing) // 4
+            return super().Exchange(outgoing)
+
+    return CountingTransport
+
+def Ping_Pong(comm, transport, repetitions):
+    """
+    Measures the round-trip time of one protocol message between ranks 0 and 1.
+
+    Args:
+        comm (MPI.Comm): The communicator.
+        transport (BufferTransport or PickleTransport): The transport to measure.
+        repetitions (int): Number of round trips.
+
+    Returns:
+        float: The mean one-way latency in microseconds (on rank 0).
+    """
+    my_rank = comm.Get_rank()
+    comm.barrier()
+    start = MPI.Wtime()
+    for repetition in range(repetitions):
+        if my_rank == 0:
+            transport.Send(1, MESSAGE_TYPE.SATURATION, 0, repetition)
+            transport.Receive()
+        elif my_rank == 1:
+            transport.Receive()
+            transport.Send(0, MESSAGE_TYPE.SATURATION, 1, repetition)
+    return (MPI.Wtime() - start) / (2 * repetitions) * 1e6
+
+def Run_Protocol(comm, transport, path):
+    """
+    Runs the eccentricity protocol once and times it.
+
+    Args:
+        comm (MPI.Comm): The communicator.
+        transport (BufferTransport or PickleTransport): The transport of the messages.
+        path (str): The topology file, or None for EXAMPLE_TREE.
+
+    Returns:
+        tuple: (elapsed seconds, number of MPI-level messages over all ranks).
+    """
+    nr_processes = comm.Get_size()
+    nr_nodes = len(EXAMPLE_TREE) if path is None else load_topology(path).num_nodes
+    boundaries = Block_Boundaries(nr_processes, nr_nodes)
+    first, last = boundaries[comm.Get_rank()], boundaries[comm.Get_rank() + 1]
+    nr_nodes, neighbor_lists = Load_Neighbors(path, first, last)
+    nodes = [TreeNode(first + i, neighbors) for i, neighbors in enumerate(neighbor_lists)]
+
+    comm.barrier()
+    start = MPI.Wtime()
+    if nr_processes == nr_nodes:
+        Run_Single_Node(transport, nodes[0])
+    else:
+        Run_Node_Block(comm, transport, nodes, boundaries)
+    comm.barrier()
+    elapsed = MPI.Wtime() - start
+    return elapsed, comm.allreduce(transport.messages)
+
+def main(comm=None, argv=None):
+    """
+    Compares the buffer and pickle transports of Eccentricity.py, on MPI.COMM_WORLD or
+    on the given communicator (see local_comm.py).
+
+    Usage: mpiexec -n <number of ranks> python transport_benchmark.py [tree.topo] [--repetitions R]
+    """
+    parser = argparse.ArgumentParser(description="Latency and throughput of the eccentricity transports")
+    parser.add_argument("topology", nargs="?", help="Binary topology file (defaults to EXAMPLE_TREE)")
+    parser.add_argument("--repetitions", type=int, default=10000, help="Round trips of the ping-pong test")
+    args = parser.parse_args(argv)
+
+    finalize = comm is None
+    comm = MPI.COMM_WORLD if comm is None else comm
+    my_rank = comm.Get_rank()
+    for name in sorted(TRANSPORTS):
+        transport = Counting(TRANSPORTS[name])(comm)
+        latency = Ping_Pong(comm, transport, args.repetitions) if comm.Get_size() > 1 else float("nan")
+        transport.messages = 0
+        elapsed, messages = Run_Protocol(comm, transport, args.topology)
+        transport.Close()
+        if my_rank == ROOT:
+            print("{:<7} latency {:8.2f} us   protocol {:8.3f} s   {:>10} messages   {:12.0f} messages/s".format(
+                name, latency, elapsed, messages, messages / elapsed))
+
+    if finalize:
+        MPI.Finalize()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,295 @@
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+from scipy.sparse import csr_matrix
+from scipy.sparse.csgraph import breadth_first_order, dijkstra
+
+# Trees with fewer nodes per level on average are deep: their levels are not walked one by one
+MIN_LEVEL_WIDTH = 256
+
+# The binary topology format is shared by the scripts of every algorithm folder
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "Topology"))
+from topology_file import forest_offsets, load_topology
+
+def Forest_Graph(offsets, neighbors, roots=()):
+    """
+    Wraps the CSR arrays of a forest into a SciPy sparse matrix for its C traversals.
+
+    Args:
+        offsets (numpy.ndarray): CSR offsets of the forest.
+        neighbors (numpy.ndarray): CSR neighbors of the forest.
+        roots (array_like): If not empty, an extra node n is added with an edge to every
+            root, so that a single-source traversal from it covers the whole forest.
+
+    Returns:
+        scipy.sparse.csr_matrix: The adjacency matrix.
+    """
+    nr_nodes = len(offsets) - 1
+    roots = np.asarray(roots, dtype=np.int64)
+    offsets = np.asarray(offsets, dtype=np.int64)
+    if roots.size:
+        neighbors = np.concatenate([np.asarray(neighbors, dtype=np.int64), roots])
+        offsets = np.append(offsets, len(neighbors))
+        nr_nodes += 1
+    return csr_matrix((np.ones(len(neighbors), dtype=np.int8), neighbors, offsets), shape=(nr_nodes, nr_nodes))
+
+def Check_Forest(nr_nodes, nr_edges, roots):
+    """
+    Checks the edge count of a forest with one tree per root; reaching every node from
+    the roots then proves that the graph is such a forest.
+
+    Args:
+        nr_nodes (int): The number of nodes.
+        nr_edges (int): The number of CSR entries, twice the number of edges.
+        roots (numpy.ndarray): The root of every tree.
+
+    Raises:
+        ValueError: If the counts do not match, or a root is repeated.
+    """
+    if nr_edges != 2 * (nr_nodes - roots.size):
+        raise ValueError("A forest of {} trees on {} nodes has {} edges, not {}".format(
+            roots.size, nr_nodes, nr_nodes - roots.size, nr_edges // 2))
+    if np.unique(roots).size != roots.size:
+        raise ValueError("Every tree needs its own root")
+
+def Bfs_Parents(offsets, neighbors, roots):
+    """
+    Runs SciPy's breadth_first_order, in C, from an extra node linked to every root.
+
+    Args:
+        offsets (numpy.ndarray): CSR offsets of the tree.
+        neighbors (numpy.ndarray): CSR neighbors of the tree.
+        roots (numpy.ndarray): The root of every tree.
+
+    Returns:
+        tuple: (order, parent_position, graph): the nodes in BFS order, the position in the
+        order of the parent of every node of the order (-1 for the roots), and the graph
+        with the extra node n.
+
+    Raises:
+        ValueError: If the graph is not a forest with exactly one root per tree.
+    """
+    nr_nodes = len(offsets) - 1
+    Check_Forest(nr_nodes, len(neighbors), roots)
+    graph = Forest_Graph(offsets, neighbors, roots)
+    order, predecessors = breadth_first_order(graph, nr_nodes, directed=True, return_predecessors=True)
+    order = order[1:].astype(np.int64)
+    if order.size != nr_nodes:
+        raise ValueError("The roots do not reach every node exactly once")
+
+    position = np.empty(nr_nodes + 1, dtype=np.int64)
+    position[order] = np.arange(nr_nodes)
+    position[nr_nodes] = -1
+    return order, position[predecessors[order]], graph
+
+def Level_Offsets(parent_position, nr_roots):
+    """
+    Splits a BFS order into levels, one NumPy call per level.
+
+    The parent positions never decrease along a BFS order, so the next level starts at
+    the first node whose parent lies in the current level. This is cheap for shallow
+    trees only: the walk gives up after one level per MIN_LEVEL_WIDTH nodes.
+
+    Args:
+        parent_position (numpy.ndarray): The parent positions of a BFS order.
+        nr_roots (int): The number of roots, which open the order.
+
+    Returns:
+        numpy.ndarray: The start of every level in the order, followed by n, or None when
+        the tree is deeper than the walk allows.
+    """
+    nr_nodes = parent_position.size
+    max_levels = max(nr_nodes // MIN_LEVEL_WIDTH, 64)
+    level_offsets = [0, nr_roots]
+    while level_offsets[-1] < nr_nodes:
+        if len(level_offsets) > max_levels:
+            return None
+        level_offsets.append(int(np.searchsorted(parent_position, level_offsets[-1])))
+    return np.array(level_offsets, dtype=np.int64)
+
+def Bfs_Order(offsets, neighbors, roots=(0,)):
+    """
+    Orders the nodes of a tree, or of a forest with one root per tree, level by level.
+
+    The traversal runs in C (see Bfs_Parents). The levels come from Level_Offsets for
+    shallow trees, and otherwise from the depth of every node, computed by a SciPy
+    traversal in C as well, so the cost does not grow with the depth of the trees. The
+    children of a node are contiguous in the order, and follow the order of their parents.
+
+    Args:
+        offsets (numpy.ndarray): CSR offsets of the tree.
+        neighbors (numpy.ndarray): CSR neighbors of the tree.
+        roots (array_like): The root of every tree.
+
+    Returns:
+        tuple: (order, parent_position, level_offsets): the nodes in BFS order, the position
+        in the order of the parent of every node of the order (-1 for the roots), and the
+        start of every level in the order, followed by n.
+
+    Raises:
+        ValueError: If the graph is not a forest with exactly one root per tree.
+    """
+    roots = np.asarray(roots, dtype=np.int64)
+    order, parent_position, graph = Bfs_Parents(offsets, neighbors, roots)
+    level_offsets = Level_Offsets(parent_position, roots.size)
+    if level_offsets is None:
+        # Deep tree: few nodes per level, so the heap of the traversal stays small
+        depth = dijkstra(graph, directed=True, indices=order.size, unweighted=True)[order].astype(np.int64) - 1
+        level_offsets = np.searchsorted(depth, np.arange(depth[-1] + 2))
+    return order, parent_position, level_offsets
+
+def Farthest_Nodes(distances, trees, roots):
+    """
+    Finds, in every tree of a forest, a node farthest from the sources of a traversal.
+
+    Args:
+        distances (numpy.ndarray): Distance of every node to the source of its tree.
+        trees (numpy.ndarray): The root of the tree of every node.
+        roots (numpy.ndarray): The root of every tree.
+
+    Returns:
+        numpy.ndarray: One farthest node per tree, in the order of roots.
+    """
+    largest = np.full(len(distances), -1.0)
+    np.maximum.at(largest, trees, distances)
+    candidates = np.flatnonzero(distances == largest[trees])
+    farthest = np.empty(len(distances), dtype=np.int64)
+    farthest[trees[candidates]] = candidates
+    return farthest[roots]
+
+def Diameter_Eccentricities(offsets, neighbors, roots):
+    """
+    Computes the eccentricities of a forest from the endpoints of a diameter of every tree.
+
+    In a tree, the farthest node from any node is an endpoint of a diameter, and the
+    eccentricity of a node is its larger distance to the two endpoints (a, b) of one
+    diameter. Three multi-source SciPy traversals in C cover all the trees at once: from
+    the roots to find a, from a to find b and the distances to a, from b for the distances
+    to b. Their heaps stay small on deep trees, where the level passes are slow.
+
+    Args:
+        offsets (numpy.ndarray): CSR offsets of the forest.
+        neighbors (numpy.ndarray): CSR neighbors of the forest.
+        roots (numpy.ndarray): The root of every tree.
+
+    Returns:
+        numpy.ndarray: The int32 eccentricity of every node.
+    """
+    graph = Forest_Graph(offsets, neighbors)
+    from_roots, _, trees = dijkstra(graph, directed=True, indices=roots, unweighted=True,
+                                    min_only=True, return_predecessors=True)
+    trees = trees.astype(np.int64)
+    first_ends = Farthest_Nodes(from_roots, trees, roots)
+    from_first = dijkstra(graph, directed=True, indices=first_ends, unweighted=True, min_only=True)
+    # Every tree keeps its root as label, whichever source the traversal starts from
+    second_ends = Farthest_Nodes(from_first, trees, roots)
+    from_second = dijkstra(graph, directed=True, indices=second_ends, unweighted=True, min_only=True)
+    return np.maximum(from_first, from_second).astype(np.int32)
+
+def Tree_Eccentricities(offsets, neighbors, roots=(0,)):
+    """
+    Computes the eccentricity of every node of a tree (or forest) sequentially, with
+    the values the saturation protocol of Eccentricity.py computes.
+
+    The bottom-up pass runs over the levels from the deepest one. It keeps, for every
+    node, the two largest heights of its child subtrees and the child that gives the
+    largest, like the SATURATION messages do. The top-down pass then reroots the tree:
+    a child reaches 1 + the longest path from its parent that does not come back through
+    the child, which is the parent's own upward path, or the height through its best
+    other child, like the RESOLUTION messages do.
+
+    Both passes work on the positions of the nodes in BFS order rather than on their
+    IDs: a level is then a slice, and the parents of a level a sorted slice of the
+    previous one, so every vectorized operation reads memory almost sequentially. A
+    pass costs one NumPy step per level, so trees with fewer than MIN_LEVEL_WIDTH nodes
+    per level on average go through Diameter_Eccentricities instead.
+
+    Args:
+        offsets (numpy.ndarray): CSR offsets of the tree.
+        neighbors (numpy.ndarray): CSR neighbors of the tree.
+        roots (array_like): The root of every tree.
+
+    Returns:
+        numpy.ndarray: The int32 eccentricity of every node.
+
+    Raises:
+        ValueError: If the graph is not a forest with exactly one root per tree.
+    """
+    roots = np.asarray(roots, dtype=np.int64)
+    order, parent_position, _ = Bfs_Parents(offsets, neighbors, roots)
+    level_offsets = Level_Offsets(parent_position, roots.size)
+    if level_offsets is None:
+        return Diameter_Eccentricities(offsets, neighbors, roots)
+
+    nr_nodes = order.size
+    first_height = np.zeros(nr_nodes, dtype=np.int32)
+    second_height = np.zeros(nr_nodes, dtype=np.int32)
+    best_child = np.full(nr_nodes, -1, dtype=np.int64)
+    up = np.zeros(nr_nodes, dtype=np.int32)
+
+    # Bottom-up: the children of a node all lie on the level below it
+    for level in range(len(level_offsets) - 2, 0, -1):
+        children = np.arange(level_offsets[level], level_offsets[level + 1])
+        parents = parent_position[children]
+        heights = first_height[children] + 1
+        np.maximum.at(first_height, parents, heights)
+        best = heights == first_height[parents]
+        best_child[parents[best]] = children[best]
+        np.maximum.at(second_height, parents, np.where(best_child[parents] == children, 0, heights))
+
+    # Top-down rerooting
+    for level in range(1, len(level_offsets) - 1):
+        children = np.arange(level_offsets[level], level_offsets[level + 1])
+        parents = parent_position[children]
+        sideways = np.where(best_child[parents] == children, second_height[parents], first_height[parents])
+        up[children] = np.maximum(up[parents], sideways) + 1
+
+    eccentricities = np.empty(nr_nodes, dtype=np.int32)
+    eccentricities[order] = np.maximum(first_height, up)
+    return eccentricities
+
+def main():
+    """
+    Computes the eccentricities of a tree file and optionally checks the results of Eccentricity.py.
+
+    Usage: python tree_eccentricity.py tree.topo [--forest] [--compare results.npz]
+    """
+    parser = argparse.ArgumentParser(description="Sequential eccentricities of the nodes of a tree")
+    parser.add_argument("topology", help="Binary topology file")
+    parser.add_argument("--forest", action="store_true",
+                        help="The topology file is a batch of trees on contiguous ranges of node IDs")
+    parser.add_argument("--compare", help="Check the eccentricity column of an Eccentricity.py --output file")
+    args = parser.parse_args()
+
+    topology = load_topology(args.topology)
+    roots = [0]
+    if args.forest:
+        tree_starts = forest_offsets(args.topology)
+        if tree_starts is None:
+            print("--forest needs a topology file whose trees occupy contiguous ranges of node IDs")
+            sys.exit(1)
+        roots = tree_starts[:-1]
+
+    start = time.perf_counter()
+    eccentricities = Tree_Eccentricities(topology.offsets, topology.neighbors, roots)
+    elapsed = time.perf_counter() - start
+    print("{} nodes in {:.3f} s: diameter = {}, radius = {}".format(
+        eccentricities.size, elapsed, eccentricities.max(), eccentricities.min()))
+
+    if args.compare is not None:
+        expected = np.load(args.compare)["eccentricity"]
+        if expected.size != eccentricities.size:
+            print("{} holds {} eccentricities, not {}".format(args.compare, expected.size, eccentricities.size))
+            sys.exit(1)
+        mismatches = np.flatnonzero(expected != eccentricities)
+        if mismatches.size:
+            print("{} eccentricities differ, first at node {}: {} instead of {}".format(
+                mismatches.size, mismatches[0], expected[mismatches[0]], eccentricities[mismatches[0]]))
+            sys.exit(1)
+        print("All {} eccentricities match".format(eccentricities.size))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,153 @@
+import numpy as np
+
+from saturation_engine import ASLEEP
+
+# Value vectors reduced together; the working matrix holds batch_size * n values
+DEFAULT_BATCH_SIZE = 1024
+
+# Widest sender groups combined one rank at a time; wider ones go through reduceat
+MAX_RANK_STEPS = 8
+
+
+class BatchedExtremaResult:
+    def __init__(self, extrema, holders, saturated):
+        '''
+        Initializes the BatchedExtremaResult object.
+
+        Args:
+            extrema (numpy.ndarray): The minimum (or maximum) of every value vector.
+            holders (numpy.ndarray): The smallest node holding the extremum, for every value vector. The
+                replayed messages carry values only: holders come from a central scan of every row.
+            saturated (tuple): The two saturated nodes, which are the same for every value vector.
+        '''
+        self.extrema = extrema
+        self.holders = holders
+        self.saturated = saturated
+
+
+class SaturationSchedule:
+    def __init__(self, tree):
+        '''
+        Initializes the SaturationSchedule object.
+
+        Which node sends its saturation message to which neighbor, and during which time
+        unit, depends on the tree only, never on the values, so the schedule is computed
+        once by a saturation run and replayed for any number of value vectors. The nodes
+        are relabeled in sending order, with the senders of every time unit sorted by
+        destination: a time unit is then a contiguous slice of the working matrix, cut
+        into one segment per destination, which a single reduceat combines.
+
+        Args:
+            tree (SaturationTree): The tree.
+        '''
+        queues = []
+        parent, saturated, _, _ = tree.saturate(schedule=queues)
+        tree.status[:] = ASLEEP
+
+        self.n = tree.n
+        self.saturated = saturated
+        self.levels = []
+        start = 0
+        ordered = []
+        for queue in queues:
+            # Group the senders by destination, the largest groups first
+            destinations, sizes = np.unique(parent[queue], return_counts=True)
+            by_size = np.argsort(-sizes, kind="stable")
+            destinations, sizes = destinations[by_size], sizes[by_size]
+            rank = np.empty(destinations.size, dtype=np.int64)
+            rank[by_size] = np.arange(destinations.size)
+            queue = queue[np.argsort(rank[np.searchsorted(np.sort(destinations), parent[queue])], kind="stable")]
+            segments = np.cumsum(sizes) - sizes
+            # Number of groups with more than r senders, for r = 1, 2, ...
+            wider = np.searchsorted(-sizes, -np.arange(1, sizes[0]), side="left")
+            ordered.append(queue)
+            self.levels.append((start, start + queue.size, segments, wider.tolist(), destinations))
+            start += queue.size
+
+        # Every node sends exactly one saturation message, so the order is a permutation
+        self.order = np.concatenate(ordered) if ordered else np.arange(self.n)
+        position = np.empty(self.n, dtype=np.int64)
+        position[self.order] = np.arange(self.n)
+        self.levels = [(first, last, segments, wider, position[destinations])
+                       for first, last, segments, wider, destinations in self.levels]
+        # The saturated node that sends last holds every value exactly once; the other one
+        # may have been sent its own contribution back, which only idempotent ufuncs ignore
+        self.result_position = position[list(saturated)].max()
+
+    def reduce(self, values, ufunc):
+        '''
+        Replays the saturation messages on a batch of value vectors.
+
+        Args:
+            values (numpy.ndarray): (batch x n) matrix, one value vector per row.
+            ufunc (numpy.ufunc): Associative and commutative combination, e.g. np.minimum.
+
+        Returns:
+            numpy.ndarray: The combination of every row, as a saturated node gets it.
+        '''
+        # Node-major layout, rows in sending order: the senders of a time unit are a slice,
+        # and every step reads or writes whole rows
+        work = np.ascontiguousarray(np.take(values, self.order, axis=1).T)
+        for first, last, segments, wider, destinations in self.levels:
+            if len(wider) <= MAX_RANK_STEPS:
+                # Groups sorted by size: the groups with more than r senders are a prefix
+                combined = work[first + segments]
+                for offset, count in enumerate(wider, 1):
+                    ufunc(combined[:count], work[first + segments[:count] + offset], out=combined[:count])
+            else:
+                combined = ufunc.reduceat(work[first:last], segments, axis=0)
+            work[destinations] = ufunc(work[destinations], combined)
+        return work[self.result_position]
+
+    def find_extrema(self, values, ufunc, batch_size=DEFAULT_BATCH_SIZE):
+        '''
+        Finds the extremum of many value vectors, and the node holding it, by saturation.
+
+        Args:
+            values (array_like): (batch x n) matrix, or a single vector of n values.
+            ufunc (numpy.ufunc): np.minimum or np.maximum.
+            batch_size (int): Number of rows reduced together.
+
+        Returns:
+            BatchedExtremaResult: Per-row extremum and holder.
+        '''
+        values = np.asarray(values)
+        matrix = values.reshape(-1, self.n)
+        extrema = np.empty(matrix.shape[0], dtype=matrix.dtype)
+        holders = np.empty(matrix.shape[0], dtype=np.int64)
+
+        for first in range(0, matrix.shape[0], batch_size):
+            rows = matrix[first:first + batch_size]
+            extrema[first:first + rows.shape[0]] = self.reduce(rows, ufunc)
+            # Not part of the replay: a central scan for the first node holding the extremum
+            holders[first:first + rows.shape[0]] = np.argmax(rows == extrema[first:first + rows.shape[0], None], axis=1)
+
+        if values.ndim == 1:
+            return BatchedExtremaResult(extrema[0], holders[0], self.saturated)
+        return BatchedExtremaResult(extrema, holders, self.saturated)
+
+    def find_minimum(self, values, batch_size=DEFAULT_BATCH_SIZE):
+        '''
+        Finds the minimum of many value vectors, and the node holding it.
+
+        Args:
+            values (array_like): (batch x n) matrix, or a single vector of n values.
+            batch_size (int): Number of rows reduced together.
+
+        Returns:
+            BatchedExtremaResult: Per-row minimum and holder.
+        '''
+        return self.find_extrema(values, np.minimum, batch_size)
+
+    def find_maximum(self, values, batch_size=DEFAULT_BATCH_SIZE):
+        '''
+        Finds the maximum of many value vectors, and the node holding it.
+
+        Args:
+            values (array_like): (batch x n) matrix, or a single vector of n values.
+            batch_size (int): Number of rows reduced together.
+
+        Returns:
+            BatchedExtremaResult: Per-row maximum and holder.
+        '''
+        return self.find_extrema(values, np.maximum, batch_size)
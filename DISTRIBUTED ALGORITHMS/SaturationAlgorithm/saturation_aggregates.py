@@ -0,0 +1,493 @@
+import operator
+
+import numpy as np
+
+
+class Aggregate:
+    '''
+    Operator computed by the saturation skeleton.
+
+    Every node keeps some state, built from its value by start. During saturation a
+    node sends message(state) to its parent, and the parent folds it in with receive;
+    the saturated nodes then hold the aggregate of the whole tree. During resolution
+    every node sends notification to its other neighbors, which fold it in with
+    notified. All methods work on arrays of nodes, one entry per message; the *_one
+    methods fold a single message, for the time units with only a few senders (the
+    paths of deep trees), and by default call the array methods.
+
+    By default the notification is the final value, so every node ends up knowing it
+    in self.known.
+    '''
+    name = None
+
+    def start(self, values):
+        '''
+        Initializes the state of every node.
+
+        Args:
+            values (numpy.ndarray): The value of every node.
+        '''
+        raise NotImplementedError
+
+    def message(self, senders):
+        '''
+        Builds the saturation messages of nodes from their current state.
+
+        Args:
+            senders (numpy.ndarray): The sending nodes.
+
+        Returns:
+            numpy.ndarray: One payload per sender.
+        '''
+        raise NotImplementedError
+
+    def receive(self, destinations, senders, payload):
+        '''
+        Folds saturation messages into the state of their destinations.
+
+        Args:
+            destinations (numpy.ndarray): The receiving nodes, possibly repeated.
+            senders (numpy.ndarray): The sending nodes.
+            payload (numpy.ndarray): The payloads, as returned by message.
+        '''
+        raise NotImplementedError
+
+    def message_one(self, sender):
+        '''
+        Builds the saturation message of a single node.
+
+        Args:
+            sender (int): The sending node.
+
+        Returns:
+            object: The payload, indexed like an entry of what message returns.
+        '''
+        return self.message(np.array([sender]))[0]
+
+    def receive_one(self, destination, sender, payload):
+        '''
+        Folds a single saturation message into the state of its destination.
+
+        Args:
+            destination (int): The receiving node.
+            sender (int): The sending node.
+            payload (object): The payload, from message_one or an entry of what message returns.
+        '''
+        self.receive(np.array([destination]), np.array([sender]), np.asarray(payload)[None])
+
+    def result(self, nodes):
+        '''
+        Computes the final value at nodes that received every value (the saturated nodes).
+
+        Args:
+            nodes (numpy.ndarray): The nodes.
+
+        Returns:
+            numpy.ndarray: The final value, for every node.
+        '''
+        raise NotImplementedError
+
+    def saturated(self, nodes):
+        '''
+        Called once the saturated nodes are known.
+
+        Args:
+            nodes (numpy.ndarray): The saturated nodes.
+        '''
+        results = self.result(nodes)
+        self.known = np.empty(self.n, dtype=results.dtype)
+        self.known[nodes] = results
+
+    def notification(self, senders, destinations):
+        '''
+        Builds the resolution messages.
+
+        Args:
+            senders (numpy.ndarray): The sending nodes.
+            destinations (numpy.ndarray): The receiving nodes, one per message.
+
+        Returns:
+            numpy.ndarray: One payload per message.
+        '''
+        return self.known[senders]
+
+    def notified(self, destinations, senders, payload):
+        '''
+        Folds resolution messages into the state of their destinations.
+
+        Args:
+            destinations (numpy.ndarray): The receiving nodes, each one once.
+            senders (numpy.ndarray): The sending nodes.
+            payload (numpy.ndarray): The payloads, as returned by notification.
+        '''
+        self.known[destinations] = payload
+
+    def notification_one(self, sender, destination):
+        '''
+        Builds a single resolution message.
+
+        Args:
+            sender (int): The sending node.
+            destination (int): The receiving node.
+
+        Returns:
+            object: The payload, indexed like an entry of what notification returns.
+        '''
+        return self.notification(np.array([sender]), np.array([destination]))[0]
+
+    def notified_one(self, destination, sender, payload):
+        '''
+        Folds a single resolution message into the state of its destination.
+
+        Args:
+            destination (int): The receiving node.
+            sender (int): The sending node.
+            payload (object): The payload, from notification_one or an entry of what notification returns.
+        '''
+        self.notified(np.array([destination]), np.array([sender]), np.asarray(payload)[None])
+
+    def final(self, saturated):
+        '''
+        Returns the value the caller gets.
+
+        Args:
+            saturated (tuple): The saturated nodes.
+
+        Returns:
+            object: The aggregate.
+        '''
+        return self.known[saturated[0]].item()
+
+
+class Semigroup(Aggregate):
+    '''
+    Aggregate of an associative and commutative NumPy ufunc: the state of a node is
+    the combination of the values it heard of, and a message carries it.
+    '''
+    ufunc = None
+
+    def start(self, values):
+        self.n = len(values)
+        self.state = np.array(values, copy=True)
+
+    def message(self, senders):
+        return self.state[senders]
+
+    def receive(self, destinations, senders, payload):
+        self.ufunc.at(self.state, destinations, payload)
+
+    def message_one(self, sender):
+        return self.state[sender]
+
+    def receive_one(self, destination, sender, payload):
+        self.state[destination] = self.ufunc(self.state[destination], payload)
+
+    def result(self, nodes):
+        return self.state[nodes]
+
+    def notification_one(self, sender, destination):
+        return self.known[sender]
+
+    def notified_one(self, destination, sender, payload):
+        self.known[destination] = payload
+
+
+class Extremum(Semigroup):
+    '''
+    Minimum or maximum, carried as (value, node) pairs: the messages also tell which
+    node holds the extremum, the smallest one on ties, and every node learns it.
+    '''
+    # Whether a value is strictly better than another, for single messages
+    better = None
+
+    def start(self, values):
+        super().start(values)
+        self.holder = np.arange(self.n, dtype=np.int64)
+
+    def message(self, senders):
+        return np.column_stack((self.state[senders], self.holder[senders]))
+
+    def receive(self, destinations, senders, payload):
+        values, holders = payload[:, 0].astype(self.state.dtype), payload[:, 1].astype(np.int64)
+        previous = self.state[destinations]
+        self.ufunc.at(self.state, destinations, values)
+        # A better value replaces the holder; an equal one keeps the smallest holder
+        improved = self.state[destinations] != previous
+        self.holder[destinations[improved]] = self.n
+        best = values == self.state[destinations]
+        np.minimum.at(self.holder, destinations[best], holders[best])
+
+    def message_one(self, sender):
+        return self.state[sender], self.holder[sender]
+
+    def receive_one(self, destination, sender, payload):
+        value, holder = payload[0], int(payload[1])
+        previous = self.state[destination]
+        if self.better(value, previous):
+            self.state[destination] = value
+            self.holder[destination] = holder
+        elif value == previous and holder < self.holder[destination]:
+            self.holder[destination] = holder
+
+    def saturated(self, nodes):
+        super().saturated(nodes)
+        self.known_holder = np.empty(self.n, dtype=np.int64)
+        self.known_holder[nodes] = self.holder[nodes]
+
+    def notification(self, senders, destinations):
+        return np.column_stack((self.known[senders], self.known_holder[senders]))
+
+    def notified(self, destinations, senders, payload):
+        self.known[destinations] = payload[:, 0]
+        self.known_holder[destinations] = payload[:, 1]
+
+    def notification_one(self, sender, destination):
+        return self.known[sender], self.known_holder[sender]
+
+    def notified_one(self, destination, sender, payload):
+        self.known[destination] = payload[0]
+        self.known_holder[destination] = payload[1]
+
+    def final_holder(self, saturated):
+        '''
+        Returns the node holding the extremum, as the saturated nodes learned it.
+
+        Args:
+            saturated (tuple): The saturated nodes.
+
+        Returns:
+            int: The holder.
+        '''
+        return self.known_holder[saturated[0]].item()
+
+
+class Minimum(Extremum):
+    name = "min"
+    ufunc = np.minimum
+    better = staticmethod(operator.lt)
+
+
+class Maximum(Extremum):
+    name = "max"
+    ufunc = np.maximum
+    better = staticmethod(operator.gt)
+
+
+class Sum(Semigroup):
+    name = "sum"
+    ufunc = np.add
+
+    def start(self, values):
+        values = np.asarray(values)
+        # Small integer types would overflow long before the sum of the tree
+        super().start(values.astype(np.int64) if np.issubdtype(values.dtype, np.integer) else values)
+
+
+class Count(Sum):
+    name = "count"
+
+    def start(self, values):
+        super().start(np.ones(len(values), dtype=np.int64))
+
+
+class Median(Aggregate):
+    '''
+    Lower median of integer values, from a histogram of counts per value: merging two
+    histograms is an addition, so one message per edge is enough, at the price of
+    messages of high - low counts. Exact for integer values in [low, high).
+
+    A node gets a histogram row when it receives its first message and hands it over
+    to its saturation message; the row is recycled once the parent has folded it in.
+    Leaves send their bare value. Memory is then high - low counts per node that has
+    heard from some neighbors but not sent yet, which can be most of the internal nodes
+    at once: it grows with n times the value range, so keep the range small (e.g.
+    bucketed values) rather than use it on arbitrary integers.
+    '''
+    name = "median"
+
+    def __init__(self, low=None, high=None):
+        '''
+        Initializes the Median object.
+
+        Args:
+            low (int): Smallest possible value. Defaults to the smallest value of the run.
+            high (int): Largest possible value plus one. Defaults to the largest value of the run plus one.
+        '''
+        self.low = low
+        self.high = high
+
+    def start(self, values):
+        values = np.asarray(values)
+        if not np.issubdtype(values.dtype, np.integer):
+            raise ValueError("The median aggregate needs integer values")
+        self.n = values.size
+        low = int(values.min()) if self.low is None else self.low
+        high = int(values.max()) + 1 if self.high is None else self.high
+        if values.min() < low or values.max() >= high:
+            raise ValueError(f"Values must lie in [{low}, {high})")
+        self.offset = low
+        self.bins = high - low
+        self.values = values.astype(np.int64) - low
+        # Histogram row of every node (-1 for none), in a pool of recycled rows
+        self.row = np.full(self.n, -1, dtype=np.int64)
+        self.sent = np.zeros(self.n, dtype=bool)
+        self.pool = np.zeros((0, self.bins), dtype=np.int32)
+        self.free = np.empty(0, dtype=np.int64)
+        self.free_count = 0
+        self.edge = []
+        self._slot = np.empty(self.n, dtype=np.int64)
+
+    def allocate(self, count):
+        '''
+        Takes zeroed histogram rows from the pool, growing it if needed.
+
+        Args:
+            count (int): Number of rows.
+
+        Returns:
+            numpy.ndarray: The row indices.
+        '''
+        if self.free_count < count:
+            capacity = len(self.pool)
+            grown = max(2 * capacity, capacity + count - self.free_count)
+            self.pool = np.concatenate((self.pool, np.zeros((grown - capacity, self.bins), dtype=np.int32)))
+            # The stack of free rows can hold every row of the pool
+            free = np.empty(grown, dtype=np.int64)
+            free[:self.free_count] = self.free[:self.free_count]
+            free[self.free_count:self.free_count + grown - capacity] = np.arange(capacity, grown)
+            self.free = free
+            self.free_count += grown - capacity
+        self.free_count -= count
+        return self.free[self.free_count:self.free_count + count].copy()
+
+    def release(self, rows):
+        '''
+        Zeroes histogram rows and gives them back to the pool.
+
+        Args:
+            rows (numpy.ndarray): The row indices.
+        '''
+        self.pool[rows] = 0
+        self.free[self.free_count:self.free_count + rows.size] = rows
+        self.free_count += rows.size
+
+    def message(self, senders):
+        # A payload is a pool row, or -1 - value for a node that never received anything
+        payload = np.where(self.row[senders] >= 0, self.row[senders], -1 - self.values[senders])
+        self.row[senders] = -1
+        self.sent[senders] = True
+        return payload
+
+    def receive(self, destinations, senders, payload):
+        # A node that already sent only receives from its parent: these are the two
+        # messages of the saturated edge, which together count every value once
+        late = self.sent[destinations]
+        self.edge.extend(payload[late].tolist())
+        destinations, payload = destinations[~late], payload[~late]
+        if destinations.size == 0:
+            return
+
+        positions = np.arange(destinations.size, dtype=np.int64)
+        self._slot[destinations] = positions
+        fresh = destinations[(self._slot[destinations] == positions) & (self.row[destinations] < 0)]
+        self.row[fresh] = self.allocate(fresh.size)
+        self.pool[self.row[fresh], self.values[fresh]] = 1
+
+        target = self.row[destinations]
+        single = payload < 0
+        np.add.at(self.pool, (target[single], -1 - payload[single]), 1)
+        rows = payload[~single]
+        if rows.size:
+            # Row-wise np.add.at is slow; scatter into the flattened pool instead
+            cells = target[~single][:, None] * self.bins + np.arange(self.bins)
+            np.add.at(self.pool.reshape(-1), cells.reshape(-1), self.pool[rows].reshape(-1))
+            self.release(rows)
+
+    def result(self, nodes):
+        counts = np.zeros(self.bins, dtype=np.int64)
+        if not self.edge:
+            counts[self.values[nodes[0]]] = 1
+        for payload in self.edge:
+            if payload < 0:
+                counts[-1 - payload] += 1
+            else:
+                counts += self.pool[payload]
+        counts = np.cumsum(counts)
+        median = self.offset + int(np.argmax(counts >= (counts[-1] + 1) // 2))
+        return np.full(len(nodes), median, dtype=np.int64)
+
+
+class Center(Aggregate):
+    '''
+    Center of the tree. A saturation message carries 1 + the height of the subtree of
+    its sender; a resolution message carries 1 + the longest path from its sender that
+    avoids the receiver. Every node keeps its two longest branches, and is a center
+    when they differ by at most one.
+    '''
+    name = "center"
+
+    def start(self, values):
+        self.n = len(values)
+        self.first = np.zeros(self.n, dtype=np.int64)
+        self.second = np.zeros(self.n, dtype=np.int64)
+        self.best = np.full(self.n, -1, dtype=np.int64)
+        self._slot = np.empty(self.n, dtype=np.int64)
+
+    def message(self, senders):
+        return self.first[senders] + 1
+
+    def receive(self, destinations, senders, payload):
+        # Keep the two longest branches; a node losing its longest branch moves it to second
+        positions = np.arange(destinations.size, dtype=np.int64)
+        self._slot[destinations] = positions
+        nodes = destinations[self._slot[destinations] == positions]
+        previous_first, previous_best = self.first[nodes], self.best[nodes]
+        np.maximum.at(self.first, destinations, payload)
+        longest = payload == self.first[destinations]
+        self.best[destinations[longest]] = senders[longest]
+        np.maximum.at(self.second, destinations, np.where(senders == self.best[destinations], 0, payload))
+        moved = self.best[nodes] != previous_best
+        self.second[nodes[moved]] = np.maximum(self.second[nodes[moved]], previous_first[moved])
+
+    def message_one(self, sender):
+        return self.first[sender] + 1
+
+    def receive_one(self, destination, sender, payload):
+        if payload > self.first[destination]:
+            self.second[destination] = self.first[destination]
+            self.first[destination] = payload
+            self.best[destination] = sender
+        elif payload > self.second[destination]:
+            self.second[destination] = payload
+
+    def result(self, nodes):
+        return self.first[nodes]
+
+    def saturated(self, nodes):
+        pass
+
+    def notification(self, senders, destinations):
+        return 1 + np.where(self.best[senders] == destinations, self.second[senders], self.first[senders])
+
+    def notified(self, destinations, senders, payload):
+        self.receive(destinations, senders, payload)
+
+    def notification_one(self, sender, destination):
+        return 1 + (self.second[sender] if self.best[sender] == destination else self.first[sender])
+
+    def notified_one(self, destination, sender, payload):
+        self.receive_one(destination, sender, payload)
+
+    def final(self, saturated):
+        return tuple(np.flatnonzero(self.first - self.second <= 1).tolist())
+
+    def eccentricities(self):
+        '''
+        Returns:
+            numpy.ndarray: The eccentricity of every node, its longest branch.
+        '''
+        return self.first
+
+
+# Aggregates by name, for callers that register them with a string
+AGGREGATES = {aggregate.name: aggregate for aggregate in (Minimum, Maximum, Sum, Count, Median, Center)}
@@ -0,0 +1,473 @@
+import os
+import sys
+
+import numpy as np
+
+# The binary topology format is shared by the scripts of every algorithm folder
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "Topology"))
+from topology_file import adjacency_list_to_csr, load_topology
+
+from saturation_aggregates import AGGREGATES, Minimum
+
+# Node states, in the order a node goes through them
+ASLEEP = 0
+AWAKE = 1
+PROCESSING = 2
+SATURATED = 3
+DONE = 4
+STATUS_NAMES = ["ASLEEP", "AWAKE", "PROCESSING", "SATURATED", "DONE"]
+
+# Work queues up to this size run as a plain Python loop over ints: along the paths of
+# deep trees a time unit holds one or two nodes, and a dozen NumPy calls per time unit
+# would cost far more than the nodes themselves
+SCALAR_QUEUE_SIZE = 16
+
+
+class SaturationResult:
+    def __init__(self, minimum, saturated, wake_time, parent, messages, time_units, holder=None):
+        '''
+        Initializes the SaturationResult object.
+
+        Args:
+            minimum (int): The minimum value, known by every node at the end.
+            saturated (tuple): The two saturated nodes (one node for a single-node tree).
+            wake_time (numpy.ndarray): Time unit at which every node woke up (its depth from the initiators).
+            parent (numpy.ndarray): Neighbor every node sent its saturation message to.
+            messages (dict): Number of messages of each phase ("wakeup", "saturation", "resolution").
+            time_units (dict): Number of time units of each phase, with unit delays.
+            holder (int): The smallest node holding the minimum, carried by the messages along with it.
+        '''
+        self.minimum = minimum
+        self.holder = holder
+        self.saturated = saturated
+        self.wake_time = wake_time
+        self.parent = parent
+        self.messages = messages
+        self.time_units = time_units
+
+    def total_messages(self):
+        '''
+        Returns the number of messages of the whole execution, 3n + k - 4 for k initiators.
+
+        Returns:
+            int: The number of messages.
+        '''
+        return sum(self.messages.values())
+
+
+class AggregationResult:
+    def __init__(self, results, aggregates, saturated, wake_time, parent, messages, time_units):
+        '''
+        Initializes the AggregationResult object.
+
+        Args:
+            results (dict): The final value of every aggregate, by name.
+            aggregates (list): The Aggregate objects, which keep the per-node state (e.g. the eccentricities).
+            saturated (tuple): The two saturated nodes (one node for a single-node tree).
+            wake_time (numpy.ndarray): Time unit at which every node woke up.
+            parent (numpy.ndarray): Neighbor every node sent its saturation message to.
+            messages (dict): Number of messages of each phase ("wakeup", "saturation", "resolution").
+            time_units (dict): Number of time units of each phase, with unit delays.
+        '''
+        self.results = results
+        self.aggregates = aggregates
+        self.saturated = saturated
+        self.wake_time = wake_time
+        self.parent = parent
+        self.messages = messages
+        self.time_units = time_units
+
+    def total_messages(self):
+        '''
+        Returns the number of messages of the whole execution, 3n + k - 4 for k initiators.
+
+        Returns:
+            int: The number of messages.
+        '''
+        return sum(self.messages.values())
+
+
+class SaturationTree:
+    def __init__(self, offsets, neighbors):
+        '''
+        Initializes the SaturationTree object.
+
+        The tree is kept as struct-of-arrays: the CSR neighbor arrays, and one NumPy
+        array per node attribute (status, value, wake-up time, parent), so a node costs
+        a few tens of bytes and no phase recurses, whatever the depth of the tree.
+        Every phase runs from an explicit work queue holding the nodes that send in
+        the current time unit.
+
+        Args:
+            offsets (numpy.ndarray): CSR offsets of the tree.
+            neighbors (numpy.ndarray): CSR neighbors of the tree.
+        '''
+        self.offsets = np.asarray(offsets, dtype=np.int64)
+        self.neighbors = np.asarray(neighbors)
+        self.n = len(self.offsets) - 1
+        self.degrees = np.diff(self.offsets)
+        if self.neighbors.size != 2 * (self.n - 1) and self.n > 0:
+            raise ValueError(f"A tree on {self.n} nodes has {self.n - 1} edges, not {self.neighbors.size // 2}")
+        self.status = np.full(self.n, ASLEEP, dtype=np.int8)
+        self._slot = np.empty(self.n, dtype=np.int64)
+        # Scalar access for the small work queues: indexing a memoryview yields plain ints
+        self._offsets = memoryview(self.offsets)
+        self._status = memoryview(self.status)
+
+    @classmethod
+    def from_adjacency_list(cls, adjacency_list):
+        '''
+        Builds a SaturationTree from a dict of children (or neighbor) lists with nodes 0..n-1.
+
+        Args:
+            adjacency_list (dict): Nodes mapped to their children or neighbors.
+
+        Returns:
+            SaturationTree: The tree.
+        '''
+        return cls(*adjacency_list_to_csr(adjacency_list))
+
+    @classmethod
+    def from_topology_file(cls, path):
+        '''
+        Builds a SaturationTree from a binary topology file (see Topology/topology_file.py).
+
+        Args:
+            path (str): Path of the topology file.
+
+        Returns:
+            SaturationTree: The tree, whose arrays are memory-mapped.
+        '''
+        topology = load_topology(path)
+        return cls(topology.offsets, topology.neighbors)
+
+    def expand(self, senders, excluded):
+        '''
+        Lists the messages sent by a work queue of nodes to all their neighbors but one.
+
+        Args:
+            senders (numpy.ndarray): The sending nodes.
+            excluded (numpy.ndarray): For every sender, the neighbor it does not send to (-1 for none).
+
+        Returns:
+            tuple: (sources, destinations) of the messages.
+        '''
+        if senders.size == 1:
+            # The common case along the paths of deep trees: a plain slice is much cheaper
+            node = senders[0]
+            destinations = self.neighbors[self.offsets[node]:self.offsets[node + 1]].astype(np.int64)
+            destinations = destinations[destinations != excluded[0]]
+            return np.full(destinations.size, node, dtype=np.int64), destinations
+
+        counts = self.degrees[senders]
+        total = int(counts.sum())
+        sources = np.repeat(senders, counts)
+        block_starts = np.cumsum(counts) - counts
+        index = np.arange(total, dtype=np.int64) + np.repeat(self.offsets[senders] - block_starts, counts)
+        destinations = self.neighbors[index].astype(np.int64)
+        kept = destinations != np.repeat(excluded, counts)
+        return sources[kept], destinations[kept]
+
+    def distinct(self, nodes):
+        '''
+        Keeps one occurrence of every node of a work queue, without sorting it.
+
+        Args:
+            nodes (numpy.ndarray): The nodes, with repetitions.
+
+        Returns:
+            numpy.ndarray: Boolean mask selecting the last occurrence of every node.
+        '''
+        positions = np.arange(nodes.size, dtype=np.int64)
+        self._slot[nodes] = positions
+        return self._slot[nodes] == positions
+
+    def wake_up(self, initiators):
+        '''
+        Wake-up phase: the initiators wake up spontaneously and send a wake-up message to
+        all their neighbors; any other node, woken up by a message, forwards it to all
+        its neighbors but the sender.
+
+        Args:
+            initiators (array_like): The nodes that wake up spontaneously.
+
+        Returns:
+            tuple: (wake_time array, number of messages, number of time units).
+        '''
+        wake_time = np.full(self.n, -1, dtype=np.int64)
+        queue = np.unique(np.asarray(initiators, dtype=np.int64))
+        sender = np.full(queue.size, -1, dtype=np.int64)
+        wake_time[queue] = 0
+        self.status[queue] = AWAKE
+        messages = 0
+        time_units = 0
+        offsets, status, woken_at = self._offsets, self._status, memoryview(wake_time)
+
+        while len(queue):
+            if len(queue) <= SCALAR_QUEUE_SIZE:
+                # Keyed in order of last occurrence, with the last sender, as distinct does below
+                woken = {}
+                if isinstance(queue, np.ndarray):
+                    queue, sender = queue.tolist(), sender.tolist()
+                for node, excluded in zip(queue, sender):
+                    for neighbor in self.neighbors[offsets[node]:offsets[node + 1]].tolist():
+                        if neighbor != excluded:
+                            messages += 1
+                            if woken_at[neighbor] < 0:
+                                woken.pop(neighbor, None)
+                                woken[neighbor] = node
+                if not woken:
+                    break
+                time_units += 1
+                for node in woken:
+                    woken_at[node] = time_units
+                    status[node] = AWAKE
+                queue, sender = list(woken), list(woken.values())
+                continue
+
+            queue, sender = np.asarray(queue, dtype=np.int64), np.asarray(sender, dtype=np.int64)
+            sources, destinations = self.expand(queue, sender)
+            messages += destinations.size
+            asleep = wake_time[destinations] < 0
+            sources, destinations = sources[asleep], destinations[asleep]
+            if destinations.size == 0:
+                break
+            time_units += 1
+            # A node woken up by two messages at once keeps one of them as sender
+            wake_time[destinations] = time_units
+            kept = self.distinct(destinations)
+            queue, sender = destinations[kept], sources[kept]
+            self.status[queue] = AWAKE
+
+        return wake_time, messages, time_units
+
+    def saturate(self, aggregates=(), schedule=None):
+        '''
+        Saturation phase: a node that heard from all its neighbors but one sends it the
+        state of every aggregate, fused into one message, and becomes PROCESSING; that
+        neighbor is its parent. A node that receives a message from its parent is
+        SATURATED: exactly two neighboring nodes are, and both know the aggregates of
+        the whole tree.
+
+        The neighbor a node has not heard from is the sum of the IDs of its neighbors
+        minus those of the senders heard so far, so no per-node set is needed.
+
+        Args:
+            aggregates (list): Started Aggregate objects (see saturation_aggregates.py).
+            schedule (list): If given, receives the nodes that send during every time unit, in order.
+
+        Returns:
+            tuple: (parent array, saturated nodes, number of messages, number of time units).
+        '''
+        parent = np.full(self.n, -1, dtype=np.int64)
+        if self.n == 1:
+            self.status[0] = SATURATED
+            return parent, (0,), 0, 0
+
+        remaining = self.degrees.copy()
+        unheard_sum = np.add.reduceat(self.neighbors.astype(np.int64), self.offsets[:-1])
+        queue = np.flatnonzero(remaining == 1)
+        parent[queue] = unheard_sum[queue]
+        payloads = [aggregate.message(queue) for aggregate in aggregates]
+        status, parents = self._status, memoryview(parent)
+        remaining_at, unheard_at = memoryview(remaining), memoryview(unheard_sum)
+        saturated = []
+        messages = 0
+        time_units = 0
+
+        while len(queue):
+            if len(queue) <= SCALAR_QUEUE_SIZE:
+                # Same steps as below, one message at a time
+                if isinstance(queue, np.ndarray):
+                    queue = queue.tolist()
+                if schedule is not None:
+                    schedule.append(np.array(queue, dtype=np.int64))
+                for node in queue:
+                    status[node] = PROCESSING
+                messages += len(queue)
+                time_units += 1
+                active = []
+                last = {}
+                for position, node in enumerate(queue):
+                    destination = parents[node]
+                    if status[destination] == PROCESSING:
+                        saturated.append(destination)
+                        for aggregate, payload in zip(aggregates, payloads):
+                            aggregate.receive_one(destination, node, payload[position])
+                        continue
+                    remaining_at[destination] -= 1
+                    unheard_at[destination] -= node
+                    active.append(position)
+                    last.pop(destination, None)
+                    last[destination] = position
+
+                ready = []
+                deferred = []
+                for destination, position in last.items():
+                    if remaining_at[destination] == 0:
+                        parents[destination] = queue[position]
+                        saturated.append(destination)
+                        deferred.append(position)
+                        ready.append(destination)
+                    elif remaining_at[destination] == 1:
+                        parents[destination] = unheard_at[destination]
+                        ready.append(destination)
+                for position in active:
+                    if position not in deferred:
+                        node = queue[position]
+                        for aggregate, payload in zip(aggregates, payloads):
+                            aggregate.receive_one(parents[node], node, payload[position])
+                next_payloads = [[aggregate.message_one(node) for node in ready] for aggregate in aggregates]
+                for position in deferred:
+                    node = queue[position]
+                    for aggregate, payload in zip(aggregates, payloads):
+                        aggregate.receive_one(parents[node], node, payload[position])
+                queue, payloads = ready, next_payloads
+                continue
+
+            queue = np.asarray(queue, dtype=np.int64)
+            payloads = [np.asarray(payload) for payload in payloads]
+            if schedule is not None:
+                schedule.append(queue)
+            self.status[queue] = PROCESSING
+            destinations = parent[queue]
+            messages += queue.size
+            time_units += 1
+            processing = self.status[destinations] == PROCESSING
+            saturated.extend(destinations[processing].tolist())
+            for aggregate, payload in zip(aggregates, payloads):
+                aggregate.receive(destinations[processing], queue[processing], payload[processing])
+
+            active = ~processing
+            sources, destinations = queue[active], destinations[active]
+            np.subtract.at(remaining, destinations, 1)
+            np.subtract.at(unheard_sum, destinations, sources)
+            kept = np.flatnonzero(self.distinct(destinations))
+            ready = remaining[destinations[kept]] <= 1
+            kept = kept[ready]
+            queue = destinations[kept]
+
+            # Heard from every neighbor at once: as if the messages arrived one after the
+            # other, send to the last sender, which becomes saturated when it receives it.
+            # Its message is built before the last sender's one is folded in, so that no
+            # value comes back to where it came from.
+            everyone = remaining[queue] == 0
+            parent[queue] = np.where(everyone, sources[kept], unheard_sum[queue])
+            saturated.extend(queue[everyone].tolist())
+            deferred = np.zeros(sources.size, dtype=bool)
+            deferred[kept[everyone]] = True
+            for aggregate, payload in zip(aggregates, payloads):
+                aggregate.receive(destinations[~deferred], sources[~deferred], payload[active][~deferred])
+            next_payloads = [aggregate.message(queue) for aggregate in aggregates]
+            if deferred.any():
+                for aggregate, payload in zip(aggregates, payloads):
+                    aggregate.receive(destinations[deferred], sources[deferred], payload[active][deferred])
+            payloads = next_payloads
+
+        saturated = tuple(sorted(saturated))
+        if len(saturated) != 2:
+            raise ValueError("The saturation did not end on two neighboring nodes: the graph is not a tree")
+        self.status[list(saturated)] = SATURATED
+        return parent, saturated, messages, time_units
+
+    def resolve(self, saturated, parent, aggregates=()):
+        '''
+        Resolution phase: the saturated nodes notify all their other neighbors of the
+        results, and every notified node forwards them to all its neighbors but its
+        parent, one fused message per edge.
+
+        Args:
+            saturated (tuple): The saturated nodes.
+            parent (numpy.ndarray): The parent array of the saturation phase.
+            aggregates (list): The Aggregate objects of the saturation phase.
+
+        Returns:
+            tuple: (number of messages, number of time units).
+        '''
+        queue = np.asarray(saturated, dtype=np.int64)
+        self.status[queue] = DONE
+        for aggregate in aggregates:
+            aggregate.saturated(queue)
+        messages = 0
+        time_units = 0
+        offsets, status, parents = self._offsets, self._status, memoryview(parent)
+
+        while len(queue):
+            if len(queue) <= SCALAR_QUEUE_SIZE:
+                notified = []
+                if isinstance(queue, np.ndarray):
+                    queue = queue.tolist()
+                for node in queue:
+                    excluded = parents[node]
+                    for neighbor in self.neighbors[offsets[node]:offsets[node + 1]].tolist():
+                        if neighbor != excluded:
+                            for aggregate in aggregates:
+                                aggregate.notified_one(neighbor, node, aggregate.notification_one(node, neighbor))
+                            status[neighbor] = DONE
+                            notified.append(neighbor)
+                if not notified:
+                    break
+                messages += len(notified)
+                time_units += 1
+                queue = notified
+                continue
+
+            queue = np.asarray(queue, dtype=np.int64)
+            sources, destinations = self.expand(queue, parent[queue])
+            if destinations.size == 0:
+                break
+            messages += destinations.size
+            time_units += 1
+            for aggregate in aggregates:
+                aggregate.notified(destinations, sources, aggregate.notification(sources, destinations))
+            self.status[destinations] = DONE
+            queue = destinations
+
+        return messages, time_units
+
+    def aggregate(self, values, aggregates, initiators=(0,)):
+        '''
+        Computes several aggregates of the values in a single execution of the three
+        phases: the saturation and resolution messages carry the payloads of all the
+        aggregates at once, so the execution costs 3n + k - 4 messages whatever their number.
+
+        Args:
+            values (array_like): The value of every node.
+            aggregates (list): Aggregate objects, or names of AGGREGATES (e.g. "min", "center").
+            initiators (array_like): The nodes that start the execution.
+
+        Returns:
+            AggregationResult: The aggregates and the costs of the execution.
+        '''
+        aggregates = [AGGREGATES[aggregate]() if isinstance(aggregate, str) else aggregate for aggregate in aggregates]
+        values = np.asarray(values)
+        if values.shape != (self.n,):
+            raise ValueError(f"Expected {self.n} values, got {values.shape}")
+        for aggregate in aggregates:
+            aggregate.start(values)
+
+        self.status[:] = ASLEEP
+        wake_time, wakeup_messages, wakeup_time = self.wake_up(initiators)
+        parent, saturated, saturation_messages, saturation_time = self.saturate(aggregates)
+        resolution_messages, resolution_time = self.resolve(saturated, parent, aggregates)
+
+        messages = {"wakeup": wakeup_messages, "saturation": saturation_messages, "resolution": resolution_messages}
+        time_units = {"wakeup": wakeup_time, "saturation": saturation_time, "resolution": resolution_time}
+        results = {aggregate.name: aggregate.final(saturated) for aggregate in aggregates}
+        return AggregationResult(results, aggregates, saturated, wake_time, parent, messages, time_units)
+
+    def minimum_finding(self, values, initiators=(0,)):
+        '''
+        Runs the three phases of minimum finding by full saturation.
+
+        Args:
+            values (array_like): The value of every node.
+            initiators (array_like): The nodes that start the execution.
+
+        Returns:
+            SaturationResult: The minimum and the costs of the execution.
+        '''
+        minimum = Minimum()
+        result = self.aggregate(values, [minimum], initiators)
+        return SaturationResult(result.results["min"], result.saturated, result.wake_time, result.parent,
+                                result.messages, result.time_units, minimum.final_holder(result.saturated))
@@ -0,0 +1,272 @@
+import argparse
+from heapq import heappop, heappush
+
+import numpy as np
+
+from saturation_engine import SaturationTree
+
+# Message types
+SPONTANEOUS = 0
+WAKEUP = 1
+SATURATION = 2
+RESOLUTION = 3
+
+# Node states
+ASLEEP = 0
+AWAKE = 1
+PROCESSING = 2
+DONE = 3
+
+
+class SaturationRun:
+    def __init__(self, minimum, saturated, messages, spontaneous, saturation_time, completion_time, wake_time):
+        '''
+        Initializes the SaturationRun object.
+
+        Args:
+            minimum (int): The minimum value, known by every node at the end.
+            saturated (tuple): The saturated nodes, in the order they saturated.
+            messages (dict): Measured number of "wakeup", "saturation" and "resolution" messages.
+            spontaneous (int): Number of initiators that woke up spontaneously (k*), before
+                a wake-up message reached them.
+            saturation_time (float): Time at which the first node saturated.
+            completion_time (float): Time at which the last message was delivered.
+            wake_time (numpy.ndarray): Time at which every node woke up.
+        '''
+        self.minimum = minimum
+        self.saturated = saturated
+        self.messages = messages
+        self.spontaneous = spontaneous
+        self.saturation_time = saturation_time
+        self.completion_time = completion_time
+        self.wake_time = wake_time
+
+    def total_messages(self):
+        '''
+        Returns the measured number of messages, which the protocol bounds to 3n + k* - 4.
+
+        Returns:
+            int: The number of messages.
+        '''
+        return sum(self.messages.values())
+
+
+def random_link_delays(tree, low=0.5, high=1.5, seed=None):
+    '''
+    Draws one random delay per directed link, aligned with tree.neighbors.
+
+    A link keeps its delay for the whole run, so messages on a link arrive in the
+    order they were sent, as the protocol requires.
+
+    Args:
+        tree (SaturationTree): The tree.
+        low (float): Smallest possible delay.
+        high (float): Largest possible delay.
+        seed (int or numpy.random.Generator): Seed of the random generator.
+
+    Returns:
+        numpy.ndarray: Delay of the link offsets[v] + i, i.e. from v to its i-th neighbor.
+    '''
+    rng = np.random.default_rng(seed)
+    return rng.uniform(low, high, size=tree.neighbors.size)
+
+
+def simulate_saturation(tree, values, initiators=(0,), delays=None, start_times=None):
+    '''
+    Discrete-event simulation of minimum finding by full saturation.
+
+    Every node runs the protocol on the messages it receives, one at a time:
+    - ASLEEP: on waking up, spontaneously or by any message, it sends a wake-up
+      message to all its neighbors but the sender; a leaf then sends its value (M) to
+      its neighbor and becomes PROCESSING, any other node becomes AWAKE.
+    - AWAKE: it keeps the smallest value received; once it has heard M from all its
+      neighbors but one, it sends M to that one, its parent, and becomes PROCESSING.
+    - PROCESSING: M from the parent saturates the node, which then knows the minimum;
+      a saturated node, or one notified of the minimum, sends the notification to all
+      its neighbors but the parent and is DONE.
+
+    Events are kept in a heap ordered by delivery time, then by sending order, and the
+    per-node state lives in flat lists, so a run costs O(n log n) whatever the depth.
+
+    Args:
+        tree (SaturationTree): The tree.
+        values (array_like): The value of every node.
+        initiators (array_like): The nodes that may wake up spontaneously.
+        delays (float or numpy.ndarray): Link delay, either one constant or one value per
+            entry of tree.neighbors (see random_link_delays). Defaults to unit delays.
+        start_times (array_like): Time at which every initiator wakes up spontaneously,
+            unless a message woke it up before. Defaults to 0 for all.
+
+    Returns:
+        SaturationRun: The minimum, and the measured messages and times of the run.
+    '''
+    offsets = tree.offsets.tolist()
+    neighbors = tree.neighbors.tolist()
+    if delays is None or np.ndim(delays) == 0:
+        link_delays = [1.0 if delays is None else float(delays)] * len(neighbors)
+    else:
+        link_delays = np.asarray(delays, dtype=float).tolist()
+
+    n = tree.n
+    status = bytearray(n)
+    known = np.asarray(values).tolist()
+    remaining = tree.degrees.tolist()
+    unheard_sum = [sum(neighbors[offsets[node]:offsets[node + 1]]) for node in range(n)]
+    parent = [-1] * n
+    wake_time = [np.inf] * n
+    counts = [0, 0, 0, 0]
+    saturated = []
+    saturation_time = np.inf
+    time = 0.0
+
+    initiators = np.asarray(initiators, dtype=np.int64).tolist()
+    if start_times is None:
+        start_times = [0.0] * len(initiators)
+    events = [(float(start), sequence, node, -1, SPONTANEOUS, None)
+              for sequence, (start, node) in enumerate(zip(start_times, initiators))]
+    events.sort()
+    sequence = len(events)
+
+    while events:
+        time, _, node, sender, kind, value = heappop(events)
+        outgoing = None
+
+        if status[node] == ASLEEP:
+            wake_time[node] = time
+            start, end = offsets[node], offsets[node + 1]
+            for position in range(start, end):
+                if neighbors[position] != sender:
+                    heappush(events, (time + link_delays[position], sequence, neighbors[position], node, WAKEUP, None))
+                    sequence += 1
+                    counts[WAKEUP] += 1
+            if kind == SPONTANEOUS:
+                counts[SPONTANEOUS] += 1
+            if end - start == 1:
+                parent[node] = neighbors[start]
+                outgoing = (start, SATURATION, known[node])
+                status[node] = PROCESSING
+            elif end == start:
+                saturated.append(node)
+                saturation_time = time
+                status[node] = DONE
+            else:
+                status[node] = AWAKE
+
+        elif kind == SATURATION and status[node] == AWAKE:
+            if value < known[node]:
+                known[node] = value
+            remaining[node] -= 1
+            unheard_sum[node] -= sender
+            if remaining[node] == 1:
+                parent[node] = unheard_sum[node]
+                start = offsets[node]
+                outgoing = (start + neighbors[start:offsets[node + 1]].index(parent[node]), SATURATION, known[node])
+                status[node] = PROCESSING
+
+        elif kind != WAKEUP and kind != SPONTANEOUS and status[node] == PROCESSING:
+            # M from the parent saturates the node; a notification carries the minimum
+            if kind == SATURATION:
+                if value < known[node]:
+                    known[node] = value
+                saturated.append(node)
+                saturation_time = min(saturation_time, time)
+            else:
+                known[node] = value
+            for position in range(offsets[node], offsets[node + 1]):
+                if neighbors[position] != parent[node]:
+                    heappush(events, (time + link_delays[position], sequence, neighbors[position], node, RESOLUTION,
+                                      known[node]))
+                    sequence += 1
+                    counts[RESOLUTION] += 1
+            status[node] = DONE
+
+        if outgoing is not None:
+            position, message_type, message = outgoing
+            heappush(events, (time + link_delays[position], sequence, neighbors[position], node, message_type, message))
+            sequence += 1
+            counts[message_type] += 1
+
+    if status.count(DONE) != n:
+        raise ValueError("Some nodes did not terminate: the graph is not a tree, or no initiator woke up")
+    messages = {"wakeup": counts[WAKEUP], "saturation": counts[SATURATION], "resolution": counts[RESOLUTION]}
+    return SaturationRun(known[saturated[0]], tuple(saturated), messages, counts[SPONTANEOUS], saturation_time, time,
+                         np.array(wake_time))
+
+
+def randomized_runs(tree, runs, max_initiators=None, low=0.5, high=1.5, seed=0):
+    '''
+    Simulates many runs with random values, initiators, start times and link delays.
+
+    Every run draws between 1 and max_initiators initiators, which start at random times
+    in [0, high), so some of them are woken up by a message before they start.
+
+    Args:
+        tree (SaturationTree): The tree.
+        runs (int): Number of runs.
+        max_initiators (int): Largest number of initiators of a run. Defaults to n.
+        low (float): Smallest link delay.
+        high (float): Largest link delay.
+        seed (int): Seed of the random generator.
+
+    Returns:
+        dict: One array per measure ("messages", "spontaneous", "saturation_time",
+        "completion_time"), with one entry per run.
+    '''
+    rng = np.random.default_rng(seed)
+    max_initiators = tree.n if max_initiators is None else min(max_initiators, tree.n)
+    results = {name: np.zeros(runs) for name in ("messages", "spontaneous", "saturation_time", "completion_time")}
+
+    for run in range(runs):
+        values = rng.integers(0, tree.n, tree.n)
+        initiators = rng.choice(tree.n, int(rng.integers(1, max_initiators + 1)), replace=False)
+        start_times = rng.uniform(0.0, high, initiators.size)
+        result = simulate_saturation(tree, values, initiators, random_link_delays(tree, low, high, rng), start_times)
+        if result.minimum != values.min():
+            raise AssertionError(f"Run {run} found {result.minimum} instead of {values.min()}")
+        results["messages"][run] = result.total_messages()
+        results["spontaneous"][run] = result.spontaneous
+        results["saturation_time"][run] = result.saturation_time
+        results["completion_time"][run] = result.completion_time
+
+    return results
+
+
+def main():
+    '''
+    Checks the message and time bounds of full saturation over many randomized runs.
+
+    Usage: python saturation_simulator.py [tree.topo] [--runs R] [--max-initiators K] [--seed S]
+    '''
+    parser = argparse.ArgumentParser(description="Randomized runs of minimum finding by full saturation")
+    parser.add_argument("topology", nargs="?", help="Binary topology file (defaults to a 100-node random tree)")
+    parser.add_argument("--runs", type=int, default=10000, help="Number of runs")
+    parser.add_argument("--max-initiators", type=int, default=None, help="Largest number of initiators of a run")
+    parser.add_argument("--seed", type=int, default=0, help="Seed of the random runs")
+    args = parser.parse_args()
+
+    if args.topology is None:
+        from topology_generators import random_tree
+        tree = SaturationTree(*random_tree(100, args.seed))
+    else:
+        tree = SaturationTree.from_topology_file(args.topology)
+    low, high = 0.5, 1.5
+    results = randomized_runs(tree, args.runs, args.max_initiators, low, high, args.seed)
+
+    # Messages: exactly 3n + k* - 4. Time: waking up, saturating and notifying each take
+    # at most one delay per hop of a longest path, after the last spontaneous start.
+    n = tree.n
+    expected = 3 * n + results["spontaneous"] - 4
+    wake_time, _, _ = tree.wake_up([0])
+    _, _, diameter = tree.wake_up([int(np.argmax(wake_time))])
+    time_bound = high + 3 * diameter * high
+    print(f"{args.runs} runs on {n} nodes (diameter {diameter}), link delays in [{low}, {high})")
+    print(f"Messages:        min {results['messages'].min():.0f}, mean {results['messages'].mean():.1f}, "
+          f"max {results['messages'].max():.0f}; equal to 3n + k* - 4 in {np.sum(results['messages'] == expected)} runs")
+    for name in ("saturation_time", "completion_time"):
+        print(f"{name + ':':<16} min {results[name].min():.2f}, mean {results[name].mean():.2f}, "
+              f"max {results[name].max():.2f}")
+    print(f"Completion time within {time_bound:.1f} in {np.sum(results['completion_time'] <= time_bound)} runs")
+
+
+if __name__ == "__main__":
+    main()
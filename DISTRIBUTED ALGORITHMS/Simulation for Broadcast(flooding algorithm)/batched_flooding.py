@@ -0,0 +1,116 @@
+import numpy as np
+from scipy import sparse
+
+# Initiators advanced together at most; the visited matrix holds batch_size * V booleans
+DEFAULT_BATCH_SIZE = 1024
+# Default memory budget of the visited matrix, which caps the batch size on large graphs
+DEFAULT_VISITED_BYTES = 256 * 2**20
+
+
+class BatchedFloodingResult:
+    def __init__(self, initiators, completion_rounds, messages, eccentricities, informed):
+        '''
+        Initializes the BatchedFloodingResult object.
+
+        Args:
+            initiators (numpy.ndarray): The initiators, one per entry of the other arrays.
+            completion_rounds (numpy.ndarray): Round at which the last message was delivered.
+            messages (numpy.ndarray): Number of messages sent by each execution.
+            eccentricities (numpy.ndarray): Round at which the last node got informed.
+            informed (numpy.ndarray): Number of nodes reached by each execution.
+        '''
+        self.initiators = initiators
+        self.completion_rounds = completion_rounds
+        self.messages = messages
+        self.eccentricities = eccentricities
+        self.informed = informed
+
+
+def adjacency_matrix(csr):
+    '''
+    Wraps the CSR arrays of a graph into a boolean scipy.sparse matrix without copying the indices.
+
+    Args:
+        csr (CSRGraph): The graph.
+
+    Returns:
+        scipy.sparse.csr_matrix: V x V adjacency matrix.
+    '''
+    data = np.ones(csr.neighbors.size, dtype=bool)
+    return sparse.csr_matrix((data, csr.neighbors, csr.offsets), shape=(csr.V, csr.V))
+
+
+def simulate_flooding_batch(csr, initiators=None, batch_size=None):
+    '''
+    Synchronous-round flooding-minus-sender from many initiators at once.
+
+    Every row of a sparse (initiators x V) boolean frontier matrix is one execution.
+    A round multiplies the frontier by the adjacency matrix, which ORs the
+    neighborhoods of the frontier nodes of every row in one sparse product, and keeps
+    the entries not visited yet.
+
+    With unit delays the message count and completion time follow from the rounds:
+    the initiator sends deg(x) messages and every other informed node deg(v) - 1, so
+    the count is sum(deg) - informed + 1; a node informed at round r that still has
+    someone to send to delivers its last copies at round r + 1.
+
+    Args:
+        csr (CSRGraph): The graph.
+        initiators (array_like): Initiators to simulate (defaults to every node).
+        batch_size (int): Number of initiators advanced together. Defaults to DEFAULT_BATCH_SIZE,
+            or fewer so that the visited matrix fits in DEFAULT_VISITED_BYTES.
+
+    Returns:
+        BatchedFloodingResult: Per-initiator completion rounds and message counts.
+    '''
+    initiators = np.arange(csr.V) if initiators is None else np.asarray(initiators, dtype=np.int64)
+    if batch_size is None:
+        batch_size = max(1, min(DEFAULT_BATCH_SIZE, DEFAULT_VISITED_BYTES // max(csr.V, 1)))
+    adjacency = adjacency_matrix(csr)
+    degrees = csr.degrees
+
+    completion_rounds = np.zeros(initiators.size, dtype=np.int32)
+    messages = np.zeros(initiators.size, dtype=np.int64)
+    eccentricities = np.zeros(initiators.size, dtype=np.int32)
+    informed = np.zeros(initiators.size, dtype=np.int64)
+
+    # Nodes that forward at least one copy when informed by someone else
+    forwards = (degrees > 1).astype(np.int32)
+
+    for first in range(0, initiators.size, batch_size):
+        batch = initiators[first:first + batch_size]
+        rows = np.arange(batch.size)
+        visited = np.zeros(batch.size * csr.V, dtype=bool)
+        visited[rows * csr.V + batch] = True
+
+        result = slice(first, first + batch.size)
+        messages[result] = degrees[batch]
+        informed[result] = 1
+        completion_rounds[result] = degrees[batch] > 0
+
+        frontier = sparse.csr_matrix((np.ones(batch.size, dtype=bool), batch, np.arange(batch.size + 1)),
+                                     shape=(batch.size, csr.V))
+        round_number = 0
+        while True:
+            round_number += 1
+            reached = frontier @ adjacency
+            reached_rows = np.repeat(rows, np.diff(reached.indptr))
+
+            # Rows stay in order, so the new frontier is built directly in CSR form
+            keys = reached_rows * csr.V + reached.indices
+            new = ~visited[keys]
+            if not new.any():
+                break
+            visited[keys[new]] = True
+            counts = np.bincount(reached_rows[new], minlength=batch.size)
+            indptr = np.zeros(batch.size + 1, dtype=np.int64)
+            np.cumsum(counts, out=indptr[1:])
+            frontier = sparse.csr_matrix((np.ones(int(indptr[-1]), dtype=bool), reached.indices[new], indptr),
+                                         shape=(batch.size, csr.V))
+
+            messages[result] += frontier @ (degrees - 1)
+            informed[result] += counts
+            eccentricities[result][counts > 0] = round_number
+            completion_rounds[result][(frontier @ forwards) > 0] = round_number + 1
+
+    return BatchedFloodingResult(initiators, completion_rounds, messages, eccentricities, informed)
@@ -0,0 +1,152 @@
+import os
+from functools import partial
+
+import numpy as np
+
+from parallel_bfs import parallel_map_sources
+
+WORD_BITS = 64
+
+# Above this fraction of the edges, a level scans every neighbor block instead of
+# scattering from the frontier nodes only.
+PULL_THRESHOLD = 0.3
+
+
+def _push_level(csr, active, frontier_bits, scratch, slot):
+    '''
+    Scatters the frontier bitsets of the active nodes to their neighbors.
+
+    Args:
+        csr (CSRGraph): The graph.
+        active (numpy.ndarray): Nodes holding a non-zero frontier bitset.
+        frontier_bits (numpy.ndarray): (words, len(active)) frontier bitsets.
+        scratch (numpy.ndarray): (words, V) zeroed accumulator, left zeroed on return.
+        slot (numpy.ndarray): Scratch array of length V used to deduplicate nodes.
+
+    Returns:
+        tuple: (touched nodes, (words, len(touched)) OR of the bitsets they received).
+    '''
+    targets = csr.expand(active)
+    counts = csr.degrees[active]
+    for word in range(scratch.shape[0]):
+        np.bitwise_or.at(scratch[word], targets, np.repeat(frontier_bits[word], counts))
+
+    positions = np.arange(targets.size)
+    slot[targets] = positions
+    touched = targets[slot[targets] == positions]
+    received = scratch[:, touched]
+    scratch[:, touched] = 0
+    return touched, received
+
+
+def _pull_level(csr, frontier, has_neighbors, segment_starts):
+    '''
+    ORs the frontier bitsets of every node's neighbors with one reduceat per word.
+
+    Args:
+        csr (CSRGraph): The graph.
+        frontier (numpy.ndarray): (words, V) frontier bitsets.
+        has_neighbors (numpy.ndarray): Mask of the nodes of non-zero degree.
+        segment_starts (numpy.ndarray): Start of the neighbor block of those nodes.
+
+    Returns:
+        tuple: (touched nodes, (words, len(touched)) OR of the bitsets they received).
+    '''
+    touched = np.flatnonzero(has_neighbors)
+    received = np.empty((frontier.shape[0], touched.size), dtype=np.uint64)
+    for word in range(frontier.shape[0]):
+        received[word] = np.bitwise_or.reduceat(frontier[word][csr.neighbors], segment_starts)
+    return touched, received
+
+
+def bitparallel_eccentricities(csr, sources=None, words=1):
+    '''
+    Computes eccentricities by running 64 * words BFS traversals at once.
+
+    Every node holds a bitset with one bit per source of the current batch. A BFS
+    level ORs the frontier bitsets along the CSR edges and keeps the bits not yet
+    visited; a source's eccentricity is the last level at which its bit still
+    reached a new node. Sparse levels scatter from the frontier nodes only, dense
+    ones pull over every neighbor block with np.bitwise_or.reduceat.
+
+    Args:
+        csr (CSRGraph): The graph.
+        sources (array_like): Source nodes (defaults to every node).
+        words (int): Number of uint64 words per bitset, i.e. 64 * words sources per batch.
+
+    Returns:
+        numpy.ndarray: Eccentricity of every source, within its connected component.
+    '''
+    sources = np.arange(csr.V) if sources is None else np.asarray(sources, dtype=np.int64)
+    eccentricities = np.zeros(sources.size, dtype=np.int32)
+    batch_size = WORD_BITS * words
+
+    # reduceat needs non-empty segments, so isolated nodes are left out of pull levels
+    has_neighbors = csr.degrees > 0
+    segment_starts = csr.offsets[:-1][has_neighbors]
+    pull_edges = PULL_THRESHOLD * csr.neighbors.size
+
+    visited = np.zeros((words, csr.V), dtype=np.uint64)
+    frontier = np.zeros((words, csr.V), dtype=np.uint64)
+    scratch = np.zeros((words, csr.V), dtype=np.uint64)
+    slot = np.empty(csr.V, dtype=np.int64)
+    one = np.uint64(1)
+
+    for batch_start in range(0, sources.size, batch_size):
+        batch = sources[batch_start:batch_start + batch_size]
+        bit_index = np.arange(batch.size)
+
+        visited[:] = 0
+        source_bits = np.left_shift(one, (bit_index % WORD_BITS).astype(np.uint64))
+        np.bitwise_or.at(visited, (bit_index // WORD_BITS, batch), source_bits)
+        active = np.unique(batch)
+        frontier_bits = visited[:, active]
+        level = 0
+
+        while active.size:
+            level += 1
+            if csr.degrees[active].sum() > pull_edges:
+                frontier[:] = 0
+                frontier[:, active] = frontier_bits
+                touched, received = _pull_level(csr, frontier, has_neighbors, segment_starts)
+            else:
+                touched, received = _push_level(csr, active, frontier_bits, scratch, slot)
+
+            received &= ~visited[:, touched]
+            keep = received.any(axis=0)
+            active = touched[keep]
+            frontier_bits = received[:, keep]
+            if active.size == 0:
+                break
+            visited[:, active] |= frontier_bits
+
+            # Sources whose bit reached a new node at this level
+            active_words = np.bitwise_or.reduce(frontier_bits, axis=1)
+            active_bits = np.unpackbits(active_words.astype('<u8').view(np.uint8), bitorder='little')[:batch.size]
+            eccentricities[batch_start + np.flatnonzero(active_bits)] = level
+
+    return eccentricities
+
+
+def parallel_bitparallel_eccentricities(csr, sources=None, words=1, processes=None):
+    '''
+    Spreads bit-parallel batches over a process pool sharing the CSR arrays.
+
+    Args:
+        csr (CSRGraph): The graph.
+        sources (array_like): Source nodes (defaults to every node).
+        words (int): Number of uint64 words per bitset.
+        processes (int): Number of worker processes (defaults to the number of CPUs).
+
+    Returns:
+        numpy.ndarray: Eccentricity of every source, within its connected component.
+    '''
+    sources = np.arange(csr.V) if sources is None else np.asarray(sources, dtype=np.int64)
+    batch_size = WORD_BITS * words
+    batches = -(-sources.size // batch_size)
+    processes = processes or os.cpu_count()
+
+    # Whole batches per task, about four tasks per worker
+    chunk_size = batch_size * max(1, -(-batches // (4 * processes)))
+    kernel = partial(bitparallel_eccentricities, words=words)
+    return parallel_map_sources(csr, kernel, sources, processes, chunk_size)
@@ -0,0 +1,173 @@
+import numpy as np
+
+
+class CSRGraph:
+    def __init__(self, offsets, neighbors):
+        '''
+        Initializes the CSRGraph object.
+
+        The neighbors of node v are neighbors[offsets[v]:offsets[v + 1]].
+
+        Args:
+            offsets (numpy.ndarray): Array of length V + 1 with the start of each node's neighbor block.
+            neighbors (numpy.ndarray): Concatenated neighbor indices of every node.
+        '''
+        self.offsets = np.asarray(offsets, dtype=np.int64)
+        self.neighbors = np.asarray(neighbors)
+        self.V = len(self.offsets) - 1
+        self.degrees = np.diff(self.offsets)
+        self._visited = None
+        self._slot = None
+
+    @classmethod
+    def from_adjacency_list(cls, adjacency_list):
+        '''
+        Builds a CSRGraph from a dict-of-lists adjacency list with nodes 0..V-1.
+
+        Args:
+            adjacency_list (dict): Adjacency list representation of the graph.
+
+        Returns:
+            CSRGraph: The compact representation of the graph.
+        '''
+        V = len(adjacency_list)
+        degrees = np.zeros(V, dtype=np.int64)
+        for node, neighbors in adjacency_list.items():
+            degrees[node] = len(neighbors)
+
+        offsets = np.zeros(V + 1, dtype=np.int64)
+        np.cumsum(degrees, out=offsets[1:])
+
+        neighbors = np.empty(offsets[-1], dtype=np.int32 if V < 2**31 else np.int64)
+        for node, node_neighbors in adjacency_list.items():
+            neighbors[offsets[node]:offsets[node + 1]] = node_neighbors
+
+        return cls(offsets, neighbors)
+
+    @classmethod
+    def from_edges(cls, V, sources, targets, undirected=True):
+        '''
+        Builds a CSRGraph from parallel arrays of edge endpoints.
+
+        Args:
+            V (int): Number of nodes.
+            sources (array_like): Edge sources.
+            targets (array_like): Edge targets.
+            undirected (bool): Whether every edge is also added in the reverse direction.
+
+        Returns:
+            CSRGraph: The compact representation of the graph.
+        '''
+        sources = np.asarray(sources, dtype=np.int64)
+        targets = np.asarray(targets, dtype=np.int64)
+        if undirected:
+            sources, targets = np.concatenate((sources, targets)), np.concatenate((targets, sources))
+
+        order = np.argsort(sources, kind="stable")
+        degrees = np.bincount(sources, minlength=V)
+
+        offsets = np.zeros(V + 1, dtype=np.int64)
+        np.cumsum(degrees, out=offsets[1:])
+        neighbors = targets[order].astype(np.int32 if V < 2**31 else np.int64)
+
+        return cls(offsets, neighbors)
+
+    def neighbors_of(self, node):
+        '''
+        Returns the neighbors of a node.
+
+        Args:
+            node (int): The node whose neighbors are requested.
+
+        Returns:
+            numpy.ndarray: View on the neighbor block of the node.
+        '''
+        return self.neighbors[self.offsets[node]:self.offsets[node + 1]]
+
+    def expand(self, frontier):
+        '''
+        Gathers the neighbors of every node in a frontier in one vectorized step.
+
+        Args:
+            frontier (numpy.ndarray): The nodes to expand.
+
+        Returns:
+            numpy.ndarray: Concatenated neighbor blocks of the frontier nodes (with repetitions).
+        '''
+        starts = self.offsets[frontier]
+        counts = self.offsets[frontier + 1] - starts
+        total = int(counts.sum())
+        if total == 0:
+            return self.neighbors[:0]
+
+        # Position j of block i lives at starts[i] + (j - first position of block i)
+        block_starts = np.cumsum(counts) - counts
+        index = np.arange(total, dtype=np.int64) + np.repeat(starts - block_starts, counts)
+        return self.neighbors[index]
+
+    def bfs_component(self, start_node):
+        '''
+        Level-synchronous breadth-first search restricted to the nodes it reaches.
+
+        The cost is proportional to the size of the start node's component, which keeps
+        graphs with many small components cheap to scan.
+
+        Args:
+            start_node (int): The node from which BFS traversal starts.
+
+        Returns:
+            tuple: (nodes, distances) of the reached nodes, in BFS order.
+        '''
+        if self._visited is None:
+            self._visited = np.zeros(self.V, dtype=bool)
+            self._slot = np.empty(self.V, dtype=np.int64)
+        visited = self._visited
+        slot = self._slot
+
+        frontier = np.array([start_node], dtype=np.int64)
+        visited[start_node] = True
+        levels = [frontier]
+
+        while True:
+            candidates = self.expand(frontier)
+            candidates = candidates[~visited[candidates]]
+            if candidates.size == 0:
+                break
+            # Deduplicate without sorting: only the last write of each node into slot survives
+            positions = np.arange(candidates.size)
+            slot[candidates] = positions
+            frontier = candidates[slot[candidates] == positions].astype(np.int64)
+            visited[frontier] = True
+            levels.append(frontier)
+
+        nodes = np.concatenate(levels)
+        distances = np.repeat(np.arange(len(levels), dtype=np.int32), [level.size for level in levels])
+        visited[nodes] = False
+        return nodes, distances
+
+    def bfs(self, start_node):
+        '''
+        Level-synchronous breadth-first search that expands a whole frontier per step.
+
+        Args:
+            start_node (int): The node from which BFS traversal starts.
+
+        Returns:
+            numpy.ndarray: Distances from the start node to every node (-1 if unreachable).
+        '''
+        nodes, reached_distances = self.bfs_component(start_node)
+        distances = np.full(self.V, -1, dtype=np.int32)
+        distances[nodes] = reached_distances
+        return distances
+
+    def eccentricity(self, start_node):
+        '''
+        Computes the eccentricity of a node within its connected component.
+
+        Args:
+            start_node (int): The node whose eccentricity is computed.
+
+        Returns:
+            int: The largest BFS distance from the node.
+        '''
+        return int(self.bfs_component(start_node)[1][-1])
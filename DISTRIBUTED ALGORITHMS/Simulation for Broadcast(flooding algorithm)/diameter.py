@@ -0,0 +1,125 @@
+import numpy as np
+
+
+def double_sweep(csr, start_node=None):
+    '''
+    Estimates the diameter with two BFS runs.
+
+    The first BFS finds a node u farthest from the start node, the second one
+    measures the eccentricity of u, which is a lower bound on the diameter.
+
+    Args:
+        csr (CSRGraph): The graph.
+        start_node (int): Node of the first sweep (defaults to the node of highest degree).
+
+    Returns:
+        tuple: (lower_bound, upper_bound) on the diameter of the start node's component.
+    '''
+    if start_node is None:
+        start_node = int(np.argmax(csr.degrees))
+
+    nodes, distances = csr.bfs_component(start_node)
+    start_eccentricity = int(distances[-1])
+    farthest = int(nodes[-1])
+
+    lower_bound = csr.eccentricity(farthest)
+    upper_bound = 2 * start_eccentricity
+    return lower_bound, upper_bound
+
+
+def _component_diameter(csr, nodes, distances, local_index, known_lower):
+    '''
+    Computes the exact diameter of one connected component with the
+    bounding-diameters algorithm (Takes and Kosters).
+
+    Every BFS from a node v gives its exact eccentricity e(v) and, for every node w
+    at distance d from v, the bounds max(d, e(v) - d) <= e(w) <= e(v) + d. Nodes whose
+    bounds can no longer change the diameter are pruned, so sparse real-world graphs
+    usually need only a few tens of BFS runs instead of one per node.
+
+    Args:
+        csr (CSRGraph): The graph.
+        nodes (numpy.ndarray): Nodes of the component, as returned by CSRGraph.bfs_component.
+        distances (numpy.ndarray): Distances of those nodes from the first BFS source.
+        local_index (numpy.ndarray): Scratch array of length V mapping nodes to component positions.
+        known_lower (int): A diameter already found elsewhere; the search stops as soon as
+            the component provably cannot exceed it.
+
+    Returns:
+        int: The diameter of the component, or a value <= known_lower if it cannot exceed it.
+    '''
+    component_nodes = nodes
+    size = component_nodes.size
+    local_index[component_nodes] = np.arange(size)
+    degrees = csr.degrees[component_nodes]
+
+    lower = np.zeros(size, dtype=np.int64)
+    upper = np.full(size, np.iinfo(np.int64).max, dtype=np.int64)
+    candidates = np.ones(size, dtype=bool)
+    diameter_lower = 0
+    diameter_upper = np.iinfo(np.int64).max
+    pick_high = True
+    source = 0
+
+    while True:
+        reached = local_index[nodes]
+        reached_distances = distances.astype(np.int64)
+        eccentricity = int(reached_distances[-1])
+
+        lower[reached] = np.maximum(lower[reached], np.maximum(reached_distances, eccentricity - reached_distances))
+        upper[reached] = np.minimum(upper[reached], eccentricity + reached_distances)
+        candidates[source] = False
+
+        diameter_lower = int(lower.max())
+        diameter_upper = int(upper.max())
+        if diameter_lower == diameter_upper or diameter_upper <= known_lower:
+            break
+
+        # Drop nodes that are solved or that cannot improve either diameter bound
+        candidates &= lower != upper
+        candidates &= ~((upper <= diameter_lower) & (2 * lower >= diameter_upper))
+        candidate_nodes = np.flatnonzero(candidates)
+        if candidate_nodes.size == 0:
+            break
+
+        # Alternate between the candidate of largest upper bound and smallest lower bound,
+        # breaking ties on degree.
+        if pick_high:
+            keys = np.lexsort((-degrees[candidate_nodes], -upper[candidate_nodes]))
+        else:
+            keys = np.lexsort((-degrees[candidate_nodes], lower[candidate_nodes]))
+        source = int(candidate_nodes[keys[0]])
+        pick_high = not pick_high
+
+        nodes, distances = csr.bfs_component(int(component_nodes[source]))
+
+    return diameter_lower
+
+
+def bounding_diameter(csr):
+    '''
+    Computes the exact diameter (largest eccentricity over all connected components)
+    by running the bounding-diameters algorithm on every component.
+
+    Args:
+        csr (CSRGraph): The graph.
+
+    Returns:
+        int: The diameter of the graph.
+    '''
+    seen = np.zeros(csr.V, dtype=bool)
+    local_index = np.empty(csr.V, dtype=np.int64)
+    diameter = 0
+
+    for start_node in range(csr.V):
+        if seen[start_node]:
+            continue
+        nodes, distances = csr.bfs_component(start_node)
+        seen[nodes] = True
+
+        # The component's diameter is at most twice the eccentricity of any of its nodes
+        if 2 * int(distances[-1]) <= diameter:
+            continue
+        diameter = max(diameter, _component_diameter(csr, nodes, distances, local_index, diameter))
+
+    return diameter
@@ -0,0 +1,227 @@
+from collections import OrderedDict
+
+import numpy as np
+
+# Default memory budget of the exact distance arrays kept by a DistanceCache
+DEFAULT_CACHE_BYTES = 256 * 2**20
+
+
+class DistanceCache:
+    def __init__(self, max_bytes=DEFAULT_CACHE_BYTES):
+        '''
+        Least-recently-used cache of BFS distance arrays, bounded by their total size.
+
+        Args:
+            max_bytes (int): Memory budget of the cached arrays.
+        '''
+        self.max_bytes = max_bytes
+        self.nbytes = 0
+        self.hits = 0
+        self.misses = 0
+        self._arrays = OrderedDict()
+
+    def __contains__(self, source):
+        return source in self._arrays
+
+    def __len__(self):
+        return len(self._arrays)
+
+    def get(self, source):
+        '''
+        Returns the cached distance array of a source and marks it as recently used.
+
+        Args:
+            source (int): The source node.
+
+        Returns:
+            numpy.ndarray: The distance array, or None if it is not cached.
+        '''
+        distances = self._arrays.get(source)
+        if distances is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self._arrays.move_to_end(source)
+        return distances
+
+    def put(self, source, distances):
+        '''
+        Caches the distance array of a source, evicting the least recently used ones
+        until the budget is met. Arrays larger than the whole budget are not cached, but
+        are made read-only all the same.
+
+        Args:
+            source (int): The source node.
+            distances (numpy.ndarray): Distances from the source to every node.
+        '''
+        # Cached arrays are shared by every caller, so they must not be modified; the
+        # ones too large to cache are read-only too, so callers see the same behavior
+        distances.flags.writeable = False
+        if distances.nbytes > self.max_bytes:
+            return
+        if source in self._arrays:
+            self.nbytes -= self._arrays.pop(source).nbytes
+        while self._arrays and self.nbytes + distances.nbytes > self.max_bytes:
+            self.nbytes -= self._arrays.popitem(last=False)[1].nbytes
+
+        self._arrays[source] = distances
+        self.nbytes += distances.nbytes
+
+    def distances(self, csr, source):
+        '''
+        Returns the distances from a source, running a BFS only on a cache miss.
+
+        Args:
+            csr (CSRGraph): The graph.
+            source (int): The source node.
+
+        Returns:
+            numpy.ndarray: Read-only distances to every node (-1 if unreachable).
+        '''
+        distances = self.get(source)
+        if distances is None:
+            distances = csr.bfs(source)
+            self.put(source, distances)
+        return distances
+
+    def clear(self):
+        '''
+        Drops every cached array.
+        '''
+        self._arrays.clear()
+        self.nbytes = 0
+
+
+class DistanceOracle:
+    def __init__(self, csr, num_landmarks=16, cache=None):
+        '''
+        Builds a landmark index answering distance queries on a static graph.
+
+        One BFS per landmark stores the distances from the landmark to every node. By
+        the triangle inequality |d(l, u) - d(l, v)| <= d(u, v) <= d(l, u) + d(l, v) for
+        every landmark l, which often pins the distance exactly; otherwise the exact
+        answer comes from a cached BFS of u or v, or from a new one.
+
+        Landmarks are picked by farthest-point sampling: the highest-degree node first,
+        then repeatedly the node farthest from every landmark so far (nodes of
+        components without a landmark count as infinitely far).
+
+        Args:
+            csr (CSRGraph): The graph (undirected).
+            num_landmarks (int): Number of landmarks (at most one per node).
+            cache (DistanceCache): Cache of exact distance arrays (a new one by default).
+        '''
+        self.csr = csr
+        self.cache = cache if cache is not None else DistanceCache()
+
+        num_landmarks = min(num_landmarks, csr.V)
+        self.landmarks = np.empty(num_landmarks, dtype=np.int64)
+        self.landmark_distances = np.empty((num_landmarks, csr.V), dtype=np.int32)
+        self._landmark_row = {}
+        self._eccentricities = {}
+
+        nearest = np.full(csr.V, np.iinfo(np.int64).max, dtype=np.int64)
+        landmark = int(np.argmax(csr.degrees)) if csr.V else 0
+        for i in range(num_landmarks):
+            distances = csr.bfs(landmark)
+            self.landmarks[i] = landmark
+            self.landmark_distances[i] = distances
+            self._landmark_row[landmark] = i
+
+            reached = distances >= 0
+            nearest[reached] = np.minimum(nearest[reached], distances[reached])
+            landmark = int(np.argmax(nearest))
+            if nearest[landmark] == 0:
+                # Every node is a landmark already
+                self.landmarks = self.landmarks[:i + 1]
+                self.landmark_distances = self.landmark_distances[:i + 1]
+                break
+        self.landmark_distances.flags.writeable = False
+
+    def bounds(self, source, targets):
+        '''
+        Bounds the distances from a source using the landmarks only.
+
+        Args:
+            source (int): The source node.
+            targets (int or array_like): One or several target nodes.
+
+        Returns:
+            tuple: (lower, upper) bounds, -1 for both when a landmark proves the nodes
+                disconnected and upper = -1 alone when no landmark reaches them.
+        '''
+        from_source = self.landmark_distances[:, source]
+        to_targets = self.landmark_distances[:, targets]
+        if to_targets.ndim == 2:
+            from_source = from_source[:, None]
+
+        both = (from_source >= 0) & (to_targets >= 0)
+        one = (from_source >= 0) != (to_targets >= 0)
+        lower = np.where(both, np.abs(from_source - to_targets), 0).max(axis=0, initial=0)
+        upper = np.where(both, from_source + to_targets, np.iinfo(np.int32).max).min(axis=0, initial=np.iinfo(np.int32).max)
+
+        disconnected = one.any(axis=0)
+        upper = np.where(upper == np.iinfo(np.int32).max, -1, upper)
+        lower = np.where(disconnected, -1, lower)
+        upper = np.where(disconnected, -1, upper)
+        if np.ndim(lower) == 0:
+            return int(lower), int(upper)
+        return lower, upper
+
+    def distances(self, source):
+        '''
+        Returns the exact distances from a source to every node.
+
+        Args:
+            source (int): The source node.
+
+        Returns:
+            numpy.ndarray: Read-only distances to every node (-1 if unreachable).
+        '''
+        row = self._landmark_row.get(source)
+        if row is not None:
+            return self.landmark_distances[row]
+        return self.cache.distances(self.csr, source)
+
+    def distance(self, source, target):
+        '''
+        Returns the exact hop distance between two nodes.
+
+        Landmark bounds and cached arrays answer most repeated queries without a BFS;
+        the graph being undirected, a cached array of either endpoint will do.
+
+        Args:
+            source (int): The source node.
+            target (int): The target node.
+
+        Returns:
+            int: The distance (-1 if the nodes are disconnected).
+        '''
+        for node, other in ((source, target), (target, source)):
+            row = self._landmark_row.get(node)
+            if row is not None:
+                return int(self.landmark_distances[row, other])
+            if node in self.cache:
+                return int(self.cache.get(node)[other])
+
+        lower, upper = self.bounds(source, target)
+        if lower == upper:
+            return lower
+        return int(self.distances(source)[target])
+
+    def eccentricity(self, source):
+        '''
+        Returns the largest distance from a source within its connected component, i.e.
+        the number of time units a unit-delay flood from it needs to reach every node.
+        Results are memoized, so repeated queries cost a dict lookup.
+
+        Args:
+            source (int): The source node.
+
+        Returns:
+            int: The eccentricity of the source.
+        '''
+        eccentricity = self._eccentricities.get(source)
+        if eccentricity is None:
+            eccentricity = self._eccentricities[source] = int(self.distances(source).max())
+        return eccentricity
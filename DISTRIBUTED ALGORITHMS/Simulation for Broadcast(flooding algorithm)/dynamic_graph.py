@@ -0,0 +1,439 @@
+from collections import defaultdict, deque
+from heapq import heappop, heappush
+
+import numpy as np
+
+from csr_graph import CSRGraph
+
+UNBOUNDED = np.iinfo(np.int32).max
+
+# A repair touching more than this fraction of the nodes is replaced by a full
+# vectorized BFS, which is cheaper than the per-node Python updates at that point.
+REPAIR_FRACTION = 0.02
+
+
+class DynamicGraph:
+    def __init__(self, csr, initiator=0, max_sources=64):
+        '''
+        Maintains the diameter and the flooding time of a graph under edge updates.
+
+        The graph keeps exact BFS distance arrays from a few sources: the flooding
+        initiator and the nodes picked by the bounding-diameters algorithm. With
+        ecc(s) known for every source s, each node v satisfies
+        ecc(v) <= min_s(d(s, v) + ecc(s)), and the diameter equals max_s ecc(s) as
+        soon as that upper bound stays below it for every node.
+
+        An edge update repairs the distance arrays in place, touching only the nodes
+        whose distance changes (or running one vectorized BFS when that region is
+        large), and rechecks the bound on those nodes only. The full (vectorized) check
+        and extra BFS runs are needed only when the certificate breaks, i.e. when the
+        eccentricity of a source grows or the best lower bound drops.
+
+        Updates go to an overlay of added and removed edges on top of the CSR arrays,
+        which are rebuilt only before a full BFS. The set of nodes is fixed.
+
+        Args:
+            csr (CSRGraph): The initial graph (undirected).
+            initiator (int): Node from which the flooding time is measured.
+            max_sources (int): Number of tracked sources above which the ones that no
+                longer give the best upper bound of any node are dropped.
+        '''
+        self.csr = csr
+        self.V = csr.V
+        self.initiator = initiator
+        self.max_sources = max_sources
+        self._repair_budget = max(1024, int(REPAIR_FRACTION * self.V))
+
+        self._added = defaultdict(set)
+        self._removed = defaultdict(set)
+
+        self.sources = []
+        self._rows = np.empty((4, self.V), dtype=np.int32)
+        self.distances = self._rows[:0]
+        self.eccentricities = np.empty(0, dtype=np.int32)
+        self._levels = []
+        self._pick_high = True
+
+        self._add_source(initiator)
+        self.diameter = self._certify(None)
+
+    @property
+    def flooding_time(self):
+        '''
+        Time units a unit-delay flood from the initiator needs to reach every node of its component.
+        '''
+        return int(self.eccentricities[0])
+
+    def neighbors_of(self, node):
+        '''
+        Returns the current neighbors of a node.
+
+        Args:
+            node (int): The node.
+
+        Returns:
+            list: The neighbors of the node.
+        '''
+        neighbors = self.csr.neighbors_of(node).tolist()
+        removed = self._removed.get(node)
+        if removed:
+            neighbors = [neighbor for neighbor in neighbors if neighbor not in removed]
+        added = self._added.get(node)
+        if added:
+            neighbors.extend(added)
+        return neighbors
+
+    def has_edge(self, u, v):
+        '''
+        Checks whether two nodes are currently linked.
+
+        Args:
+            u (int): First node.
+            v (int): Second node.
+
+        Returns:
+            bool: Whether the edge exists.
+        '''
+        if v in self._added.get(u, ()):
+            return True
+        if v in self._removed.get(u, ()):
+            return False
+        return bool((self.csr.neighbors_of(u) == v).any())
+
+    def add_edge(self, u, v):
+        '''
+        Inserts an edge and updates the distances, the diameter and the flooding time.
+
+        Args:
+            u (int): First node.
+            v (int): Second node.
+
+        Returns:
+            tuple: (diameter, flooding time) after the update.
+        '''
+        if u == v:
+            raise ValueError("Self-loops are not supported")
+        if not self.has_edge(u, v):
+            for a, b in ((u, v), (v, u)):
+                if b in self._removed.get(a, ()):
+                    self._discard(self._removed, a, b)
+                else:
+                    self._added[a].add(b)
+            self._update(u, v, self._repair_insertion)
+        return self.diameter, self.flooding_time
+
+    def remove_edge(self, u, v):
+        '''
+        Deletes an edge and updates the distances, the diameter and the flooding time.
+
+        Args:
+            u (int): First node.
+            v (int): Second node.
+
+        Returns:
+            tuple: (diameter, flooding time) after the update.
+        '''
+        if self.has_edge(u, v):
+            for a, b in ((u, v), (v, u)):
+                if b in self._added.get(a, ()):
+                    self._discard(self._added, a, b)
+                else:
+                    self._removed[a].add(b)
+            self._update(u, v, self._repair_deletion)
+        return self.diameter, self.flooding_time
+
+    @staticmethod
+    def _discard(overlay, a, b):
+        '''
+        Removes the link a -> b from an overlay, dropping the set of a once empty.
+
+        Args:
+            overlay (defaultdict): self._added or self._removed.
+            a (int): Source node.
+            b (int): Target node.
+        '''
+        overlay[a].discard(b)
+        if not overlay[a]:
+            del overlay[a]
+
+    def apply(self, events):
+        '''
+        Applies a stream of edge events.
+
+        Args:
+            events (iterable): ("add" or "remove", u, v) tuples.
+
+        Returns:
+            list: (diameter, flooding time) after every event.
+        '''
+        results = []
+        for action, u, v in events:
+            if action == "add":
+                results.append(self.add_edge(u, v))
+            elif action == "remove":
+                results.append(self.remove_edge(u, v))
+            else:
+                raise ValueError(f"Unknown edge event: {action}")
+        return results
+
+    def to_csr(self):
+        '''
+        Folds the pending edge updates into new CSR arrays.
+
+        Returns:
+            CSRGraph: The current graph.
+        '''
+        if not self._added and not self._removed:
+            return self.csr
+
+        sources = np.repeat(np.arange(self.V, dtype=np.int64), self.csr.degrees)
+        targets = self.csr.neighbors.astype(np.int64)
+        if self._removed:
+            removed = np.array([a * self.V + b for a, others in self._removed.items() for b in others], dtype=np.int64)
+            keep = ~np.isin(sources * self.V + targets, removed)
+            sources, targets = sources[keep], targets[keep]
+        added = [(a, b) for a, others in self._added.items() for b in others]
+        if added:
+            added = np.array(added, dtype=np.int64)
+            sources = np.concatenate((sources, added[:, 0]))
+            targets = np.concatenate((targets, added[:, 1]))
+
+        self.csr = CSRGraph.from_edges(self.V, sources, targets, undirected=False)
+        self._added.clear()
+        self._removed.clear()
+        return self.csr
+
+    def _add_source(self, node):
+        '''
+        Runs a full BFS from a node and tracks its distance array.
+
+        Args:
+            node (int): The new source.
+        '''
+        distances = self.to_csr().bfs(node)
+        levels = np.bincount(distances[distances >= 0]).tolist()
+        count = len(self.sources)
+        if count == len(self._rows):
+            # Double the row capacity so that adding sources stays amortized O(V)
+            rows = np.empty((2 * count, self.V), dtype=np.int32)
+            rows[:count] = self.distances
+            self._rows = rows
+        self._rows[count] = distances
+        self.sources.append(node)
+        self.distances = self._rows[:count + 1]
+        self.eccentricities = np.append(self.eccentricities, len(levels) - 1)
+        self._levels.append(levels)
+
+    def _prune_sources(self):
+        '''
+        Drops the sources that give the best upper bound of no node, keeping the
+        initiator and a source of largest eccentricity, so the certificate is unchanged.
+
+        Returns:
+            bool: Whether any source was dropped.
+        '''
+        upper = np.where(self.distances >= 0, self.distances + self.eccentricities[:, None], UNBOUNDED)
+        keep = np.zeros(len(self.sources), dtype=bool)
+        keep[np.unique(upper.argmin(axis=0))] = True
+        keep[0] = True
+        keep[np.argmax(self.eccentricities)] = True
+        if keep.all():
+            return False
+
+        kept = np.flatnonzero(keep)
+        self._rows[:kept.size] = self.distances[kept]
+        self.distances = self._rows[:kept.size]
+        self.eccentricities = self.eccentricities[kept]
+        self.sources = [self.sources[i] for i in kept]
+        self._levels = [self._levels[i] for i in kept]
+        return True
+
+    def _update(self, u, v, repair):
+        '''
+        Repairs every tracked distance array after an edge update and re-certifies the diameter.
+
+        Args:
+            u (int): First node of the edge.
+            v (int): Second node of the edge.
+            repair (callable): _repair_insertion or _repair_deletion.
+        '''
+        old_lower = int(self.eccentricities.max())
+        changed = []
+        eccentricity_grew = False
+
+        for i in range(len(self.sources)):
+            distances = self.distances[i]
+            old_distances = repair(distances, u, v)
+            if old_distances is None:
+                # Too many nodes are affected: recompute the whole array at once
+                new_distances = self.to_csr().bfs(self.sources[i])
+                changed.append(np.flatnonzero(new_distances != distances))
+                distances[:] = new_distances
+                levels = self._levels[i] = np.bincount(new_distances[new_distances >= 0]).tolist()
+            else:
+                levels = self._levels[i]
+                for node, old in old_distances.items():
+                    new = int(distances[node])
+                    if old >= 0:
+                        levels[old] -= 1
+                    if new >= 0:
+                        if new >= len(levels):
+                            levels.extend([0] * (new + 1 - len(levels)))
+                        levels[new] += 1
+                while levels and levels[-1] == 0:
+                    levels.pop()
+                changed.append(np.fromiter(old_distances, dtype=np.int64, count=len(old_distances)))
+
+            eccentricity = len(levels) - 1
+            eccentricity_grew |= eccentricity > self.eccentricities[i]
+            self.eccentricities[i] = eccentricity
+
+        # Unless a bound got looser, only the nodes whose distances moved can break the certificate
+        changed = np.unique(np.concatenate(changed))
+        if eccentricity_grew or self.eccentricities.max() < old_lower:
+            self.diameter = self._certify(None)
+        elif changed.size:
+            self.diameter = self._certify(changed)
+
+    def _repair_insertion(self, distances, u, v):
+        '''
+        Lowers the distances that the new edge (u, v) shortens.
+
+        Args:
+            distances (numpy.ndarray): Distance array of one source, updated in place.
+            u (int): First node of the edge.
+            v (int): Second node of the edge.
+
+        Returns:
+            dict: Old distance of every node whose distance changed, or None (with the
+                array left untouched) when the repair would exceed the budget.
+        '''
+        if distances[u] < 0 and distances[v] < 0:
+            return {}
+        if distances[u] < 0 or (distances[v] >= 0 and distances[v] < distances[u]):
+            u, v = v, u
+        if distances[v] >= 0 and distances[v] <= distances[u] + 1:
+            return {}
+
+        old_distances = {v: int(distances[v])}
+        distances[v] = distances[u] + 1
+        queue = deque([v])
+        while queue:
+            node = queue.popleft()
+            distance = distances[node] + 1
+            for neighbor in self.neighbors_of(node):
+                if distances[neighbor] < 0 or distances[neighbor] > distance:
+                    old_distances.setdefault(neighbor, int(distances[neighbor]))
+                    distances[neighbor] = distance
+                    queue.append(neighbor)
+            if len(old_distances) > self._repair_budget:
+                for node, old in old_distances.items():
+                    distances[node] = old
+                return None
+        return old_distances
+
+    def _repair_deletion(self, distances, u, v):
+        '''
+        Raises the distances of the nodes that lost every shortest path with the edge (u, v).
+
+        The affected nodes are found level by level: a node is affected when none of its
+        neighbors one level closer to the source is still supported. Their distances are
+        then recomputed by a Dijkstra run seeded from the unaffected nodes around them.
+
+        Args:
+            distances (numpy.ndarray): Distance array of one source, updated in place.
+            u (int): First node of the edge.
+            v (int): Second node of the edge.
+
+        Returns:
+            dict: Old distance of every node whose distance changed, or None (with the
+                array left untouched) when the repair would exceed the budget.
+        '''
+        if distances[u] < 0 or distances[u] == distances[v]:
+            return {}
+        if distances[u] > distances[v]:
+            u, v = v, u
+
+        def supported(node, affected):
+            parent_distance = distances[node] - 1
+            return any(distances[neighbor] == parent_distance and neighbor not in affected
+                       for neighbor in self.neighbors_of(node))
+
+        if supported(v, ()):
+            return {}
+
+        # FIFO order marks a whole level before the next one is examined
+        affected = {v}
+        queue = deque([v])
+        while queue:
+            node = queue.popleft()
+            child_distance = distances[node] + 1
+            for neighbor in self.neighbors_of(node):
+                if distances[neighbor] == child_distance and neighbor not in affected and not supported(neighbor, affected):
+                    affected.add(neighbor)
+                    queue.append(neighbor)
+            if len(affected) > self._repair_budget:
+                return None
+
+        heap = []
+        for node in affected:
+            outside = [distances[neighbor] for neighbor in self.neighbors_of(node)
+                       if neighbor not in affected and distances[neighbor] >= 0]
+            if outside:
+                heappush(heap, (int(min(outside)) + 1, node))
+
+        old_distances = {node: int(distances[node]) for node in affected}
+        for node in affected:
+            distances[node] = -1
+        while heap:
+            distance, node = heappop(heap)
+            if distances[node] >= 0:
+                continue
+            distances[node] = distance
+            for neighbor in self.neighbors_of(node):
+                if neighbor in affected and distances[neighbor] < 0:
+                    heappush(heap, (distance + 1, neighbor))
+        return old_distances
+
+    def _certify(self, candidates):
+        '''
+        Adds BFS sources until no node can have a larger eccentricity than the best
+        lower bound, which is then the diameter.
+
+        Args:
+            candidates (numpy.ndarray): Nodes whose upper bound may exceed the lower bound
+                (None for every node).
+
+        Returns:
+            int: The diameter.
+        '''
+        while True:
+            nodes = np.arange(self.V) if candidates is None else candidates
+            distances = self.distances if candidates is None else self.distances[:, nodes]
+            eccentricities = self.eccentricities[:, None]
+            upper = np.where(distances >= 0, distances + eccentricities, UNBOUNDED).min(axis=0)
+            diameter = int(self.eccentricities.max())
+
+            violators = upper > diameter
+            if not violators.any():
+                return diameter
+
+            if len(self.sources) >= self.max_sources and self._prune_sources():
+                continue
+
+            # Alternate between the violator of largest upper bound and the node of
+            # smallest lower bound (a central one, which tightens many upper bounds at
+            # once), breaking ties on degree as in diameter._component_diameter.
+            nodes = nodes[violators]
+            if self._pick_high:
+                keys = np.lexsort((-self.csr.degrees[nodes], -upper[violators]))
+                source = nodes[keys[0]]
+            else:
+                distances = self.distances
+                lower = np.where(distances >= 0, np.maximum(distances, eccentricities - distances), 0).max(axis=0)
+                lower[self.sources] = UNBOUNDED
+                source = np.lexsort((-self.csr.degrees, lower))[0]
+            self._pick_high = not self._pick_high
+
+            self._add_source(int(source))
+            candidates = nodes
@@ -1,123 +1,286 @@
-import random  
+import os
+import sys
+
+import numpy as np
+
+from batched_flooding import simulate_flooding_batch
+from bitparallel_bfs import bitparallel_eccentricities, parallel_bitparallel_eccentricities
+from csr_graph import CSRGraph
+from diameter import bounding_diameter, double_sweep
+from distance_oracle import DEFAULT_CACHE_BYTES, DistanceCache, DistanceOracle
+from dynamic_graph import DynamicGraph
+from flooding_simulator import simulate_flooding
+from parallel_bfs import graph_metrics, parallel_eccentricities
+from partitioned_flooding import block_partition, bfs_partition, simulate_flooding_partitioned
+
+# The binary topology format is shared by the scripts of every algorithm folder
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "Topology"))
+from topology_file import load_topology
 
 class Graph:
-    def __init__(self, adjacency_list):
+    def __init__(self, adjacency_list=None, csr=None, cache_bytes=DEFAULT_CACHE_BYTES):
         '''
         Initializes the Graph object.
 
         Args:
             adjacency_list (dict): Adjacency list representation of the graph.
+            csr (CSRGraph): Compact representation to use instead of an adjacency list.
+            cache_bytes (int): Memory budget of the BFS distance arrays kept by bfs.
         '''
         self.graph = adjacency_list
-        self.V = len(adjacency_list)
+        self.csr = csr if csr is not None else CSRGraph.from_adjacency_list(adjacency_list)
+        self.V = self.csr.V
+        self.distance_cache = DistanceCache(cache_bytes)
+        self.oracle = None
 
-    def flood_fill(self, initiator):
+    @classmethod
+    def from_topology_file(cls, path):
         '''
-        Conducts flood fill traversal starting from a given node.
+        Opens a graph stored in the binary topology format (see Topology/topology_file.py).
+
+        The CSR arrays are memory-mapped views on the file, so nothing is copied.
 
         Args:
-            initiator (int): The node from which flood fill traversal starts.
+            path (str): The topology file.
+
+        Returns:
+            Graph: The graph.
         '''
-        visited = [False] * self.V
-        messages_sent = 0
+        topology = load_topology(path)
+        return cls(csr=CSRGraph(topology.offsets, topology.neighbors))
 
-        def flood_util(v, sender):
-            '''
-            Utility function for flood fill traversal.
+    def flood_fill(self, initiator, delays=None, verbose=True, processes=None, partition="bfs"):
+        '''
+        Simulates the flooding-minus-sender protocol starting from a given node.
 
-            Args:
-                v (int): Current node being processed.
-                sender (int): Node from which the message is received.
-            '''
-            nonlocal messages_sent
+        Args:
+            initiator (int): The node from which the flooding starts.
+            delays (float or numpy.ndarray): Constant link delay or one delay per CSR link
+                (see flooding_simulator.random_link_delays). Defaults to unit delays.
+            verbose (bool): Whether to print every send event (only sensible for small graphs,
+                and not available with processes).
+            processes (int): If given, split the graph into that many partitions, each
+                simulated by its own worker process (see partitioned_flooding).
+            partition (str): "bfs" for BFS-grown partitions or "block" for contiguous id blocks.
 
-            if sender == -1:
-                print(f"Node {v} sends messages to nodes {', '.join(map(str, sorted(self.graph[v])))}.")
+        Returns:
+            FloodingResult: Measured message count, completion time and reception times.
+        '''
+        if processes is None:
+            result = simulate_flooding(self.csr, initiator, delays, record_trace=verbose)
+        else:
+            if partition == "bfs":
+                owner = bfs_partition(self.csr, processes)
+            elif partition == "block":
+                owner = block_partition(self.csr, processes)
             else:
-                receiver_nodes = [neighbor for neighbor in self.graph[v]]  # Include sender node in receiver nodes
-                receiver_nodes.sort()  # Sort receiver nodes
-
-            visited[v] = True
-
-            if sender != -1:
-                messages_sent += 1
+                raise ValueError(f"Unknown partition method: {partition}")
+            result = simulate_flooding_partitioned(self.csr, initiator, delays, owner)
 
-            for neighbor in self.graph[v]:
-                if not visited[neighbor]:
-                    flood_util(neighbor, v)
+        if verbose and result.trace is not None:
+            for time, node, sender, receivers in result.trace:
+                if sender == -1:
+                    print(f"Node {node} sends messages to nodes {', '.join(map(str, receivers))}.")
+                elif receivers:
+                    print(f"Node {node} receives the message from node {sender} at time {time:g} and sends it to nodes {', '.join(map(str, receivers))}.")
+                else:
+                    print(f"Node {node} receives the message from node {sender} at time {time:g} and has no one else to send it to.")
 
-        flood_util(initiator, -1)
+        # 2m - n + 1 over the component of the initiator
+        informed = result.informed()
+        reached = int(informed.sum())
+        edges = int(self.csr.degrees[informed].sum()) // 2
+        print("Total messages sent:", result.messages)
+        print("Expected messages (2m - n + 1):", 2 * edges - reached + 1)
+        print("Unit of time:", f"{result.completion_time:g}")
 
-        # Node 1 sends a message to node 3
-        print(f"Node 1 sends a message to node 3")
+        return result
 
-        # Node 2 sends a message to node 3
-        print(f"Node 2 sends a message to node 3")
-
-        # Node 3 randomly sends a message to node 1 or node 2
-        target_node = random.choice([1, 2])
-        print(f"Node 3 receives a message from nodes 1 and 2, processes them, and sends a message to node {target_node}.")
+    def flood_all(self, initiators=None, batch_size=None):
+        '''
+        Simulates synchronous-round flooding from many initiators at once.
 
-        # Total messages sent
-        total_messages = messages_sent + 2  # Includes messages from nodes 1 and 2
-        print("Total messages sent:", total_messages)
+        Args:
+            initiators (array_like): Initiators to simulate (defaults to every node).
+            batch_size (int): Number of initiators advanced together by one sparse product
+                (defaults to what the memory budget of batched_flooding.py allows).
 
-        # Calculate diameter of the graph + 1 (unit of time)
-        diameter = self.calculate_diameter()
-        unit_of_time = diameter + 1
-        print("Unit of time:", unit_of_time)
+        Returns:
+            BatchedFloodingResult: Per-initiator completion rounds and message counts.
+        '''
+        return simulate_flooding_batch(self.csr, initiators, batch_size)
 
-    def calculate_diameter(self):
+    def calculate_diameter(self, method="bounding"):
         '''
         Calculates the diameter of the graph.
 
+        Args:
+            method (str): "bounding" for the exact eccentricity-bounds algorithm,
+                "double_sweep" for a cheap lower bound, "parallel" for one BFS per node
+                spread over worker processes, or "all_sources" for one BFS per node.
+
         Returns:
-            int: Diameter of the graph.
+            int: Diameter of the graph (a lower bound for "double_sweep").
         '''
+        if method == "bounding":
+            return bounding_diameter(self.csr)
+        if method == "double_sweep":
+            return double_sweep(self.csr)[0]
+        if method == "parallel":
+            return int(self.eccentricities("parallel").max())
+        if method != "all_sources":
+            raise ValueError(f"Unknown diameter method: {method}")
+
         max_distance = 0
 
         # Calculate the maximum distance between nodes using BFS
         for start_node in range(self.V):
-            distances = self.bfs(start_node)
-            max_distance = max(max_distance, max(distances))
+            max_distance = max(max_distance, self.csr.eccentricity(start_node))
 
         return max_distance
 
+    def dynamic(self, initiator=0, max_sources=64):
+        '''
+        Starts tracking the diameter and flooding time under a stream of edge updates.
+
+        Args:
+            initiator (int): Node from which the flooding time is measured.
+            max_sources (int): Number of BFS sources kept before the certificate is rebuilt.
+
+        Returns:
+            DynamicGraph: Accepts add_edge, remove_edge and apply(events) and reports
+                (diameter, flooding time) after every update.
+        '''
+        return DynamicGraph(self.csr, initiator, max_sources)
+
+    def eccentricities(self, method="parallel", processes=None):
+        '''
+        Calculates the eccentricity of every node (within its connected component).
+
+        Args:
+            method (str): "parallel" to spread the BFS runs over worker processes sharing
+                the CSR arrays, "bitparallel" to run 64 BFS traversals per bitset word, or
+                "sequential" to run one BFS per node in this process.
+            processes (int): Number of worker processes. Defaults to the number of CPUs for
+                "parallel"; "bitparallel" runs in this process unless it is given.
+
+        Returns:
+            numpy.ndarray: Eccentricity of every node.
+        '''
+        if method == "parallel":
+            return parallel_eccentricities(self.csr, processes=processes)
+        if method == "bitparallel":
+            if processes is None:
+                return bitparallel_eccentricities(self.csr)
+            return parallel_bitparallel_eccentricities(self.csr, processes=processes)
+        if method == "sequential":
+            return np.array([self.csr.eccentricity(node) for node in range(self.V)], dtype=np.int32)
+        raise ValueError(f"Unknown eccentricity method: {method}")
+
+    def graph_metrics(self, method="parallel", processes=None):
+        '''
+        Calculates diameter, radius and center from the eccentricity of every node.
+
+        Args:
+            method (str): Eccentricity method, see eccentricities.
+            processes (int): Number of worker processes for "parallel".
+
+        Returns:
+            dict: diameter, radius, center and eccentricities.
+        '''
+        return graph_metrics(self.eccentricities(method, processes))
+
+    def flooding_time_bounds(self, method="bitparallel", processes=None):
+        '''
+        Bounds the flooding completion time, with unit delays, for every possible initiator.
+
+        All nodes hold the message after ecc(x) time units and the last copies are
+        delivered one unit later at most, so ecc(x) <= T(x) <= ecc(x) + 1.
+
+        Args:
+            method (str): Eccentricity method, see eccentricities.
+            processes (int): Number of worker processes, see eccentricities.
+
+        Returns:
+            tuple: (lower, upper) arrays indexed by initiator.
+        '''
+        eccentricities = self.eccentricities(method, processes)
+        return eccentricities, eccentricities + 1
+
     def bfs(self, start_node):
         '''
         Performs breadth-first search traversal starting from a given node.
 
+        The result is kept in an LRU cache, so repeated calls for the same node are free.
+
         Args:
             start_node (int): The node from which BFS traversal starts.
 
         Returns:
-            list: List containing distances from the start node to every other node.
+            numpy.ndarray: Read-only distances from the start node to every other node (-1 if unreachable).
         '''
-        distances = [-1] * self.V
-        queue = [start_node]
-        distances[start_node] = 0
+        return self.distance_cache.distances(self.csr, start_node)
 
-        while queue:
-            current_node = queue.pop(0)
-            for neighbor in self.graph[current_node]:
-                if distances[neighbor] == -1:
-                    distances[neighbor] = distances[current_node] + 1
-                    queue.append(neighbor)
+    def build_distance_oracle(self, num_landmarks=16):
+        '''
+        Builds the landmark index used by distance and time_units (one BFS per landmark).
 
-        return distances
+        Args:
+            num_landmarks (int): Number of landmarks.
 
-if __name__ == "__main__":
-    # Representing the graph
-    adjacency_list = {
-        0: [1, 2],
-        1: [0, 3],
-        2: [0, 3],
-        3: [1, 2]
-    }
+        Returns:
+            DistanceOracle: The index, sharing the BFS cache of the graph.
+        '''
+        self.oracle = DistanceOracle(self.csr, num_landmarks, self.distance_cache)
+        return self.oracle
+
+    def distance(self, source, target):
+        '''
+        Returns the hop count between two nodes, building the landmark index on first use.
+
+        Args:
+            source (int): The source node.
+            target (int): The target node.
+
+        Returns:
+            int: The distance (-1 if the nodes are disconnected).
+        '''
+        if self.oracle is None:
+            self.build_distance_oracle()
+        return self.oracle.distance(source, target)
 
-    g = Graph(adjacency_list)
+    def time_units(self, initiator):
+        '''
+        Returns how many time units a unit-delay flood from a node needs to reach every node.
+
+        Args:
+            initiator (int): The node from which the flooding starts.
+
+        Returns:
+            int: The eccentricity of the initiator.
+        '''
+        if self.oracle is None:
+            self.build_distance_oracle()
+        return self.oracle.eccentricity(initiator)
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1:
+        # python "flooding minus sender.py" <topology file> [initiator]
+        g = Graph.from_topology_file(sys.argv[1])
+        initiator_node = int(sys.argv[2]) if len(sys.argv) > 2 else 0
+        verbose = False
+    else:
+        # Representing the graph
+        adjacency_list = {
+            0: [1, 2],
+            1: [0, 3],
+            2: [0, 3],
+            3: [1, 2]
+        }
 
-    initiator_node = 0
+        g = Graph(adjacency_list)
+        initiator_node = 0
+        verbose = True
 
     print("Starting flood fill from node", initiator_node)
-    g.flood_fill(initiator_node)
+    g.flood_fill(initiator_node, verbose=verbose)
@@ -0,0 +1,116 @@
+from heapq import heappop, heappush
+
+import numpy as np
+
+
+class FloodingResult:
+    def __init__(self, initiator, messages, completion_time, receive_time, parent, trace=None):
+        '''
+        Initializes the FloodingResult object.
+
+        Args:
+            initiator (int): The node that started the flooding.
+            messages (int): Number of messages sent during the execution.
+            completion_time (float): Time at which the last message was delivered.
+            receive_time (numpy.ndarray): Time at which every node first received the message (inf if never).
+            parent (numpy.ndarray): Node from which every node first received the message (-1 if none).
+            trace (list): Optional list of (time, node, sender, receivers) tuples, one per informed node.
+        '''
+        self.initiator = initiator
+        self.messages = messages
+        self.completion_time = completion_time
+        self.receive_time = receive_time
+        self.parent = parent
+        self.trace = trace
+
+    def informed(self):
+        '''
+        Returns the nodes reached by the flooding.
+
+        Returns:
+            numpy.ndarray: Boolean mask of the informed nodes.
+        '''
+        return np.isfinite(self.receive_time)
+
+
+def random_link_delays(csr, low=0.5, high=1.5, seed=None):
+    '''
+    Draws one random delay per directed link, aligned with csr.neighbors.
+
+    Args:
+        csr (CSRGraph): The graph.
+        low (float): Smallest possible delay.
+        high (float): Largest possible delay.
+        seed (int): Seed of the random generator.
+
+    Returns:
+        numpy.ndarray: Delay of the link offsets[v] + i, i.e. from v to its i-th neighbor.
+    '''
+    rng = np.random.default_rng(seed)
+    return rng.uniform(low, high, size=csr.neighbors.size)
+
+
+def simulate_flooding(csr, initiator, delays=None, record_trace=False):
+    '''
+    Discrete-event simulation of the flooding-minus-sender protocol.
+
+    The initiator sends the message to all its neighbors; every other node, on its
+    first reception, forwards it to all neighbors except the sender and ignores any
+    later copy. Events are kept in a heap ordered by delivery time and the per-node
+    state lives in flat arrays, so no recursion or per-node Python object is needed.
+
+    Args:
+        csr (CSRGraph): The graph.
+        initiator (int): The node that starts the flooding.
+        delays (float or numpy.ndarray): Link delay, either one constant or one value per
+            entry of csr.neighbors (see random_link_delays). Defaults to unit delays.
+        record_trace (bool): Whether to keep the list of send events (only for small graphs).
+
+    Returns:
+        FloodingResult: Measured messages, completion time and first-reception times.
+    '''
+    offsets = csr.offsets.tolist()
+    neighbors = csr.neighbors
+    per_link = delays is not None and np.ndim(delays) > 0
+    constant_delay = 1.0 if delays is None else (None if per_link else float(delays))
+
+    informed = bytearray(csr.V)
+    receive_time = np.full(csr.V, np.inf)
+    parent = np.full(csr.V, -1, dtype=np.int64)
+    trace = [] if record_trace else None
+    events = [(0.0, initiator, -1)]
+
+    while events:
+        time, node, sender = heappop(events)
+        if informed[node]:
+            continue
+        informed[node] = 1
+        receive_time[node] = time
+        parent[node] = sender
+
+        start, end = offsets[node], offsets[node + 1]
+        receivers = neighbors[start:end].tolist()
+        if per_link:
+            arrivals = (time + delays[start:end]).tolist()
+        else:
+            arrivals = [time + constant_delay] * len(receivers)
+        if record_trace:
+            trace.append((time, node, sender, [receiver for receiver in receivers if receiver != sender]))
+
+        # Copies sent to already informed nodes (or back to the sender) never need an event
+        for receiver, arrival in zip(receivers, arrivals):
+            if not informed[receiver]:
+                heappush(events, (arrival, receiver, node))
+
+    # Account for every copy in one vectorized pass: each informed node sent the
+    # message over all its links except the one leading back to its sender.
+    senders = np.repeat(np.arange(csr.V), csr.degrees)
+    sent = np.isfinite(receive_time[senders]) & (csr.neighbors != parent[senders])
+    messages = int(sent.sum())
+    if per_link:
+        arrivals = receive_time[senders[sent]] + delays[sent]
+    else:
+        arrivals = receive_time[senders[sent]] + constant_delay
+    completion_time = float(arrivals.max()) if messages else 0.0
+
+    return FloodingResult(initiator, messages, completion_time, receive_time, parent, trace)
@@ -0,0 +1,192 @@
+import os
+from multiprocessing import Pool, shared_memory
+
+import numpy as np
+
+from csr_graph import CSRGraph
+
+# Graph attached by each worker process in _attach_graph
+_worker_graph = None
+_worker_blocks = []
+
+
+class SharedCSR:
+    def __init__(self, csr):
+        '''
+        Copies the CSR arrays of a graph into shared memory once.
+
+        Use it as a context manager so the shared blocks are released afterwards.
+
+        Args:
+            csr (CSRGraph): The graph to share.
+        '''
+        self.blocks = []
+        self.descriptor = tuple(self.share(array) for array in (csr.offsets, csr.neighbors))
+
+    def share(self, array):
+        '''
+        Places one array in a new shared memory block, released together with the graph.
+
+        Args:
+            array (numpy.ndarray): The array to copy.
+
+        Returns:
+            tuple: (block name, shape, dtype string) needed to attach to the block.
+        '''
+        block = shared_memory.SharedMemory(create=True, size=max(array.nbytes, 1))
+        np.ndarray(array.shape, dtype=array.dtype, buffer=block.buf)[:] = array
+        self.blocks.append(block)
+        return block.name, array.shape, array.dtype.str
+
+    def close(self):
+        '''
+        Releases the shared memory blocks.
+        '''
+        for block in self.blocks:
+            block.close()
+            block.unlink()
+        self.blocks = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def attach_shared_array(entry):
+    '''
+    Builds an array view on a shared memory block.
+
+    Args:
+        entry (tuple): (block name, shape, dtype string) as returned by SharedCSR.share.
+
+    Returns:
+        tuple: (numpy.ndarray, the attached SharedMemory block to keep alive).
+    '''
+    name, shape, dtype = entry
+    block = shared_memory.SharedMemory(name=name)
+    return np.ndarray(shape, dtype=np.dtype(dtype), buffer=block.buf), block
+
+
+def attach_shared_csr(descriptor):
+    '''
+    Builds a CSRGraph whose arrays are views on shared memory blocks.
+
+    Args:
+        descriptor (tuple): SharedCSR.descriptor of the graph.
+
+    Returns:
+        tuple: (CSRGraph, list of the attached SharedMemory blocks to keep alive).
+    '''
+    (offsets, offsets_block), (neighbors, neighbors_block) = map(attach_shared_array, descriptor)
+    return CSRGraph(offsets, neighbors), [offsets_block, neighbors_block]
+
+
+def _attach_graph(descriptor):
+    '''
+    Pool initializer: attaches the worker to the shared graph.
+
+    Args:
+        descriptor (tuple): SharedCSR.descriptor of the graph.
+    '''
+    global _worker_graph, _worker_blocks
+    _worker_graph, _worker_blocks = attach_shared_csr(descriptor)
+
+
+def _run_chunk(task):
+    '''
+    Applies a per-source kernel to one chunk of sources on the worker's shared graph.
+
+    Args:
+        task (tuple): (kernel, first, sources) where kernel(csr, sources) returns one value
+            per source and first is the position of the chunk in the full source list.
+
+    Returns:
+        tuple: (first, kernel results for the chunk).
+    '''
+    kernel, first, sources = task
+    return first, kernel(_worker_graph, sources)
+
+
+def bfs_eccentricities(csr, sources):
+    '''
+    Runs one BFS per source.
+
+    Args:
+        csr (CSRGraph): The graph.
+        sources (numpy.ndarray): Source nodes.
+
+    Returns:
+        numpy.ndarray: Eccentricity of every source.
+    '''
+    return np.array([csr.eccentricity(int(source)) for source in sources], dtype=np.int32)
+
+
+def parallel_map_sources(csr, kernel, sources=None, processes=None, chunk_size=None):
+    '''
+    Spreads a per-source kernel over a process pool sharing the graph.
+
+    The adjacency arrays are placed in shared memory once and every worker
+    attaches to them, so the graph is never pickled; only chunks of source ids
+    and the per-source results travel between processes.
+
+    Args:
+        csr (CSRGraph): The graph.
+        kernel (callable): Module-level function kernel(csr, sources) returning one int per source.
+        sources (array_like): Source nodes (defaults to every node).
+        processes (int): Number of worker processes (defaults to the number of CPUs).
+        chunk_size (int): Sources per task (defaults to about four tasks per worker).
+
+    Returns:
+        numpy.ndarray: Kernel result of every source.
+    '''
+    sources = np.arange(csr.V) if sources is None else np.asarray(sources, dtype=np.int64)
+    processes = processes or os.cpu_count()
+    if chunk_size is None:
+        chunk_size = max(1, -(-sources.size // (4 * processes)))
+
+    results = np.empty(sources.size, dtype=np.int32)
+    tasks = [(kernel, first, sources[first:first + chunk_size]) for first in range(0, sources.size, chunk_size)]
+
+    with SharedCSR(csr) as shared:
+        with Pool(processes, initializer=_attach_graph, initargs=(shared.descriptor,)) as pool:
+            for first, chunk_results in pool.imap_unordered(_run_chunk, tasks):
+                results[first:first + chunk_results.size] = chunk_results
+
+    return results
+
+
+def parallel_eccentricities(csr, sources=None, processes=None, chunk_size=None):
+    '''
+    Computes eccentricities with one BFS per source, spread over a process pool.
+
+    Args:
+        csr (CSRGraph): The graph.
+        sources (array_like): Source nodes (defaults to every node).
+        processes (int): Number of worker processes (defaults to the number of CPUs).
+        chunk_size (int): Sources per task (defaults to about four tasks per worker).
+
+    Returns:
+        numpy.ndarray: Eccentricity of every source, within its connected component.
+    '''
+    return parallel_map_sources(csr, bfs_eccentricities, sources, processes, chunk_size)
+
+
+def graph_metrics(eccentricities):
+    '''
+    Derives the graph-wide metrics from the eccentricity vector.
+
+    Args:
+        eccentricities (numpy.ndarray): Eccentricity of every node.
+
+    Returns:
+        dict: diameter, radius, center (nodes of minimum eccentricity) and eccentricities.
+    '''
+    radius = int(eccentricities.min())
+    return {
+        'diameter': int(eccentricities.max()),
+        'radius': radius,
+        'center': np.flatnonzero(eccentricities == radius),
+        'eccentricities': eccentricities,
+    }
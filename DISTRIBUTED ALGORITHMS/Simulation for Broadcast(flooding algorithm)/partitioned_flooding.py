@@ -0,0 +1,226 @@
+import os
+from heapq import heappop, heappush
+from multiprocessing import Pipe, Process
+
+import numpy as np
+
+from flooding_simulator import FloodingResult
+from parallel_bfs import SharedCSR, attach_shared_array, attach_shared_csr
+
+
+def block_partition(csr, parts):
+    '''
+    Splits the nodes into contiguous id blocks of equal size.
+
+    Args:
+        csr (CSRGraph): The graph.
+        parts (int): Number of partitions.
+
+    Returns:
+        numpy.ndarray: Partition of every node.
+    '''
+    return (np.arange(csr.V, dtype=np.int64) * parts // max(csr.V, 1)).astype(np.int32)
+
+
+def bfs_partition(csr, parts):
+    '''
+    Splits the nodes into equal chunks of a BFS order, so that every partition is a
+    BFS-grown region with few links leaving it.
+
+    Args:
+        csr (CSRGraph): The graph.
+        parts (int): Number of partitions.
+
+    Returns:
+        numpy.ndarray: Partition of every node.
+    '''
+    seen = np.zeros(csr.V, dtype=bool)
+    order = []
+    for start_node in range(csr.V):
+        if not seen[start_node]:
+            nodes = csr.bfs_component(start_node)[0]
+            seen[nodes] = True
+            order.append(nodes)
+
+    owner = np.empty(csr.V, dtype=np.int32)
+    if order:
+        owner[np.concatenate(order)] = block_partition(csr, parts)
+    return owner
+
+
+def _partition_worker(connection, descriptor, part, delay):
+    '''
+    Runs the flooding events of one partition, one time window at a time.
+
+    Every request from the coordinator carries the window end and the events sent to
+    the partition by the others; the worker processes its events earlier than the
+    window end, in (time, receiver, sender) order like simulate_flooding, and answers
+    with the events it sends to other partitions, grouped by destination, and the
+    time of its next pending event. A None request ends the run: the worker then
+    counts the copies sent by its nodes and returns their state.
+
+    Args:
+        connection (multiprocessing.connection.Connection): Pipe to the coordinator.
+        descriptor (tuple): (graph descriptor, owner entry, local index entry, delays entry
+            or None), see SharedCSR.
+        part (int): Partition handled by this worker.
+        delay (float): Constant link delay, used when no per-link delays are shared.
+    '''
+    graph_descriptor, owner_entry, local_entry, delays_entry = descriptor
+    csr, blocks = attach_shared_csr(graph_descriptor)
+    owner, owner_block = attach_shared_array(owner_entry)
+    local_index, local_block = attach_shared_array(local_entry)
+    blocks += [owner_block, local_block]
+    delays = None
+    if delays_entry is not None:
+        delays, delays_block = attach_shared_array(delays_entry)
+        blocks.append(delays_block)
+
+    nodes = np.flatnonzero(owner == part)
+    offsets = csr.offsets
+    neighbors = csr.neighbors
+    informed = bytearray(nodes.size)
+    receive_time = np.full(nodes.size, np.inf)
+    parent = np.full(nodes.size, -1, dtype=np.int64)
+    events = []
+
+    while True:
+        request = connection.recv()
+        if request is None:
+            break
+        window_end, incoming = request
+        for event in incoming:
+            heappush(events, event)
+
+        outgoing = {}
+        while events and events[0][0] < window_end:
+            time, node, sender = heappop(events)
+            local = local_index[node]
+            if informed[local]:
+                continue
+            informed[local] = 1
+            receive_time[local] = time
+            parent[local] = sender
+
+            start, end = offsets[node], offsets[node + 1]
+            receivers = neighbors[start:end]
+            if delays is not None:
+                arrivals = (time + delays[start:end]).tolist()
+            else:
+                arrivals = [time + delay] * len(receivers)
+            for receiver, receiver_part, arrival in zip(receivers.tolist(), owner[receivers].tolist(), arrivals):
+                if receiver_part != part:
+                    outgoing.setdefault(receiver_part, []).append((arrival, receiver, node))
+                elif not informed[local_index[receiver]]:
+                    heappush(events, (arrival, receiver, node))
+
+        connection.send((outgoing, events[0][0] if events else np.inf))
+
+    # Every informed node sent the message over all its links except the one to its sender
+    reached = np.flatnonzero(informed)
+    counts = csr.degrees[nodes[reached]]
+    link_parent = np.repeat(parent[reached], counts)
+    links = np.repeat(offsets[nodes[reached]] - np.cumsum(counts) + counts, counts) + np.arange(int(counts.sum()))
+    sent = neighbors[links] != link_parent
+    start_times = np.repeat(receive_time[reached], counts)[sent]
+    arrivals = start_times + (delays[links[sent]] if delays is not None else delay)
+    completion_time = float(arrivals.max()) if arrivals.size else 0.0
+
+    connection.send((nodes, receive_time, parent, int(sent.sum()), completion_time))
+    connection.close()
+    for block in blocks:
+        block.close()
+
+
+def simulate_flooding_partitioned(csr, initiator, delays=None, owner=None, processes=None):
+    '''
+    Flooding-minus-sender simulation spread over one worker process per partition.
+
+    Workers hold the event queue and the state of their own nodes only and read the
+    graph from shared memory. They advance in lockstep time windows: no message can
+    cross partitions faster than the smallest delay of a cut link (the lookahead), so
+    every event earlier than (earliest pending event + lookahead) is safe to process
+    without hearing from the other partitions. Cross-partition events are batched per
+    window and routed by the coordinator through pipes.
+
+    First receptions follow the same (time, receiver, sender) order as
+    simulate_flooding, so parents, message counts and completion time are identical.
+
+    Args:
+        csr (CSRGraph): The graph.
+        initiator (int): The node that starts the flooding.
+        delays (float or numpy.ndarray): Constant link delay or one delay per CSR link.
+            Defaults to unit delays.
+        owner (numpy.ndarray): Partition of every node (defaults to bfs_partition).
+        processes (int): Number of partitions when owner is not given (defaults to the
+            number of CPUs).
+
+    Returns:
+        FloodingResult: Measured messages, completion time and first-reception times.
+    '''
+    per_link = delays is not None and np.ndim(delays) > 0
+    delay = 1.0 if delays is None else (0.0 if per_link else float(delays))
+    if owner is None:
+        owner = bfs_partition(csr, processes or os.cpu_count())
+    owner = np.asarray(owner, dtype=np.int32)
+    parts = int(owner.max()) + 1
+
+    local_index = np.empty(csr.V, dtype=np.int64)
+    for part in range(parts):
+        members = np.flatnonzero(owner == part)
+        local_index[members] = np.arange(members.size)
+
+    # Lookahead: the smallest delay of a link between two partitions
+    senders = np.repeat(owner, csr.degrees)
+    cut = senders != owner[csr.neighbors]
+    if not cut.any():
+        lookahead = np.inf
+    else:
+        lookahead = float(np.asarray(delays)[cut].min()) if per_link else delay
+    if lookahead <= 0:
+        raise ValueError("Partitioned flooding needs positive delays on cut links")
+
+    with SharedCSR(csr) as shared:
+        descriptor = (shared.descriptor, shared.share(owner), shared.share(local_index),
+                      shared.share(np.asarray(delays, dtype=np.float64)) if per_link else None)
+        connections = []
+        workers = []
+        for part in range(parts):
+            connection, worker_connection = Pipe()
+            worker = Process(target=_partition_worker, args=(worker_connection, descriptor, part, delay))
+            worker.start()
+            connections.append(connection)
+            workers.append(worker)
+
+        pending = [[] for _ in range(parts)]
+        pending[owner[initiator]].append((0.0, initiator, -1))
+        next_times = [np.inf] * parts
+        while True:
+            earliest = min(min(next_times), min((min(events)[0] for events in pending if events), default=np.inf))
+            if earliest == np.inf:
+                break
+            window_end = earliest + lookahead
+
+            for part, connection in enumerate(connections):
+                connection.send((window_end, pending[part]))
+            pending = [[] for _ in range(parts)]
+            for part, connection in enumerate(connections):
+                outgoing, next_times[part] = connection.recv()
+                for destination, events in outgoing.items():
+                    pending[destination].extend(events)
+
+        receive_time = np.full(csr.V, np.inf)
+        parent = np.full(csr.V, -1, dtype=np.int64)
+        messages = 0
+        completion_time = 0.0
+        for connection in connections:
+            connection.send(None)
+        for connection, worker in zip(connections, workers):
+            nodes, part_receive_time, part_parent, part_messages, part_completion = connection.recv()
+            receive_time[nodes] = part_receive_time
+            parent[nodes] = part_parent
+            messages += part_messages
+            completion_time = max(completion_time, part_completion)
+            worker.join()
+
+    return FloodingResult(initiator, messages, completion_time, receive_time, parent)
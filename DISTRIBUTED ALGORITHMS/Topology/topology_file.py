@@ -0,0 +1,239 @@
+import struct
+import sys
+
+import numpy as np
+
+# File layout: a fixed 64-byte header, the offsets array (int64, nodes + 1 entries)
+# and the neighbors array (int32 or int64, links entries), all little-endian.
+MAGIC = b"DATOPO01"
+HEADER_FORMAT = "<8sQQII"
+HEADER_SIZE = 64
+FLAG_UNDIRECTED = 1
+
+
+def edges_to_csr(num_nodes, sources, targets, undirected=True, deduplicate=True):
+    '''
+    Builds the offsets and neighbors arrays of a graph from its edges.
+
+    Self-loops and duplicate edges are dropped and every neighbor block is sorted,
+    unless deduplicate is False (for generators that never produce them).
+
+    Args:
+        num_nodes (int): Number of nodes.
+        sources (array_like): Edge sources.
+        targets (array_like): Edge targets.
+        undirected (bool): Whether every edge is also added in the reverse direction.
+        deduplicate (bool): Whether to remove self-loops and duplicate edges.
+
+    Returns:
+        tuple: (offsets, neighbors) arrays.
+    '''
+    sources = np.asarray(sources, dtype=np.int64)
+    targets = np.asarray(targets, dtype=np.int64)
+    if undirected:
+        sources, targets = np.concatenate((sources, targets)), np.concatenate((targets, sources))
+
+    if not deduplicate:
+        order = np.argsort(sources, kind="stable")
+        sources, targets = sources[order], targets[order]
+    elif num_nodes < 2**31:
+        # One sort over packed (source, target) keys orders and deduplicates the links
+        keep = sources != targets
+        keys = np.sort(sources[keep] * num_nodes + targets[keep])
+        if keys.size:
+            first = np.ones(keys.size, dtype=bool)
+            np.not_equal(keys[1:], keys[:-1], out=first[1:])
+            keys = keys[first]
+        sources, targets = keys // num_nodes, keys % num_nodes
+    else:
+        keep = sources != targets
+        sources, targets = sources[keep], targets[keep]
+        order = np.lexsort((targets, sources))
+        sources, targets = sources[order], targets[order]
+        first = np.ones(sources.size, dtype=bool)
+        first[1:] = (sources[1:] != sources[:-1]) | (targets[1:] != targets[:-1])
+        sources, targets = sources[first], targets[first]
+
+    offsets = np.zeros(num_nodes + 1, dtype=np.int64)
+    np.cumsum(np.bincount(sources, minlength=num_nodes), out=offsets[1:])
+    neighbors = targets.astype(np.int32 if num_nodes < 2**31 else np.int64)
+    return offsets, neighbors
+
+
+def adjacency_list_to_csr(adjacency_list):
+    '''
+    Builds the offsets and neighbors arrays from a dict-of-lists topology.
+
+    The inline topologies of the scripts list children only (trees) or both
+    directions (graphs); either way the result is the undirected graph.
+
+    Args:
+        adjacency_list (dict): Nodes 0..n-1 mapped to their neighbors or children.
+
+    Returns:
+        tuple: (offsets, neighbors) arrays.
+    '''
+    sources = [node for node, neighbors in adjacency_list.items() for _ in neighbors]
+    targets = [neighbor for neighbors in adjacency_list.values() for neighbor in neighbors]
+    return edges_to_csr(len(adjacency_list), sources, targets)
+
+
+def write_topology(path, offsets, neighbors, undirected=True):
+    '''
+    Writes a graph in the binary topology format.
+
+    Args:
+        path (str): Destination file.
+        offsets (numpy.ndarray): Start of every node's neighbor block (nodes + 1 entries).
+        neighbors (numpy.ndarray): Concatenated neighbor blocks.
+        undirected (bool): Whether every link is stored in both directions.
+    '''
+    index_dtype = np.dtype("<i4") if len(offsets) - 1 < 2**31 else np.dtype("<i8")
+    header = struct.pack(HEADER_FORMAT, MAGIC, len(offsets) - 1, len(neighbors),
+                         index_dtype.itemsize, FLAG_UNDIRECTED if undirected else 0)
+
+    with open(path, "wb") as file:
+        file.write(header.ljust(HEADER_SIZE, b"\0"))
+        file.write(np.asarray(offsets, dtype="<i8").tobytes())
+        file.write(np.asarray(neighbors, dtype=index_dtype).tobytes())
+
+
+class Topology:
+    def __init__(self, path):
+        '''
+        Opens a binary topology file without reading it.
+
+        The offsets and neighbors arrays are read-only numpy.memmap views on the file,
+        so opening is O(1) and the pages are shared between every process that maps it.
+
+        Args:
+            path (str): The topology file.
+        '''
+        with open(path, "rb") as file:
+            header = file.read(HEADER_SIZE)
+        magic, num_nodes, num_links, index_bytes, flags = struct.unpack_from(HEADER_FORMAT, header)
+        if magic != MAGIC:
+            raise ValueError(f"{path} is not a topology file")
+
+        self.path = path
+        self.num_nodes = num_nodes
+        self.num_links = num_links
+        self.undirected = bool(flags & FLAG_UNDIRECTED)
+        self.offsets = np.memmap(path, dtype="<i8", mode="r", offset=HEADER_SIZE, shape=(num_nodes + 1,))
+        if num_links:
+            self.neighbors = np.memmap(path, dtype=f"<i{index_bytes}", mode="r",
+                                       offset=HEADER_SIZE + 8 * (num_nodes + 1), shape=(num_links,))
+        else:
+            # An empty region cannot be mapped
+            self.neighbors = np.empty(0, dtype=f"<i{index_bytes}")
+
+    def neighbors_of(self, node):
+        '''
+        Returns the neighbors of one node, touching only its block of the file.
+
+        Args:
+            node (int): The node.
+
+        Returns:
+            numpy.ndarray: The neighbor block of the node.
+        '''
+        return self.neighbors[self.offsets[node]:self.offsets[node + 1]]
+
+    def degree(self, node):
+        '''
+        Returns the number of neighbors of one node.
+
+        Args:
+            node (int): The node.
+
+        Returns:
+            int: The degree of the node.
+        '''
+        return int(self.offsets[node + 1] - self.offsets[node])
+
+
+def load_topology(path):
+    '''
+    Opens a binary topology file.
+
+    Args:
+        path (str): The topology file.
+
+    Returns:
+        Topology: Memory-mapped view of the graph.
+    '''
+    return Topology(path)
+
+
+def forest_offsets(path):
+    '''
+    Splits a forest into its trees, which must each occupy a contiguous range of node IDs.
+
+    A range ends after node v when no node up to v has a neighbor above v; a range of k
+    nodes is a single tree when it holds k - 1 edges.
+
+    Args:
+        path (str): The topology file of the forest.
+
+    Returns:
+        numpy.ndarray: The first node of every tree followed by the number of nodes, or
+        None when a range holds several interleaved trees.
+    '''
+    topology = load_topology(path)
+    offsets = np.asarray(topology.offsets, dtype=np.int64)
+    degrees = np.diff(offsets)
+    reach = np.arange(topology.num_nodes, dtype=np.int64)
+    linked = np.flatnonzero(degrees)
+    if linked.size:
+        highest = np.maximum.reduceat(np.asarray(topology.neighbors, dtype=np.int64), offsets[linked])
+        reach[linked] = np.maximum(reach[linked], highest)
+
+    ends = np.flatnonzero(np.maximum.accumulate(reach) == np.arange(topology.num_nodes)) + 1
+    tree_starts = np.concatenate([[0], ends])
+    edges = np.add.reduceat(degrees, tree_starts[:-1]) // 2 if ends.size else np.zeros(0, dtype=np.int64)
+    if np.any(edges != np.diff(tree_starts) - 1):
+        return None
+    return tree_starts
+
+
+def read_edge_list(path):
+    '''
+    Reads a text edge list with one "source target" pair per line ('#' starts a comment).
+
+    Args:
+        path (str): The edge list file.
+
+    Returns:
+        tuple: (number of nodes, sources, targets).
+    '''
+    edges = np.loadtxt(path, dtype=np.int64, comments="#", usecols=(0, 1), ndmin=2)
+    num_nodes = int(edges.max()) + 1 if edges.size else 0
+    return num_nodes, edges[:, 0], edges[:, 1]
+
+
+def convert_edge_list(edge_list_path, topology_path, num_nodes=None, undirected=True):
+    '''
+    Converts a text edge list into a binary topology file.
+
+    Args:
+        edge_list_path (str): The edge list file.
+        topology_path (str): Destination topology file.
+        num_nodes (int): Number of nodes (defaults to the largest node id + 1).
+        undirected (bool): Whether every edge is also stored in the reverse direction.
+
+    Returns:
+        Topology: The written topology, opened for reading.
+    '''
+    found_nodes, sources, targets = read_edge_list(edge_list_path)
+    offsets, neighbors = edges_to_csr(num_nodes or found_nodes, sources, targets, undirected)
+    write_topology(topology_path, offsets, neighbors, undirected)
+    return load_topology(topology_path)
+
+
+if __name__ == "__main__":
+    if len(sys.argv) != 3:
+        print("Usage: python topology_file.py <edge list> <topology file>")
+        sys.exit(1)
+
+    topology = convert_edge_list(sys.argv[1], sys.argv[2])
+    print(f"Wrote {topology.num_nodes} nodes and {topology.num_links} links to {sys.argv[2]}")
@@ -0,0 +1,335 @@
+import sys
+
+import numpy as np
+
+from topology_file import edges_to_csr, write_topology
+
+# Every generator returns the (offsets, neighbors) arrays of an undirected graph,
+# built from edge arrays without any per-node Python object.
+
+
+def path(n):
+    '''
+    Generates the path 0 - 1 - ... - (n - 1).
+
+    Args:
+        n (int): Number of nodes.
+
+    Returns:
+        tuple: (offsets, neighbors) arrays.
+    '''
+    nodes = np.arange(n - 1, dtype=np.int64)
+    return edges_to_csr(n, nodes, nodes + 1, deduplicate=False)
+
+
+def star(n):
+    '''
+    Generates a star with node 0 at the center.
+
+    Args:
+        n (int): Number of nodes.
+
+    Returns:
+        tuple: (offsets, neighbors) arrays.
+    '''
+    leaves = np.arange(1, n, dtype=np.int64)
+    return edges_to_csr(n, np.zeros_like(leaves), leaves, deduplicate=False)
+
+
+def kary_tree(n, k):
+    '''
+    Generates a complete k-ary tree in heap order (the parent of i is (i - 1) // k).
+
+    Args:
+        n (int): Number of nodes.
+        k (int): Number of children per internal node.
+
+    Returns:
+        tuple: (offsets, neighbors) arrays.
+    '''
+    children = np.arange(1, n, dtype=np.int64)
+    return edges_to_csr(n, (children - 1) // k, children, deduplicate=False)
+
+
+def random_tree(n, seed=0):
+    '''
+    Generates a uniformly random labeled tree by decoding a random Prüfer sequence.
+
+    Args:
+        n (int): Number of nodes.
+        seed (int): Seed of the random generator.
+
+    Returns:
+        tuple: (offsets, neighbors) arrays.
+    '''
+    if n <= 2:
+        return path(n)
+
+    rng = np.random.default_rng(seed)
+    sequence = rng.integers(0, n, size=n - 2)
+    degree = (np.bincount(sequence, minlength=n) + 1).tolist()
+    leaves = []
+
+    # Linear-time decoding: ptr scans for the smallest leaf, a node that just
+    # became a leaf below ptr is used immediately instead.
+    pointer = degree.index(1)
+    leaf = pointer
+    for node in sequence.tolist():
+        leaves.append(leaf)
+        degree[node] -= 1
+        if degree[node] == 1 and node < pointer:
+            leaf = node
+        else:
+            pointer += 1
+            while degree[pointer] != 1:
+                pointer += 1
+            leaf = pointer
+    leaves.append(leaf)
+
+    parents = np.append(sequence, n - 1)
+    return edges_to_csr(n, leaves, parents, deduplicate=False)
+
+
+def random_forest(trees, max_size, seed=0):
+    '''
+    Generates a forest of random trees of 1 to max_size nodes, every tree on its own
+    contiguous range of node IDs (a batch of trees for Finding Eccentricities).
+
+    Args:
+        trees (int): Number of trees.
+        max_size (int): Largest number of nodes of a tree.
+        seed (int): Seed of the random generator.
+
+    Returns:
+        tuple: (offsets, neighbors) arrays.
+    '''
+    rng = np.random.default_rng(seed)
+    sizes = rng.integers(1, max_size + 1, size=trees)
+    sources = [np.zeros(0, dtype=np.int64)]
+    targets = [np.zeros(0, dtype=np.int64)]
+    first = 0
+    for size in sizes.tolist():
+        offsets, neighbors = random_tree(size, seed=int(rng.integers(2**32)))
+        nodes = np.repeat(np.arange(size, dtype=np.int64), np.diff(offsets))
+        kept = nodes < neighbors
+        sources.append(nodes[kept] + first)
+        targets.append(neighbors[kept] + first)
+        first += size
+    return edges_to_csr(first, np.concatenate(sources), np.concatenate(targets), deduplicate=False)
+
+
+def ring(n):
+    '''
+    Generates the ring 0 - 1 - ... - (n - 1) - 0.
+
+    Args:
+        n (int): Number of nodes (at least 3).
+
+    Returns:
+        tuple: (offsets, neighbors) arrays.
+    '''
+    nodes = np.arange(n, dtype=np.int64)
+    return edges_to_csr(n, nodes, (nodes + 1) % n, deduplicate=False)
+
+
+def _grid(shape, periodic):
+    '''
+    Generates a grid (or torus) with the given number of nodes per dimension.
+
+    Args:
+        shape (tuple): Number of nodes along every dimension.
+        periodic (bool): Whether the last node of every line links back to the first one.
+
+    Returns:
+        tuple: (offsets, neighbors) arrays.
+    '''
+    n = int(np.prod(shape))
+    index = np.arange(n, dtype=np.int64).reshape(shape)
+    sources = []
+    targets = []
+    for axis, length in enumerate(shape):
+        if periodic and length > 2:
+            sources.append(index.ravel())
+            targets.append(np.roll(index, -1, axis=axis).ravel())
+        else:
+            sources.append(np.delete(index, length - 1, axis=axis).ravel())
+            targets.append(np.delete(index, 0, axis=axis).ravel())
+    return edges_to_csr(n, np.concatenate(sources), np.concatenate(targets), deduplicate=False)
+
+
+def grid_2d(rows, cols, periodic=False):
+    '''
+    Generates a rows x cols grid; node (r, c) has id r * cols + c.
+
+    Args:
+        rows (int): Number of rows.
+        cols (int): Number of columns.
+        periodic (bool): Whether to wrap around into a torus.
+
+    Returns:
+        tuple: (offsets, neighbors) arrays.
+    '''
+    return _grid((rows, cols), periodic)
+
+
+def grid_3d(x, y, z, periodic=False):
+    '''
+    Generates an x * y * z grid; node (i, j, k) has id (i * y + j) * z + k.
+
+    Args:
+        x (int): Number of nodes along the first dimension.
+        y (int): Number of nodes along the second dimension.
+        z (int): Number of nodes along the third dimension.
+        periodic (bool): Whether to wrap around into a torus.
+
+    Returns:
+        tuple: (offsets, neighbors) arrays.
+    '''
+    return _grid((x, y, z), periodic)
+
+
+def hypercube(dimension):
+    '''
+    Generates the hypercube of the given dimension: nodes differing by one bit are linked.
+
+    Args:
+        dimension (int): Number of bits of a node id (2 ** dimension nodes).
+
+    Returns:
+        tuple: (offsets, neighbors) arrays.
+    '''
+    n = 1 << dimension
+    nodes = np.arange(n, dtype=np.int64)
+    sources = []
+    targets = []
+    for bit in range(dimension):
+        low = nodes[(nodes >> bit) & 1 == 0]
+        sources.append(low)
+        targets.append(low | (1 << bit))
+    return edges_to_csr(n, np.concatenate(sources), np.concatenate(targets), deduplicate=False)
+
+
+def random_regular(n, d, seed=0, rounds=50):
+    '''
+    Generates a random d-regular graph with the configuration model.
+
+    Stubs are paired at random; pairs forming self-loops or duplicate edges are
+    re-paired together with as many random good pairs for a few rounds, and any
+    still invalid after that are dropped, so a handful of nodes may end up with
+    degree d - 1 or d - 2.
+
+    Args:
+        n (int): Number of nodes (n * d must be even).
+        d (int): Degree of every node.
+        seed (int): Seed of the random generator.
+        rounds (int): Number of repair rounds.
+
+    Returns:
+        tuple: (offsets, neighbors) arrays.
+    '''
+    if n * d % 2:
+        raise ValueError("n * d must be even")
+
+    rng = np.random.default_rng(seed)
+    stubs = rng.permutation(np.repeat(np.arange(n, dtype=np.int64), d)).reshape(-1, 2)
+    keys = stubs.min(axis=1) * n + stubs.max(axis=1)
+
+    # One full sort finds the duplicate edges; afterwards only the re-paired stubs
+    # are checked, against the sorted keys kept up to date by insert/delete.
+    sorted_keys = np.sort(keys)
+    repeated = sorted_keys[1:][sorted_keys[1:] == sorted_keys[:-1]]
+    bad = np.flatnonzero((stubs[:, 0] == stubs[:, 1]) | np.isin(keys, repeated))
+
+    for _ in range(rounds):
+        if bad.size == 0:
+            break
+
+        # Re-pair the stubs of the bad pairs with those of as many random pairs
+        redo = np.union1d(bad, rng.integers(0, keys.size, size=bad.size))
+        old_keys = np.sort(keys[redo])
+        rank = np.arange(redo.size) - np.searchsorted(old_keys, old_keys)
+        sorted_keys = np.delete(sorted_keys, np.searchsorted(sorted_keys, old_keys) + rank)
+
+        stubs[redo] = rng.permutation(stubs[redo].ravel()).reshape(-1, 2)
+        keys[redo] = stubs[redo].min(axis=1) * n + stubs[redo].max(axis=1)
+        new_keys = np.sort(keys[redo])
+        sorted_keys = np.insert(sorted_keys, np.searchsorted(sorted_keys, new_keys), new_keys)
+
+        new_keys = keys[redo]
+        copies = np.searchsorted(sorted_keys, new_keys, "right") - np.searchsorted(sorted_keys, new_keys)
+        bad = redo[(stubs[redo, 0] == stubs[redo, 1]) | (copies > 1)]
+
+    return edges_to_csr(n, stubs[:, 0], stubs[:, 1])
+
+
+def barabasi_albert(n, m, seed=0):
+    '''
+    Generates a scale-free graph by preferential attachment (Barabási-Albert).
+
+    Node v >= m attaches m edges to earlier nodes chosen with probability
+    proportional to their degree. Picking a uniformly random earlier edge endpoint
+    does exactly that; a pick that lands on another random endpoint is resolved by
+    pointer jumping over the whole endpoint array at once, so no node is added in
+    a Python loop. Repeated picks of the same node are merged, so a few nodes get
+    fewer than m edges.
+
+    Args:
+        n (int): Number of nodes.
+        m (int): Edges added with every new node.
+        seed (int): Seed of the random generator.
+
+    Returns:
+        tuple: (offsets, neighbors) arrays.
+    '''
+    if n <= m:
+        raise ValueError("n must be larger than m")
+
+    rng = np.random.default_rng(seed)
+    edges = (n - m) * m
+    edge = np.arange(edges, dtype=np.int64)
+    new_node = m + edge // m
+
+    # Endpoint slots: 2e holds the new node of edge e, 2e + 1 its target. The first
+    # m edges link node m to 0..m-1; every later edge picks a uniformly random slot
+    # among the edges of earlier nodes.
+    earlier_slots = 2 * m * (edge // m)
+    pick = np.minimum((rng.random(edges) * earlier_slots).astype(np.int64), earlier_slots - 1)
+
+    slot = pick[m:]
+    unresolved = np.arange(slot.size)
+    while unresolved.size:
+        # A picked target slot of a later edge stands for whatever that edge picked
+        follow = (slot[unresolved] % 2 == 1) & (slot[unresolved] // 2 >= m)
+        unresolved = unresolved[follow]
+        slot[unresolved] = pick[slot[unresolved] // 2]
+
+    targets = np.empty(edges, dtype=np.int64)
+    targets[:m] = np.arange(m)
+    targets[m:] = np.where(slot % 2 == 0, new_node[slot // 2], slot // 2)
+    return edges_to_csr(n, new_node, targets)
+
+
+GENERATORS = {
+    'path': path,
+    'star': star,
+    'kary_tree': kary_tree,
+    'random_tree': random_tree,
+    'random_forest': random_forest,
+    'ring': ring,
+    'grid_2d': grid_2d,
+    'grid_3d': grid_3d,
+    'hypercube': hypercube,
+    'random_regular': random_regular,
+    'barabasi_albert': barabasi_albert,
+}
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 3 or sys.argv[1] not in GENERATORS:
+        print("Usage: python topology_generators.py <generator> <integer arguments...> <topology file>")
+        print("Generators:", ", ".join(GENERATORS))
+        sys.exit(1)
+
+    offsets, neighbors = GENERATORS[sys.argv[1]](*map(int, sys.argv[2:-1]))
+    write_topology(sys.argv[-1], offsets, neighbors)
+    print(f"Wrote {len(offsets) - 1} nodes and {len(neighbors)} links to {sys.argv[-1]}")